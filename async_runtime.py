@@ -0,0 +1,280 @@
+import time
+import asyncio
+from time_keeper import parse_time_reply
+
+
+async def _blocking(fn, *args):
+    """
+    Run a blocking network call as its own step.
+
+    On CPython it goes to a worker thread, so the render task keeps going.
+    CircuitPython has no threads: the call still blocks, but the task
+    yields first so the display is refreshed right before it.
+    """
+    to_thread = getattr(asyncio, "to_thread", None)
+    if to_thread:
+        return await to_thread(fn, *args)
+    await asyncio.sleep(0)
+    return fn(*args)
+
+
+class AsyncRuntime:
+    """
+    asyncio entry point: WiFi, NTP, the MQTT pump and rendering run as
+    separate tasks. Failures back off with a sleep instead of retrying in
+    a tight loop.
+
+    Only on CPython (the simulator) does a slow network call leave the
+    clock running: _blocking() hands it to a thread. CircuitPython has no
+    asyncio.to_thread, so connect_AP(), get_local_time(), a data source
+    request and the MQTT connect/loop block every task for as long as
+    they take; the bound on that is their timeouts (MqttManager's
+    socket_timeout and keep_alive, HttpSource's timeout).
+
+    Other periodic jobs (snapshot saving, ...) are added with add(), like
+    Scheduler tasks, and each runs as a task of its own. Idle and wake
+    hooks work as the Scheduler's do, around the render task's sleep: an
+    idle hook gets the slack until the next render. With ``instruments``
+    the NTP call, the MQTT pump and the views' update are timed into its
+    "ntp", "mqtt" and "update" stages, as in the Scheduler loop.
+    """
+
+    def __init__(self, manager, mqtt_manager, matrixportal, esp=None, secrets=None,
+                 ntp_interval=900, ntp_retry=10, view_interval=0.2,
+                 mqtt_interval=0.1, hidden_interval=None, switch_interval=None,
+                 wifi_check_interval=5,
+                 ticker=None, keeper=None, compositor=None, layout=None, theme=None,
+                 sources=None, instruments=None):
+        self.manager = manager
+        self.mqtt_manager = mqtt_manager
+        self.matrixportal = matrixportal
+        self.esp = esp
+        self.secrets = secrets
+        self.ntp_interval = ntp_interval
+        self.ntp_retry = ntp_retry
+        self.view_interval = view_interval
+        self.mqtt_interval = mqtt_interval
+        self.hidden_interval = hidden_interval
+        self.switch_interval = switch_interval
+        self.wifi_check_interval = wifi_check_interval
+        self.ticker = ticker
+        self.keeper = keeper
+        self.compositor = compositor
+        self.theme = theme
+        self.sources = sources
+        self.instruments = instruments
+        # With a PanelLayout, render/hidden drive every region
+        self.views = layout if layout else manager
+
+        self.periodic = []          # (name, callback, period, delay)
+        self.idle_hooks = []
+        self.wake_hooks = []
+
+        self.wifi_ready = None
+        self._render_wake = None
+        self.ntp_syncs = 0
+        self.ntp_failures = 0
+        self.renders = 0
+        self.max_render_gap = 0.0
+
+    def add(self, name, callback, period, delay=0.0):
+        """
+        Run ``callback`` every ``period`` seconds, first after ``delay``.
+        As with Scheduler.add(), a number returned by the callback is the
+        delay before its next run instead.
+        """
+        self.periodic.append((name, callback, period, delay))
+
+    def on_idle(self, hook):
+        """Call ``hook(slack)`` each time the render task is about to sleep."""
+        self.idle_hooks.append(hook)
+
+    def on_wake(self, hook):
+        """Call ``hook(overshoot)`` after each of the render task's sleeps."""
+        self.wake_hooks.append(hook)
+
+    def wake_render(self):
+        """
+        Run the render task now instead of at its next deadline, e.g. as
+        ViewManager.on_transition so a transition's frames start at once.
+        """
+        if self._render_wake:
+            self._render_wake.set()
+
+    async def _render_sleep(self, delay):
+        try:
+            await asyncio.wait_for(self._render_wake.wait(), delay)
+        except asyncio.TimeoutError:
+            pass
+        self._render_wake.clear()
+
+    def _timed(self, name, callback):
+        if self.instruments:
+            return self.instruments.timed(name, callback)
+        return callback
+
+    def _wifi_connected(self):
+        return self.esp is None or self.esp.is_connected
+
+    async def wifi(self):
+        """Keep the access point associated; reconnect with backoff if it drops."""
+        delay = 1
+        while True:
+            if self._wifi_connected():
+                self.wifi_ready.set()
+                delay = 1
+                await asyncio.sleep(self.wifi_check_interval)
+                continue
+            self.wifi_ready.clear()
+            try:
+                print("Connecting to WiFi...")
+                await _blocking(self.esp.connect_AP,
+                                self.secrets["ssid"], self.secrets["password"])
+            except (OSError, ConnectionError, RuntimeError) as e:
+                print("Could not connect to AP, retrying:", e)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 60)
+
+    async def ntp(self):
+        """
+        Sync the time every ntp_interval seconds, retrying after ntp_retry on
+        failure. With a TimeKeeper, it picks both intervals instead.
+        """
+        get_local_time = self._timed("ntp", self.matrixportal.get_local_time)
+        while True:
+            await self.wifi_ready.wait()
+            try:
+                print("Obtaining time from Adafruit IO server...")
+                reply = await _blocking(get_local_time)
+            except RuntimeError as e:
+                print("Unable to obtain time, retrying -", e)
+                self.ntp_failures += 1
+                if self.keeper:
+                    await asyncio.sleep(self.keeper.sync_failed())
+                else:
+                    await asyncio.sleep(self.ntp_retry)
+                continue
+            self.ntp_syncs += 1
+            if self.keeper:
+                self.keeper.add_sample(*parse_time_reply(reply))
+                await asyncio.sleep(self.keeper.sync_interval)
+            else:
+                await asyncio.sleep(self.ntp_interval)
+
+    def _present(self):
+        """Push whatever the last step changed (no-op without a compositor)."""
+        if self.compositor:
+            self.compositor.frame()
+
+    async def mqtt(self):
+        """Pump MQTT. loop() does not block, so it stays on the main thread."""
+        loop = self._timed("mqtt", self.mqtt_manager.loop)
+        while True:
+            await self.wifi_ready.wait()
+            loop()
+            self._present()
+            await asyncio.sleep(self.mqtt_interval)
+
+    async def render(self):
+        """
+        Update the current view at a steady rate, when it asks to, or when
+        woken with wake_render().
+        """
+        update = self._timed("update", self.views.update)
+        last = None
+        while True:
+            start = time.monotonic()
+            if last is not None and start - last > self.max_render_gap:
+                self.max_render_gap = start - last
+            last = start
+            delay = update()
+            self._present()
+            self.renders += 1
+            if delay is None:
+                delay = self.view_interval - (time.monotonic() - start)
+            delay = max(0, delay)
+            wake_at = time.monotonic() + delay
+            for hook in self.idle_hooks:
+                hook(delay)
+            await self._render_sleep(max(0, wake_at - time.monotonic()))
+            if self.wake_hooks:
+                late = max(0, time.monotonic() - wake_at)
+                for hook in self.wake_hooks:
+                    hook(late)
+
+    async def hidden(self):
+        """Keep hidden views ready to be swapped in (low priority)."""
+        while True:
+            await asyncio.sleep(self.hidden_interval)
+            self.views.refresh_hidden()
+
+    async def tick(self):
+        """Commit the clock on each second boundary (see SecondTicker)."""
+        while True:
+            delay = self.ticker.tick()
+            self._present()
+            await asyncio.sleep(max(0, delay))
+
+    async def theme_task(self):
+        """Scheduled theme swaps and their fades (see ThemeEngine.update)."""
+        while True:
+            delay = self.theme.update()
+            self._present()
+            await asyncio.sleep(delay)
+
+    async def sources_task(self):
+        """
+        Poll the DataSources. Only the request goes through _blocking();
+        the result is delivered here, on the loop.
+        """
+        while True:
+            await self.wifi_ready.wait()
+            source = self.sources.due()
+            if source is not None:
+                payload = await _blocking(self.sources.request, source)
+                self.sources.deliver(source, payload)
+                self._present()
+            delay = self.sources.next_delay()
+            if delay is None:
+                return
+            await asyncio.sleep(delay)
+
+    async def every(self, callback, period, delay):
+        """Task behind add()."""
+        await asyncio.sleep(delay)
+        while True:
+            result = callback()
+            self._present()
+            await asyncio.sleep(period if result is None else max(0, result))
+
+    async def rotate(self):
+        while True:
+            await asyncio.sleep(self.switch_interval)
+            self.manager.next_view()
+            self._present()
+
+    async def main(self):
+        self.wifi_ready = asyncio.Event()
+        self._render_wake = asyncio.Event()
+        tasks = [
+            asyncio.create_task(self.wifi()),
+            asyncio.create_task(self.ntp()),
+            asyncio.create_task(self.mqtt()),
+            asyncio.create_task(self.render()),
+        ]
+        if self.ticker:
+            tasks.append(asyncio.create_task(self.tick()))
+        if self.theme:
+            tasks.append(asyncio.create_task(self.theme_task()))
+        if self.sources:
+            tasks.append(asyncio.create_task(self.sources_task()))
+        if self.hidden_interval:
+            tasks.append(asyncio.create_task(self.hidden()))
+        if self.switch_interval:
+            tasks.append(asyncio.create_task(self.rotate()))
+        for _, callback, period, delay in self.periodic:
+            tasks.append(asyncio.create_task(self.every(callback, period, delay)))
+        await asyncio.gather(*tasks)
+
+    def run(self):
+        asyncio.run(self.main())
@@ -3,8 +3,9 @@ import displayio
 
 class BaseView:
     """
-    A base class for all views. 
-    Each View must handle at least show(), hide(), and update() methods.
+    A base class for all views.
+    Each View must handle at least the update() method. A ViewManager
+    shows it by putting its group on the manager's stage.
     """
 
     def __init__(self, palette, font, display):
@@ -12,20 +13,29 @@ class BaseView:
         self.font = font
         self.display = display
 
-        # Each view should have its own Group or TileGrid
-        # so that 'show()' can add it to display.root_group
+        # Each view should have its own Group, laid out off-screen
+        # until the ViewManager swaps it onto its stage
         self.group = displayio.Group()
 
-    def show(self):
-        """Show this view by adding its group to the display's root_group."""
-        if self.group not in self.display.root_group:
-            self.display.root_group.append(self.group)
-
-    def hide(self):
-        """Hide this view by removing its group from the display's root_group."""
-        if self.group in self.display.root_group:
-            self.display.root_group.remove(self.group)
+        # Set by the ViewManager. When there is a compositor, views report
+        # what they changed with invalidate() and it decides when to refresh.
+        self.compositor = None
+        self.visible = False
 
     def update(self):
-        """Update logic that runs every loop iteration."""
+        """
+        Update logic that runs every loop iteration. May return the
+        seconds until the view next needs updating (e.g. an animation).
+        """
         pass
+
+    def invalidate(self, x, y, width, height):
+        """Report a changed rectangle, in this view's coordinates."""
+        if self.compositor and self.visible:
+            self.compositor.invalidate(
+                self.group.x + x, self.group.y + y, width, height)
+
+    def invalidate_label(self, label):
+        """Report the area a Label currently covers."""
+        bbx, bby, bbwidth, bbh = label.bounding_box
+        self.invalidate(label.x + bbx, label.y + bby, bbwidth, bbh)
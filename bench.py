@@ -0,0 +1,2145 @@
+"""
+Benchmarks for the main loop, run on the host simulator.
+
+Drives the real ``while True`` loop in code.py against a fake clock, the
+in-process MQTT broker and the framebuffer display, and prints the results
+as JSON; ``--output`` also writes them to a file so they can be diffed
+across releases:
+
+    python bench.py --output old.json
+    python bench.py --compare old.json --output new.json
+    python bench.py --replay mqtt.log    # a recording copied off the board
+
+``--check`` runs the check_* functions instead: assertions on behaviour
+(not speed) that fail with AssertionError on a regression.
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import runpy
+import sys
+import time
+import tracemalloc
+
+import simulator
+
+simulator.install()
+
+import fakenet  # noqa: E402  (needs simulator.install() first)
+import microcontroller  # noqa: E402
+
+CODE_PATH = os.path.join(simulator.ROOT, "code.py")
+_perf = time.perf_counter
+
+
+class _StopLoop(Exception):
+    pass
+
+
+def percentiles(samples):
+    """Summarise a list of seconds as p50/p99/max in microseconds."""
+    if not samples:
+        return {"n": 0}
+    ordered = sorted(samples)
+    n = len(ordered)
+
+    def pick(p):
+        return round(ordered[min(n - 1, int(p * n))] * 1e6, 2)
+
+    return {"n": n, "p50_us": pick(0.50), "p99_us": pick(0.99),
+            "max_us": round(ordered[-1] * 1e6, 2)}
+
+
+@contextlib.contextmanager
+def _timed(cls, name, samples):
+    """Wrap ``cls.name`` so each call's duration is appended to ``samples``."""
+    original = getattr(cls, name)
+
+    def wrapper(self, *args, **kwargs):
+        start = _perf()
+        try:
+            return original(self, *args, **kwargs)
+        finally:
+            samples.append(_perf() - start)
+
+    setattr(cls, name, wrapper)
+    try:
+        yield
+    finally:
+        setattr(cls, name, original)
+
+
+def run_code(ticks, on_tick=None, retained=None, keep_nvm=False):
+    """
+    Execute code.py on the simulator until it has slept ``ticks`` times.
+
+    ``on_tick(clock, broker, tick)`` runs inside each sleep, after the clock
+    advanced, and is where benchmarks inject traffic or take measurements.
+    The simulated NVM is wiped first unless ``keep_nvm`` (a warm reboot).
+    Returns the script's globals.
+    """
+    if not keep_nvm:
+        microcontroller.nvm[:] = b"\xff" * len(microcontroller.nvm)
+    broker = fakenet.Broker()
+    broker.retained.update(retained or {})
+    fakenet.BROKER = broker
+    clock = simulator.FakeClock()
+    result = {}
+
+    def on_sleep(seconds):
+        if on_tick:
+            on_tick(clock, broker, clock.sleeps)
+        if clock.sleeps >= ticks:
+            raise _StopLoop
+
+    clock.on_sleep = on_sleep
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull), clock:
+        try:
+            result = runpy.run_path(CODE_PATH, run_name="__main__")
+        except _StopLoop:
+            pass
+    return result
+
+
+@contextlib.contextmanager
+def _instances(cls):
+    """Collect every ``cls`` constructed inside the block."""
+    created = []
+    original = cls.__init__
+
+    def init(self, *args, **kwargs):
+        original(self, *args, **kwargs)
+        created.append(self)
+
+    cls.__init__ = init
+    try:
+        yield created
+    finally:
+        cls.__init__ = original
+
+
+def _youtube_traffic(clock, broker, tick):
+    if tick % 5 == 0:
+        broker.publish("matrix/youtube", '{"state": "%d"}' % (1000 + tick))
+
+
+def bench_main_loop(ticks, view=0):
+    """p50/p99 of manager.update() and mqtt_manager.loop() inside code.py."""
+    import mqtt_manager
+    import second_ticker
+    import view_manager
+
+    updates = []
+    loops = []
+    ticks_ = []
+    with _timed(view_manager.ViewManager, "update", updates), \
+            _timed(mqtt_manager.MqttManager, "loop", loops), \
+            _timed(second_ticker.SecondTicker, "tick", ticks_):
+        run_code(ticks, _youtube_traffic, {"matrix/view": str(view)})
+    warmup = min(10, len(updates) // 10)
+    return {
+        "ticks": ticks,
+        "manager_update": percentiles(updates[warmup:]),
+        "mqtt_loop": percentiles(loops[warmup:]),
+        "second_tick": percentiles(ticks_[1:]),
+    }
+
+
+def bench_compositor(ticks, view=0):
+    """Refreshes and pixels pushed by the dirty-region compositor in code.py."""
+    import compositor
+
+    with _instances(compositor.Compositor) as instances:
+        run_code(ticks, _youtube_traffic, {"matrix/view": str(view)})
+    comp = instances[-1]
+    result = comp.stats()
+    # What auto_refresh would have pushed: the whole panel on every change
+    full = comp.display.width * comp.display.height
+    result["full_frame_pixels"] = full * comp.refreshes
+    result["pixels_saved_pct"] = (
+        100.0 - 100.0 * comp.pixels_pushed / result["full_frame_pixels"]
+        if comp.refreshes else 0.0)
+    return result
+
+
+def _view_traffic(clock, broker, tick):
+    _youtube_traffic(clock, broker, tick)
+    if tick % 60 == 30:
+        broker.publish("matrix/view", str(tick // 60 % 2))
+
+
+def check_dirty_rects(ticks=400):
+    """
+    Every pixel that changes between two frames of code.py lies inside a
+    rectangle the views invalidated, and every rectangle is on the display.
+    """
+    from array import array
+    import compositor
+    import displayio
+
+    original = compositor.Compositor.frame
+    checked = []
+
+    def frame(self, slack=None):
+        display = self.display
+        width = display.width
+        height = display.height
+        r = self._rects
+        rects = [tuple(r[i * 4:i * 4 + 4]) for i in range(self._count)]
+        for x0, y0, x1, y1 in rects:
+            assert 0 <= x0 < x1 <= width and 0 <= y0 < y1 <= height, rects
+        scene = array("L", [0]) * (width * height)
+        displayio._composite(display.root_group, scene, width, height)
+        shown = display.framebuffer.pixels
+        if scene != shown:
+            for i in range(width * height):
+                if scene[i] == shown[i]:
+                    continue
+                x = i % width
+                y = i // width
+                assert any(x0 <= x < x1 and y0 <= y < y1 for x0, y0, x1, y1 in rects), \
+                    "pixel (%d, %d) changed outside %r" % (x, y, rects)
+            checked.append(len(rects))
+        return original(self, slack)
+
+    compositor.Compositor.frame = frame
+    try:
+        run_code(ticks, _view_traffic, {"matrix/view": "0"})
+    finally:
+        compositor.Compositor.frame = original
+    assert len(checked) > ticks // 10, "too few frames changed to check anything"
+
+
+def check_sprites():
+    """ClockView's sprite mode lights exactly the pixels the Label did."""
+    from view_clock import ClockView
+    from view_manager import ViewManager
+
+    palette = simulator.make_palette()
+    font = simulator.load_font()
+    views = []
+    for sprites in (False, True):
+        _, display = simulator.make_display()
+        view = ClockView(palette, font, display, sprites=sprites)
+        manager = ViewManager(display)
+        manager.add_view(view)
+        manager.set_view(0)
+        views.append((view, display))
+    for hour in range(24):
+        for minute, second in ((0, 0), (1, 1), (9, 10), (10, 59), (59, 58)):
+            now = (2025, 1, 1, hour, minute, second, 2, 1, -1)
+            frames = []
+            for view, display in views:
+                view.prepare(now)
+                view.commit()
+                frames.append(simulator.render(display))
+            assert frames[0] == frames[1], \
+                "sprites differ from the label at %02d:%02d:%02d" % (hour, minute, second)
+            assert any(frames[0]), "nothing drawn at %02d:%02d:%02d" % (hour, minute, second)
+
+
+def bench_memory(ticks):
+    """Collections the MemoryManager in code.py ran in idle slack, and their pauses."""
+    import memory_manager
+
+    with _instances(memory_manager.MemoryManager) as instances:
+        run_code(ticks, _youtube_traffic)
+    return instances[-1].stats()
+
+
+def check_instruments():
+    """
+    timed() records each call's duration in ms, a ring keeps its newest
+    ``size`` samples, publish() sends their percentiles as JSON, and a
+    disabled Instruments neither wraps callbacks nor publishes.
+    """
+    from instrumentation import Instruments, Ring
+
+    ring = Ring(4)
+    for value in range(10):
+        ring.add(value)
+    assert ring.summary() == [8, 9, 9, 9, 10], ring.summary()
+    assert Ring(4).summary() is None
+
+    with simulator.FakeClock() as clock:
+        mqtt, broker = _make_mqtt_manager()
+        instruments = Instruments(mqtt, size=8)
+        update = instruments.timed("update", lambda: clock.advance(0.025) or "done")
+        assert update() == "done"
+        instruments.overshoot(0.003)
+        instruments.publish()
+        stats = [json.loads(payload) for topic, payload in broker.published
+                 if topic == "matrix/stats"]
+        assert stats == [{"update": [25, 25, 25, 25, 1], "overshoot": [3, 3, 3, 3, 1]}], stats
+
+        disabled = Instruments(mqtt, enabled=False)
+        callback = mqtt.loop
+        assert disabled.timed("mqtt", callback) is callback
+        disabled.overshoot(0.5)
+        disabled.publish()
+        assert disabled.summary() == {} and len(broker.published) == 1
+
+
+class _Heap:
+    """MicroPython's gc functions over a simulated heap of ``size`` bytes."""
+
+    def __init__(self, size=65536):
+        self.size = size
+        self.used = 0               # live objects and garbage
+        self.live = 0
+        self.collections = 0
+        self.auto = None
+
+    def enable(self):
+        pass
+
+    def threshold(self, amount):
+        self.auto = amount
+
+    def collect(self):
+        self.collections += 1
+        self.used = self.live
+
+    def mem_alloc(self):
+        return self.used
+
+    def mem_free(self):
+        return self.size - self.used
+
+
+def check_memory_manager():
+    """
+    MemoryManager leaves automatic collection on with a raised threshold,
+    collects in idle slack once ``collect_bytes`` have been allocated,
+    defers while the slack is shorter than a pause, and collects without
+    slack only below ``critical_free``. The largest-free-block probe waits
+    for slack that covers the collections its failed allocations cause.
+    """
+    import memory_manager
+
+    heap = _Heap()
+    gc = memory_manager.gc
+    memory_manager.gc = heap
+    try:
+        with simulator.FakeClock():
+            memory = memory_manager.MemoryManager(collect_bytes=1000, critical_free=4096)
+            assert heap.auto == 4000 and heap.collections == 1
+            heap.used += 500
+            memory.idle(1.0)
+            assert memory.collections == 0, "collected before collect_bytes"
+            heap.used += 600
+            memory.idle(0.001)
+            assert memory.collections == 0 and memory.deferred == 1, memory.stats()
+            memory.idle(0.5)
+            assert memory.collections == 1 and heap.used == 0, memory.stats()
+            heap.used = heap.size - 1000
+            memory.idle(0)
+            assert memory.collections == 2 and memory.forced == 1, memory.stats()
+
+            heap.used = 0
+            memory = memory_manager.MemoryManager(collect_bytes=1000)
+            heap.used += 1000
+            memory.idle(0.05)                       # a pause, not ~9 more
+            assert memory.collections == 1 and memory.largest_free == 0, memory.stats()
+            heap.used += 1000
+            memory.idle(0.2)
+            assert memory.largest_free == heap.size, memory.stats()
+    finally:
+        memory_manager.gc = gc
+
+
+def bench_warm_start(ticks=1000):
+    """Run code.py long enough to save a snapshot, then reboot with no MQTT data."""
+    import snapshot
+    import view_youtube
+
+    def traffic(clock, broker, tick):
+        if tick == 10:
+            broker.publish("matrix/youtube", '{"state": "98765"}')
+        if tick == 20:
+            broker.publish("matrix/view", "1")
+
+    with _instances(snapshot.Snapshot) as snapshots:
+        run_code(ticks, traffic)
+    saved = snapshots[-1]
+
+    boot = {}
+
+    def first_frame(clock, broker, tick):
+        if tick == 1:
+            # Before the broker has sent anything on this boot
+            boot["youtube_value"] = views[-1].current_value
+            boot["youtube_visible"] = views[-1].visible
+
+    with _instances(view_youtube.YoutubeView) as views, \
+            _instances(snapshot.Snapshot) as snapshots:
+        run_code(3, first_frame, {}, keep_nvm=True)
+    record = snapshots[-1].store.read()
+    boot.update({
+        "writes_before_reboot": saved.writes,
+        "skipped_before_reboot": saved.skipped,
+        "snapshot_bytes": snapshot.HEADER_SIZE + len(record[1]) if record else 0,
+        "restored": snapshots[-1].restored,
+    })
+    return boot
+
+
+def check_warm_start():
+    """A reboot restores the last view and topic values from the snapshot."""
+    result = bench_warm_start()
+    assert result["writes_before_reboot"] >= 1, result
+    assert result["restored"], result
+    assert result["youtube_value"] == "98765" and result["youtube_visible"], result
+
+
+def check_snapshot_slots():
+    """
+    NvmStore's A/B slots: reads return the newest record whose CRC
+    holds, so a corrupt or half-written newest slot falls back to the
+    other one, and the next write goes over the bad slot. (On a single
+    erase block a power cut can take both; the CRC still rejects them.)
+    """
+    from snapshot import HEADER_SIZE, NvmStore, frame
+
+    nvm = bytearray(b"\xff" * 256)
+    store = NvmStore(nvm)
+    assert store.read() is None
+    store.write(1, b"first")
+    store.write(2, b"second")
+    assert store.read() == (2, b"second")
+    assert store._slot(0) == (1, b"first") and store._slot(1) == (2, b"second")
+
+    nvm[store.slot_size + HEADER_SIZE] ^= 0xFF      # flip a bit in the newest body
+    assert store.read() == (1, b"first"), "corrupt record not rejected"
+    store.write(3, b"third")
+    assert store._slot(1) == (3, b"third"), "write did not replace the corrupt slot"
+    assert store.read() == (3, b"third")
+
+    data = frame(4, b"fourth, cut short")
+    nvm[:len(data) // 2] = data[:len(data) // 2]    # power lost mid-write over slot A
+    assert store.read() == (3, b"third"), "half-written record not rejected"
+    store.write(4, b"fourth")
+    assert store.read() == (4, b"fourth") and store._slot(1) == (3, b"third")
+
+
+def check_snapshot_time():
+    """
+    restore() keeps a running RTC (soft reset: the save may be hours
+    old) and seeds the keeper with the saved time only when the RTC is
+    behind it (it was reset).
+    """
+    from snapshot import NvmStore, Snapshot
+    from time_keeper import TimeKeeper
+
+    nvm = bytearray(b"\xff" * 512)
+    with simulator.FakeClock() as clock:
+        keeper = TimeKeeper()
+        keeper.add_sample(int(time.time()))
+        keeper.drift_ppm = 40
+        Snapshot(NvmStore(nvm), keeper).save(force=True)
+        saved = keeper.now()[0]
+
+        clock.advance(3 * 3600)                     # soft reset, RTC still running
+        keeper = TimeKeeper()
+        assert Snapshot(NvmStore(nvm), keeper).restore()
+        assert keeper.now()[0] == int(time.time()), "clock went back to the saved time"
+        assert keeper.drift_ppm == 40
+
+    with simulator.FakeClock(wall=946684800.0):     # RTC reset to 2000-01-01
+        keeper = TimeKeeper()
+        Snapshot(NvmStore(nvm), keeper).restore()
+        assert keeper.now()[0] == saved, (keeper.now(), saved)
+
+
+def bench_allocations(ticks, view=0):
+    """Bytes and blocks allocated per tick of code.py, measured with tracemalloc."""
+    peaks = []
+    blocks = []
+    state = {"snapshot": None, "start": 0}
+
+    def measure():
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot()
+        if state["snapshot"] is not None:
+            peaks.append(peak - state["start"])
+            diff = snapshot.compare_to(state["snapshot"], "lineno")
+            blocks.append(sum(d.count_diff for d in diff if d.count_diff > 0))
+        state["snapshot"] = snapshot
+
+    def on_tick(clock, broker, tick):
+        measure()
+        # Traffic for the next tick is part of that tick's work
+        _youtube_traffic(clock, broker, tick)
+        tracemalloc.reset_peak()
+        state["start"] = tracemalloc.get_traced_memory()[0]
+
+    tracemalloc.start()
+    try:
+        run_code(ticks, on_tick, {"matrix/view": str(view)})
+    finally:
+        tracemalloc.stop()
+    warmup = min(10, len(peaks) // 10)
+    peaks = sorted(peaks[warmup:])
+    blocks = sorted(blocks[warmup:])
+    if not peaks:
+        return {"ticks": ticks}
+    return {
+        "ticks": ticks,
+        "peak_bytes_p50": peaks[len(peaks) // 2],
+        "peak_bytes_max": peaks[-1],
+        "new_blocks_p50": blocks[len(blocks) // 2],
+        "new_blocks_max": blocks[-1],
+    }
+
+
+def _make_mqtt_manager():
+    from mqtt_manager import MqttManager
+
+    broker = fakenet.Broker()
+    manager = MqttManager(broker="sim", port=1883, pool=fakenet.SocketPool(broker))
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        manager.connect()
+    return manager, broker
+
+
+def bench_message_callback(count):
+    """Messages per second through MqttManager._message_callback."""
+    manager, _ = _make_mqtt_manager()
+    payloads = [
+        ("matrix/youtube", '{"state": "12345"}'),
+        ("matrix/youtube", "12346"),
+        ("matrix/sensor", '{"state": "21.5", "unit": "C"}'),
+    ]
+    callback = manager._message_callback
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        start = _perf()
+        for i in range(count):
+            topic, payload = payloads[i % len(payloads)]
+            callback(None, topic, payload)
+        elapsed = _perf() - start
+    return {"messages": count, "messages_per_s": round(count / elapsed, 1)}
+
+
+def bench_payload_codec(count):
+    """JSON vs binary payloads for one topic: messages per second and allocations."""
+    import payload_codec
+    from topic_store import decode_payload
+
+    result = {"messages": count}
+    for name in ("json", "binary"):
+        manager, _ = _make_mqtt_manager()
+        manager.verbose = False
+        manager.add_listener("matrix/youtube", lambda topic, data: None)
+        if name == "binary":
+            manager.set_decoder("matrix/youtube", payload_codec.decoder(("state",), decode_payload))
+            payloads = [payload_codec.encode(1000000 + i) for i in range(count)]
+        else:
+            payloads = [('{"state": %d}' % (1000000 + i)).encode() for i in range(count)]
+        callback = manager._message_callback
+
+        start = _perf()
+        for payload in payloads:
+            callback(None, "matrix/youtube", payload)
+        elapsed = _perf() - start
+
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        for payload in payloads[:200]:
+            callback(None, "matrix/youtube", payload)
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        callback(None, "matrix/youtube", payloads[0])
+        peak = tracemalloc.get_traced_memory()[1] - base
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        blocks = sum(d.count_diff for d in after.compare_to(before, "lineno") if d.count_diff > 0)
+        result[name] = {
+            "payload_bytes": len(payloads[0]),
+            "messages_per_s": round(count / elapsed, 1),
+            "peak_bytes_per_message": peak,
+            "new_blocks_per_200": blocks,
+        }
+    return result
+
+
+def check_payload_codec():
+    """encode()/decode() round-trip every field type, and bad payloads raise ValueError."""
+    import payload_codec
+
+    values = (0, 1, -1, 12345, (1 << 31) - 1, -(1 << 31), 0.5, -2.25, 1e10,
+              "", "abc", "año", "x" * 255, True, False, None)
+    payload = payload_codec.encode(*values)
+    assert payload_codec.is_binary(payload)
+    decoded = payload_codec.decode(payload)
+    assert decoded == list(values), decoded
+    for value in values:
+        assert payload_codec.decode(payload_codec.encode(value)) == value, value
+    big = payload_codec.decode(payload_codec.encode(1 << 40))
+    assert isinstance(big, float) and abs(big - (1 << 40)) <= (1 << 40) * 1e-6
+    assert payload_codec.decode(payload_codec.encode(7, "on"), ("state", "mode", "x")) == \
+        {"state": 7, "mode": "on"}
+
+    for end in range(len(payload)):
+        try:
+            payload_codec.decode(payload[:end])
+        except ValueError:
+            continue
+        raise AssertionError("truncated payload of %d bytes decoded" % end)
+    for bad in (b"", b"{}", bytes([payload_codec.MAGIC, 1, 0x7F])):
+        try:
+            payload_codec.decode(bad)
+        except ValueError:
+            continue
+        raise AssertionError("decoded %r" % bad)
+    for too_big in (tuple(range(256)), ("x" * 256,)):
+        try:
+            payload_codec.encode(*too_big)
+        except ValueError:
+            continue
+        raise AssertionError("encoded an oversized payload")
+
+    decode_topic = payload_codec.decoder(("state",), fallback=lambda payload: "json")
+    assert decode_topic(payload_codec.encode(3)) == {"state": 3}
+    assert decode_topic('{"state": 3}') == "json"
+
+
+def check_topic_trie():
+    """TopicTrie matches exactly the filters MQTT wildcard rules match, and prunes on remove."""
+    from topic_trie import TopicTrie
+
+    filters = ["a", "a/b", "a/+", "a/#", "#", "+", "+/b", "+/+", "a/b/c", "a/+/c",
+               "+/+/+", "b/#", "a/b/#"]
+    topics = ["a", "b", "a/b", "a/c", "b/b", "a/b/c", "a/x/c", "a/b/d", "c/d/e", "a/b/c/d"]
+    trie = TopicTrie()
+    for topic_filter in filters:
+        trie.add(topic_filter, topic_filter)
+    for topic in topics:
+        expected = sorted(f for f in filters if fakenet.topic_matches(f, topic))
+        assert sorted(trie.match(topic)) == expected, (topic, sorted(trie.match(topic)))
+
+    assert "a/+" in trie and "a/x" not in trie
+    assert trie.remove("a/+/c", "a/+/c") and not trie.remove("a/+/c", "a/+/c")
+    assert not trie.remove("a/x", "a/x")
+    for topic_filter in filters:
+        if topic_filter != "a/+/c":
+            trie.remove(topic_filter, topic_filter)
+    assert not trie._root.children, "empty branches left behind"
+    assert trie.match("a/b") == []
+
+
+def check_topic_store():
+    """TopicStore evicts least recently used topics first, by count and by bytes."""
+    from topic_store import TopicStore
+
+    store = TopicStore(max_entries=3, max_bytes=20)
+
+    def order():
+        return [topic for topic, _ in store.items()]
+
+    assert store.put("a", "1") and store.put("b", "2") and store.put("c", "3")
+    assert store.get("a") == 1                      # reading makes "a" recent
+    store.put("d", "4")
+    assert order() == ["c", "a", "d"], order()
+    assert not store.put("c", "3"), "identical payload stored again"
+    assert order() == ["a", "d", "c"], order()
+    assert store.put("d", "5") and store.get("d") == 5, "decoded value not refreshed"
+
+    store.put("e", "x" * 17)                        # 20 bytes in 4 entries: "a" goes
+    assert order() == ["c", "d", "e"] and store.size == 19, (order(), store.size)
+    store.put("f", "y" * 3)                         # 22 bytes: "c" and "d" go
+    assert order() == ["e", "f"] and store.size == 20, (order(), store.size)
+    store.put("big", "z" * 50)                      # alone over max_bytes: kept anyway
+    assert order() == ["big"] and store.size == 50
+    assert store.get("a") is None and store.evictions == 6, store.stats()
+
+
+def bench_reconnect(seconds=60, down_at=10, down_for=20):
+    """Kill and restart the broker under load; the MqttManager must recover by itself."""
+    with simulator.FakeClock() as clock, \
+            open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        manager, broker = _make_mqtt_manager()
+        manager.drain_budget = 0.02
+        manager.keep_alive = manager.mqtt_client.keep_alive = 5
+        seen = []
+        manager.subscribe("matrix/youtube", lambda topic, data: seen.append(clock.monotonic()))
+
+        loops = []
+        stats_sent = 0
+        reconnected_at = None
+        for step in range(seconds * 10):
+            now = step / 10
+            if step == down_at * 10:
+                broker.stop()
+            if step == (down_at + down_for) * 10:
+                broker.start()
+            if broker.running:
+                broker.publish("matrix/youtube", '{"state": "%d"}' % step)
+            if step % 10 == 0:
+                manager.publish("matrix/stats", str(step))
+                stats_sent += 1
+            start = _perf()
+            manager.loop()
+            loops.append(_perf() - start)
+            if reconnected_at is None and now > down_at + down_for and manager.connected:
+                reconnected_at = now
+            clock.advance(0.1)
+
+    delivered = sum(1 for topic, _ in broker.published if topic == "matrix/stats")
+    result = manager.stats()
+    result.update({
+        "loop": percentiles(loops),
+        "reconnect_after_s": round(reconnected_at - down_at - down_for, 2)
+        if reconnected_at is not None else None,
+        "messages_after_restart": sum(1 for t in seen if t > down_at + down_for),
+        "stats_published": stats_sent,
+        "stats_delivered": delivered,
+    })
+    return result
+
+
+def check_reconnect():
+    """
+    A broker restart: the manager reconnects by itself, subscribes again
+    and sends what was published offline, in order. A hung broker (link
+    up, nothing answering) costs one loop() blocked for at most
+    keep_alive in the client's own ping when idle, and is noticed without
+    blocking at all when publishes keep the client from pinging.
+    """
+    with simulator.FakeClock() as clock, \
+            open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        manager, broker = _make_mqtt_manager()
+        manager.keep_alive = manager.mqtt_client.keep_alive = 10
+        seen = []
+        manager.subscribe("matrix/youtube", lambda topic, data: seen.append(data["state"]))
+
+        def reconnect():
+            for _ in range(manager.max_retry * 10):
+                manager.loop()
+                if manager.connected:
+                    return
+                clock.advance(0.1)
+            raise AssertionError("did not reconnect")
+
+        broker.stop()
+        manager.loop()
+        assert not manager.connected, "link loss not noticed"
+        for i in range(3):
+            manager.publish("matrix/stats", str(i))
+        assert len(manager.offline_queue) == 3
+
+        clock.advance(30)
+        manager.loop()
+        assert not manager.connected, "connected to a stopped broker"
+        broker.start()
+        reconnect()
+        assert not manager.offline_queue, "offline queue not flushed"
+        stats = [payload for topic, payload in broker.published if topic == "matrix/stats"]
+        assert stats == ["0", "1", "2"], stats
+        broker.publish("matrix/youtube", '{"state": "7"}')
+        manager.loop()
+        assert seen == ["7"], "not subscribed again after reconnecting"
+
+        def hang(publish):
+            links_lost = manager.links_lost
+            broker.hang()
+            hung_at = clock.monotonic()
+            blocked = 0
+            while manager.connected and clock.monotonic() - hung_at < 60:
+                if publish:
+                    manager.publish("matrix/stats", "x")
+                before = clock.monotonic()
+                manager.loop()
+                blocked = max(blocked, clock.monotonic() - before)
+                clock.advance(1)
+            assert manager.links_lost == links_lost + 1, "hung link not noticed"
+            broker.start()
+            reconnect()
+            return clock.monotonic() - hung_at, blocked
+
+        # Idle: the client's ping waits out keep_alive, then gives up
+        noticed, blocked = hang(publish=False)
+        assert blocked <= manager.keep_alive, blocked
+        assert noticed <= manager.keep_alive * 2 + 2, noticed
+        # Publishing every second: no ping, noticed from the silence alone
+        noticed, blocked = hang(publish=True)
+        assert blocked == 0, blocked
+        assert noticed <= manager.keep_alive * 1.5 + 2, noticed
+
+        # Idle but healthy: the client's own pings keep the link up
+        links_lost = manager.links_lost
+        for _ in range(60):
+            manager.loop()
+            clock.advance(1)
+        assert manager.connected and manager.links_lost == links_lost, "idle link dropped"
+        assert manager.mqtt_client.pings >= 5
+
+
+def _make_views():
+    """ClockView + YoutubeView under a ViewManager, as code.py wires them."""
+    from view_clock import ClockView
+    from view_manager import ViewManager
+    from view_youtube import YoutubeView
+
+    mqtt, broker = _make_mqtt_manager()
+    matrixportal, display = simulator.make_display()
+    palette = simulator.make_palette()
+    font = simulator.load_font()
+    manager = ViewManager(display)
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        manager.add_view(ClockView(palette, font, display, sprites=True))
+        manager.add_view(YoutubeView(palette, font, display, mqtt, "matrix/youtube"))
+        mqtt.subscribe("matrix/view")
+    mqtt.set_view_manager(manager)
+    manager.set_view(0)
+    return matrixportal, manager, mqtt, broker
+
+
+def bench_mqtt_burst(count=200, budget=0.02):
+    """A burst of youtube updates and view commands: one read per loop vs drain mode."""
+    result = {"messages": count}
+    for mode, drain in (("single", None), ("drain", budget)):
+        _, manager, mqtt, broker = _make_views()
+        mqtt.verbose = False
+        switches = manager.switches
+        for i in range(count):
+            if i % 10 == 9:
+                broker.publish("matrix/view", str((i // 10) % 2))
+            else:
+                broker.publish("matrix/youtube", '{"state": "%d"}' % i)
+        loops = 0
+        start = _perf()
+        while mqtt.mqtt_client._inbox:
+            mqtt.loop(drain)
+            loops += 1
+        elapsed = _perf() - start
+        result[mode] = {
+            "loops": loops,
+            "total_us": round(elapsed * 1e6, 1),
+            "view_switches": manager.switches - switches,
+            "final_view": manager.current_view_index,
+        }
+        result[mode].update(mqtt.stats())
+    return result
+
+
+def check_mqtt_drain(count=200):
+    """
+    A drained burst ends in the same state as reading it one message per
+    loop, applying only the newest payload of each topic, and a drain
+    stops at its time budget.
+    """
+    result = bench_mqtt_burst(count)
+    single = result["single"]
+    drain = result["drain"]
+    assert drain["final_view"] == single["final_view"], result
+    assert drain["received"] == single["received"] == count, result
+    assert drain["coalesced"] > 0 and single["coalesced"] == 0, result
+    assert drain["loops"] < single["loops"] // 10, result
+
+    with simulator.FakeClock() as clock, \
+            open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        mqtt, broker = _make_mqtt_manager()
+        mqtt.verbose = False
+        seen = []
+        mqtt.subscribe("matrix/youtube", lambda topic, data: seen.append(data["state"]))
+        for i in range(10):
+            broker.publish("matrix/youtube", '{"state": "%d"}' % i)
+        mqtt.loop(budget=1.0)
+        assert seen == ["9"] and mqtt.coalesced == 9, (seen, mqtt.stats())
+
+        def slow_read():
+            clock.advance(0.004)
+            return read()
+
+        read = mqtt.mqtt_client.loop
+        mqtt.mqtt_client.loop = slow_read
+        for i in range(10):
+            broker.publish("matrix/youtube", '{"state": "%d"}' % (10 + i))
+        mqtt.loop(budget=0.01)
+        assert mqtt.budget_exhausted == 1 and seen == ["9", "12"], (seen, mqtt.stats())
+        mqtt.loop(budget=1.0)
+        assert seen[-1] == "19", seen
+
+
+def bench_marquee(steps=500):
+    """Cost of one scroll step of a Marquee vs relaying out a Label for the same text."""
+    from adafruit_display_text.label import Label
+    from marquee import Marquee
+
+    font = simulator.load_font()
+    text = "Home Assistant: 1,234,567 views"
+    marquee = Marquee(font, x=2, y=12, width=62)
+    marquee.set_text(text)
+    label = Label(font, text=text)
+    steps_ = []
+    relayouts = []
+    with simulator.FakeClock() as clock:
+        wait = marquee.update()
+        for i in range(steps):
+            clock.advance(wait)
+            start = _perf()
+            wait = marquee.update()
+            steps_.append(_perf() - start)
+    for i in range(min(steps, 50)):
+        start = _perf()
+        label.text = text[i % len(text):] + text[:i % len(text)]
+        relayouts.append(_perf() - start)
+    return {
+        "text_width": marquee.text_width,
+        "marquee_step": percentiles(steps_),
+        "label_relayout": percentiles(relayouts),
+    }
+
+
+def check_marquee():
+    """
+    Text that fits is drawn where a Label at the same x, y would be and
+    never moves. Wider text holds still, then scrolls a pixel at a time,
+    never skipping one, and comes round to the start seamlessly.
+    """
+    from adafruit_display_text.label import Label
+    from marquee import Marquee
+
+    font = simulator.load_font()
+    frames = []
+    for text in ("12345", "--"):
+        for make in (lambda: Label(font, text=text, color=0xFFFF00, x=2, y=12),
+                     lambda: Marquee(font, x=2, y=12, color=0xFFFF00)):
+            _, display = simulator.make_display()
+            shown = make()
+            if isinstance(shown, Marquee):
+                shown.set_text(text)
+                assert shown.update() is None
+                shown = shown.group
+            display.root_group.append(shown)
+            frames.append(simulator.render(display))
+        assert frames[-2] == frames[-1], "%r not drawn where a Label would be" % text
+
+    with simulator.FakeClock() as clock:
+        marquee = Marquee(font, width=62, speed=16, gap=16, hold=1500)
+        marquee.set_text("Home Assistant: 1,234,567 views")
+        assert marquee.scrolling
+        period = marquee.text_width + marquee.gap
+        wait = marquee.update()
+        assert wait == 1.5, wait
+        offsets = [0]
+        for _ in range(2 * period):
+            clock.advance(wait)
+            wait = marquee.update()
+            if marquee._offset != offsets[-1]:
+                offsets.append(marquee._offset)
+            if len(offsets) > period:
+                break
+        assert offsets == list(range(period)) + [0], offsets
+        assert wait == 1.5, "no hold at the start of the next cycle"
+
+
+def bench_panels(panels=3, seconds=20):
+    """A clock panel plus a scrolling YoutubeView across the rest of a simulated chain."""
+    from compositor import Compositor
+    from layout import PanelLayout
+    from second_ticker import SecondTicker
+    from time_keeper import TimeKeeper
+    from view_clock import ClockView
+    from view_youtube import YoutubeView
+
+    with simulator.FakeClock() as clock:
+        mqtt, broker = _make_mqtt_manager()
+        mqtt.verbose = False
+        matrixportal, display = simulator.make_display(64 * panels, 32)
+        palette = simulator.make_palette()
+        font = simulator.load_font()
+        compositor = Compositor(display)
+        layout = PanelLayout(display, compositor=compositor)
+        main = layout.add_region("main", 0)
+        side = layout.add_region("side", 1, span=panels - 1, interval=None)
+        clock_view = ClockView(palette, font, main, sprites=True, aligned=True)
+        main.manager.add_view(clock_view)
+        main.manager.set_view(0)
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            side.manager.add_view(YoutubeView(palette, font, side, mqtt, "matrix/youtube"))
+        side.manager.set_view(0)
+        mqtt.add_listener("matrix/youtube", side.wake)
+        ticker = SecondTicker(clock_view, TimeKeeper())
+        broker.publish("matrix/youtube", '{"state": "1,234,567 subscribers and counting"}')
+
+        updates = []
+        for step in range(seconds * 10):
+            if step % 10 == 0:
+                ticker.tick()
+            mqtt.loop()
+            start = _perf()
+            layout.update()
+            updates.append(_perf() - start)
+            compositor.frame()
+            clock.advance(0.1)
+    return {
+        "panels": panels,
+        "frames": seconds * 10,
+        "layout_update": percentiles(updates),
+        "compositor": compositor.stats(),
+        "panel_updates": list(matrixportal.framebuffer.panel_updates),
+        "layout": layout.stats(),
+    }
+
+
+def check_panels(panels=3, seconds=20):
+    """
+    On a chain, the compositor refreshes every panel whose pixels changed,
+    and the clock's panel only when the clock does, not at the marquee's rate.
+    """
+    result = bench_panels(panels, seconds)
+    refreshed = result["compositor"]["panel_refreshes"]
+    changed = result["panel_updates"]
+    for panel in range(panels):
+        assert changed[panel] <= refreshed[panel], (panel, changed, refreshed)
+    assert seconds // 2 <= changed[0] <= refreshed[0] <= seconds + 1, refreshed
+    assert min(changed[1:]) > 4 * seconds, changed
+    assert result["compositor"]["pixels_per_refresh"] < 64 * 32 * panels // 2, result["compositor"]
+
+
+def _record_traffic(path, hours, seed=1):
+    """
+    Hours of Home Assistant-like traffic through a live MqttManager with a
+    recorder attached: youtube updates every ~30 s, a view command every
+    ~5 min and, every 10 min, a burst of retained republishes (an HA restart).
+    """
+    import random
+    from mqtt_recorder import MqttRecorder
+
+    rng = random.Random(seed)
+    with simulator.FakeClock() as clock:
+        mqtt, broker = _make_mqtt_manager()
+        mqtt.verbose = False
+        mqtt.drain_budget = 0.02
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            mqtt.subscribe("matrix/view")
+            mqtt.subscribe("matrix/youtube")
+        recorder = MqttRecorder(path).attach(mqtt)
+        value = 1000
+        end = hours * 3600
+        while clock.monotonic() < end:
+            now = clock.monotonic()
+            value += rng.randint(0, 3)
+            broker.publish("matrix/youtube", '{"state": "%d"}' % value)
+            if rng.random() < 0.1:
+                broker.publish("matrix/view", str(rng.randint(0, 1)))
+            if int(now) // 600 != int(now + 30) // 600:
+                for i in range(20):
+                    value += 1
+                    broker.publish("matrix/youtube", '{"state": "%d"}' % value)
+                    broker.publish("matrix/view", str(i % 2))
+            while mqtt.mqtt_client._inbox:
+                mqtt.loop()
+            clock.advance(rng.uniform(5, 55))
+        recorder.close()
+    return recorder.records
+
+
+def bench_replay(hours=6, path=None):
+    """
+    Replay of recorded traffic into ClockView/YoutubeView on a simulated
+    clock: simulated hours per real second and per-message latency of the
+    callback plus the views' update and the compositor frame.
+    ``path`` replays an existing log (bench.py --replay) instead of a
+    synthetic one.
+    """
+    import tempfile
+    from compositor import Compositor
+    from mqtt_recorder import Replayer
+    from view_clock import ClockView
+    from view_manager import ViewManager
+    from view_youtube import YoutubeView
+
+    result = {}
+    tmp = None
+    if path is None:
+        fd, tmp = tempfile.mkstemp(suffix=".mqr")
+        os.close(fd)
+        os.unlink(tmp)
+        path = tmp
+        result["recorded"] = _record_traffic(path, hours)
+    try:
+        with simulator.FakeClock() as clock:
+            mqtt, _ = _make_mqtt_manager()
+            mqtt.verbose = False
+            _, display = simulator.make_display()
+            compositor = Compositor(display)
+            manager = ViewManager(display, compositor)
+            palette = simulator.make_palette()
+            font = simulator.load_font()
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                manager.add_view(ClockView(palette, font, display, sprites=True))
+                manager.add_view(YoutubeView(palette, font, display, mqtt, "matrix/youtube"))
+            mqtt.set_view_manager(manager)
+            manager.set_view(0)
+
+            def step(ms):
+                manager.update()
+                compositor.frame()
+
+            replayer = Replayer(mqtt, clock=clock, step=step)
+            tracemalloc.start()
+            start = _perf()
+            span = replayer.replay(path)
+            elapsed = _perf() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    finally:
+        if tmp:
+            os.unlink(tmp)
+    result.update({
+        "messages": replayer.messages,
+        "simulated_h": round(span / 3600000, 2),
+        "real_s": round(elapsed, 3),
+        "speedup": round(span / 1000 / elapsed, 1) if elapsed else None,
+        "latency": percentiles(replayer.latencies),
+        "view_switches": manager.switches,
+        "refreshes": compositor.stats()["refreshes"],
+        "peak_bytes": peak,
+    })
+    return result
+
+
+def check_replay():
+    """
+    Replaying a recording leaves a fresh MqttManager with the live one's
+    topic values, over the recorded span of simulated time, and
+    read_log() stops cleanly at a record cut short.
+    """
+    import tempfile
+    from mqtt_recorder import MqttRecorder, Replayer, read_log
+
+    fd, path = tempfile.mkstemp(suffix=".mqr")
+    os.close(fd)
+    os.unlink(path)
+    try:
+        with simulator.FakeClock() as clock, \
+                open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            live, broker = _make_mqtt_manager()
+            live.subscribe("matrix/youtube")
+            live.subscribe("matrix/view")
+            recorder = MqttRecorder(path, flush_every=4).attach(live)
+            for i in range(50):
+                broker.publish("matrix/youtube", '{"state": "%d"}' % i)
+                if i % 7 == 0:
+                    broker.publish("matrix/view", str(i % 2))
+                live.loop()
+                live.loop()
+                clock.advance(7)
+            recorder.close()
+
+        with simulator.FakeClock() as clock, \
+                open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            replica, _ = _make_mqtt_manager()
+            replayer = Replayer(replica, clock=clock)
+            span = replayer.replay(path)
+            assert clock.monotonic() == span / 1000, (clock.monotonic(), span)
+        assert replayer.messages == recorder.records == 58, replayer.messages
+        assert span == 49 * 7000, span
+        assert list(replica.topic_data.items()) == list(live.topic_data.items())
+
+        with open(path, "rb") as f:
+            data = f.read()
+        with open(path, "wb") as f:
+            f.write(data[:-3])
+        assert len(list(read_log(path))) == 57
+    finally:
+        os.unlink(path)
+
+
+def _youtube_body(subscribers, description=600):
+    """A channels?part=snippet,statistics reply shaped like the YouTube API's."""
+    return {
+        "kind": "youtube#channelListResponse",
+        "etag": "x" * 27,
+        "pageInfo": {"totalResults": 1, "resultsPerPage": 5},
+        "items": [{
+            "kind": "youtube#channel",
+            "etag": "y" * 27,
+            "id": "UCjhbs3YjA7CPUw0-Dgb3f2A",
+            "snippet": {
+                "title": "pixel-clock",
+                "description": "lorem ipsum " * (description // 12),
+                "customUrl": "@pixelclock",
+                "publishedAt": "2015-01-01T00:00:00Z",
+            },
+            "statistics": {
+                "viewCount": "987654",
+                "subscriberCount": str(subscribers),
+                "hiddenSubscriberCount": False,
+                "videoCount": "321",
+            },
+        }],
+    }
+
+
+def bench_data_source(hours=2, ttl=60, change_every=600):
+    """
+    The YouTube data source against a local HTTP stub over simulated
+    hours: conditional requests, connection reuse, and the cost of
+    streaming field extraction vs parsing the whole reply.
+    """
+    import json as json_
+    import adafruit_requests
+    import fakehttp
+    from data_source import DataSources, HttpSource, extract_fields
+
+    result = {}
+    with fakehttp.Server() as server, simulator.FakeClock() as clock:
+        server.set("/channels", _youtube_body(1000))
+        mqtt, _ = _make_mqtt_manager()
+        mqtt.verbose = False
+        session = adafruit_requests.Session(None)
+        sources = DataSources(session, mqtt)
+        sources.add(HttpSource("youtube", server.url("/channels?part=statistics"),
+                               "matrix/youtube", {"state": "subscriberCount"}, ttl=ttl))
+        polls = []
+        subscribers = 1000
+        while clock.monotonic() < hours * 3600:
+            if int(clock.monotonic()) // change_every != subscribers - 1000:
+                subscribers = 1000 + int(clock.monotonic()) // change_every
+                server.set("/channels", _youtube_body(subscribers))
+            start = _perf()
+            wait = sources.poll()
+            polls.append(_perf() - start)
+            clock.advance(wait)
+        result["source"] = sources.stats()["youtube"]
+        result["value"] = mqtt.get_data("matrix/youtube")
+        result["poll"] = percentiles(polls)
+        result["http"] = {
+            "requests": server.requests,
+            "not_modified": server.not_modified,
+            "connections": server.connections,
+            "bytes_sent": server.bytes_sent,
+            "bytes_read": session.bytes_read,
+        }
+
+    body = json_.dumps(_youtube_body(12345)).encode("utf-8")
+    chunks = [body[i:i + 256] for i in range(0, len(body), 256)]
+    for name, parse in (
+        ("json_loads", lambda: json_.loads(b"".join(chunks))["items"][0]["statistics"]["subscriberCount"]),
+        ("extract_fields", lambda: extract_fields(iter(chunks), ["subscriberCount"])),
+    ):
+        samples = []
+        for _ in range(200):
+            start = _perf()
+            parse()
+            samples.append(_perf() - start)
+        tracemalloc.start()
+        parse()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        result[name] = percentiles(samples)
+        result[name]["peak_bytes"] = peak
+    result["body_bytes"] = len(body)
+    return result
+
+
+def check_data_source():
+    """
+    Conditional requests deliver each change once over one kept-alive
+    connection; failures (HTTP errors, a dead host) back off, doubling up
+    to the TTL, and a success resets the backoff.
+    """
+    import adafruit_requests
+    import fakehttp
+    from data_source import DataSources, HttpSource
+
+    result = bench_data_source(hours=2, ttl=60, change_every=600)
+    source = result["source"]
+    assert source["failures"] == 0 and source["updates"] == 12, source
+    assert source["not_modified"] == source["fetches"] - source["updates"], source
+    assert result["http"]["connections"] == 1, result["http"]
+    assert result["value"] == {"state": "1011"}, result["value"]
+
+    with fakehttp.Server() as server, simulator.FakeClock(), \
+            open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        mqtt, _ = _make_mqtt_manager()
+        sources = DataSources(adafruit_requests.Session(None), mqtt, retry=30)
+        youtube = sources.add(HttpSource("youtube", server.url("/channels"), "matrix/youtube",
+                                         {"state": "subscriberCount"}, ttl=300))
+        delays = []
+        for _ in range(5):
+            assert not sources.fetch(youtube)       # 404
+            delays.append(youtube.retry_delay)
+        assert delays == [30, 60, 120, 240, 300], delays
+        server.set("/channels", _youtube_body(42))
+        assert sources.fetch(youtube) and youtube.retry_delay is None
+        assert mqtt.get_data("matrix/youtube") == {"state": "42"}
+        url = server.url("/channels")
+    # A new session, so no kept-alive socket to the stopped server survives
+    sources = DataSources(adafruit_requests.Session(None), mqtt)
+    dead = sources.add(HttpSource("dead", url, "matrix/dead", {"state": "subscriberCount"}))
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        assert not sources.fetch(dead)               # OutOfRetries, not raised
+    assert dead.failures == 1 and dead.retry_delay == 30
+
+    # A slow host costs at most the source's timeout...
+    with fakehttp.Server(delay=0.5) as server, \
+            open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        server.set("/channels", _youtube_body(7))
+        slow = sources.add(HttpSource("slow", server.url("/channels"), "matrix/slow",
+                                      {"state": "subscriberCount"}, timeout=0.1))
+        start = _perf()
+        assert not sources.fetch(slow)
+        assert _perf() - start < 0.4 and slow.failures == 1
+
+        # ...and under AsyncRuntime it does not hold up rendering
+        import asyncio
+        from async_runtime import AsyncRuntime
+
+        matrixportal, manager, mqtt, _ = _make_views()
+        sources = DataSources(adafruit_requests.Session(None), mqtt, min_gap=0.1)
+        sources.add(HttpSource("youtube", server.url("/channels"), "matrix/youtube",
+                               {"state": "subscriberCount"}, ttl=60))
+        runtime = AsyncRuntime(manager, mqtt, matrixportal, ntp_interval=60,
+                               view_interval=0.05, mqtt_interval=0.02, sources=sources)
+
+        async def scenario():
+            task = asyncio.create_task(runtime.main())
+            await asyncio.sleep(1.0)
+            task.cancel()
+
+        asyncio.run(scenario())
+    assert mqtt.get_data("matrix/youtube") == {"state": "7"}
+    assert runtime.max_render_gap < 0.3, runtime.max_render_gap
+
+
+def check_byte_membership():
+    """
+    No device module tests an int against a bytes literal (``b in b"..."``):
+    CPython allows it, MicroPython raises TypeError.
+    """
+    import ast
+
+    for name in sorted(os.listdir(simulator.ROOT)):
+        if not name.endswith(".py") or name in ("bench.py", "simulator.py", "code_original.py"):
+            continue
+        path = os.path.join(simulator.ROOT, name)
+        with open(path, "rb") as f:
+            tree = ast.parse(f.read(), name)
+        for node in ast.walk(tree):
+            if not isinstance(node, ast.Compare):
+                continue
+            for op, right in zip(node.ops, node.comparators):
+                if isinstance(op, (ast.In, ast.NotIn)) and isinstance(right, ast.Constant) \
+                        and isinstance(right.value, bytes):
+                    raise AssertionError("%s:%d tests membership in a bytes literal"
+                                         % (name, node.lineno))
+
+
+def bench_theme(hours=48):
+    """
+    Day/night themes over simulated days: how often colours are written
+    and what a ThemeEngine.update() costs, fades included.
+    """
+    from theme import ThemeEngine
+    from view_clock import ClockView
+
+    with simulator.FakeClock() as clock:
+        _, display = simulator.make_display()
+        palette = simulator.make_palette()
+        font = simulator.load_font()
+        theme = ThemeEngine(("clock", "value"))
+        theme.add_theme("day", {"clock": 0x85FF00, "value": 0xFFFF00})
+        theme.add_theme("night", {"clock": 0x0085FF, "value": 0xFFFF00}, brightness=0.5)
+        theme.schedule(6, 0, "day")
+        theme.schedule(18, 0, "night")
+        view = ClockView(palette, font, display, sprites=True, theme=theme)
+        writes = []
+        theme.bind("clock", writes.append)
+        theme.bind("value", writes.append)
+        updates = []
+        calls = 0
+        end = clock.monotonic() + hours * 3600
+        while clock.monotonic() < end:
+            start = _perf()
+            wait = theme.update()
+            updates.append(_perf() - start)
+            calls += 1
+            clock.advance(wait)
+        view.update_time()
+    result = theme.stats()
+    result.update({
+        "hours": hours,
+        "update_calls": calls,
+        "color_writes": len(writes),
+        "update": percentiles(updates),
+    })
+    return result
+
+
+def check_theme():
+    """
+    Colours are corrected once onto the panel's levels, keeping lit
+    channels lit; the schedule swaps themes on the minute they are set
+    for, a fade ends on exactly the target colours, and setters only
+    hear about changes.
+    """
+    from theme import ThemeEngine, correct
+
+    assert correct(0x000000) == 0 and correct(0xFFFFFF) == 0xFFFFFF
+    assert correct(0xFFFFFF, bit_depth=4) == 0xF0F0F0
+    assert correct(0x010101, bit_depth=4) == 0x101010, "dim channel went dark"
+    assert correct(0xFF8000, brightness=0) == 0
+    assert all(correct(c, 0.7, bit_depth=5) & 0x070707 == 0 for c in range(0, 0xFFFFFF, 0x10101))
+
+    with simulator.FakeClock() as clock:           # 12:00
+        theme = ThemeEngine(("clock", "value"), fade_steps=4, fade_time=2.0)
+        theme.add_theme("day", {"clock": 0x85FF00, "value": 0xFFFF00})
+        theme.add_theme("night", {"clock": 0x0085FF}, brightness=0.5)
+        theme.schedule(6, 0, "day")
+        theme.schedule(18, 0, "night")
+        writes = []
+        theme.bind("clock", writes.append)
+        wait = theme.update()
+        assert theme.current == "day" and writes == [theme._colors["day"][0]], writes
+        updates = 1
+        while theme.current == "day":
+            clock.advance(wait)
+            wait = theme.update()
+            updates += 1
+        assert time.localtime()[3:6] == (18, 0, 0), time.localtime()
+        assert updates <= 6 * 60 + 1, updates
+        for _ in range(theme.fade_steps):
+            clock.advance(wait)
+            wait = theme.update()
+        assert theme.color("clock") == theme._colors["night"][0], theme.color("clock")
+        assert theme.color("value") == 0 and wait == 60
+        assert len(writes) == 1 + theme.fade_steps, writes
+        assert theme.stats()["fade_tables"] == 2, theme.stats()
+
+
+def bench_split_screen(seconds=60, messages=20):
+    """
+    One panel split into a clock (top) and a YoutubeView (bottom) that is
+    only updated when a value arrives or while it scrolls.
+    """
+    from compositor import Compositor
+    from layout import PanelLayout
+    from second_ticker import SecondTicker
+    from time_keeper import TimeKeeper
+    from view_clock import ClockView
+    from view_youtube import YoutubeView
+
+    with simulator.FakeClock() as clock:
+        mqtt, broker = _make_mqtt_manager()
+        mqtt.verbose = False
+        _, display = simulator.make_display()
+        palette = simulator.make_palette()
+        font = simulator.load_font()
+        compositor = Compositor(display)
+        layout = PanelLayout(display, compositor=compositor, budget=0.02)
+        top = layout.add_area("clock", 0, 0, 64, 16, interval=None)
+        bottom = layout.add_area("value", 0, 16, 64, 16, interval=None)
+        clock_view = ClockView(palette, font, top, sprites=True, aligned=True)
+        top.manager.add_view(clock_view)
+        top.manager.set_view(0)
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            bottom.manager.add_view(YoutubeView(palette, font, bottom, mqtt, "matrix/youtube"))
+        bottom.manager.set_view(0)
+        mqtt.add_listener("matrix/youtube", bottom.wake)
+        ticker = SecondTicker(clock_view, TimeKeeper())
+
+        updates = []
+        next_tick = 0
+        step = 0.05
+        for i in range(int(seconds / step)):
+            now = clock.monotonic()
+            if now >= next_tick:
+                next_tick = now + ticker.tick()
+            if i % int(seconds / step / messages) == 0:
+                # Short values fit, every third one scrolls for a while
+                text = "%d" % (1000 + i) if i % 3 else "%d subscribers" % (1000 + i)
+                broker.publish("matrix/youtube", '{"state": "%s"}' % text)
+            mqtt.loop()
+            start = _perf()
+            layout.update()
+            updates.append(_perf() - start)
+            compositor.frame()
+            clock.advance(step)
+    return {
+        "seconds": seconds,
+        "passes": len(updates),
+        "layout_update": percentiles(updates),
+        "layout": layout.stats(),
+        "compositor": compositor.stats(),
+    }
+
+
+def bench_region_scaling(counts=(2, 4, 8, 16), seconds=10, cost=0.004, budget=0.01):
+    """
+    Simulated CPU per second of layout updates as regions are added.
+    Each region's view "costs" ``cost`` seconds of simulated time per
+    update; rates cycle through 1 Hz, 30 fps and message-driven (woken
+    at 2 Hz). With ``budget`` a pass is cut short instead of growing.
+    """
+    from base_view import BaseView
+    from layout import PanelLayout
+
+    class _Busy(BaseView):
+        def update(self):
+            clock.advance(cost)
+
+    rates = (1.0, 1 / 30, None)
+    result = {}
+    for mode, limit in (("no_budget", None), ("budget", budget)):
+        rows = {}
+        for count in counts:
+            with simulator.FakeClock() as clock:
+                _, display = simulator.make_display()
+                layout = PanelLayout(display, budget=limit)
+                regions = []
+                for i in range(count):
+                    region = layout.add_area("r%d" % i, (i % 4) * 16, (i // 4) * 8, 16, 8,
+                                             interval=rates[i % len(rates)])
+                    region.manager.add_view(_Busy(None, None, region))
+                    region.manager.set_view(0)
+                    regions.append(region)
+                busy = 0.0
+                worst = 0.0
+                next_wake = 0
+                end = clock.monotonic() + seconds
+                while clock.monotonic() < end:
+                    if clock.monotonic() >= next_wake:
+                        for region in regions[2::3]:
+                            region.wake()
+                        next_wake = clock.monotonic() + 0.5
+                    start = clock.monotonic()
+                    wait = layout.update()
+                    spent = clock.monotonic() - start
+                    busy += spent
+                    worst = max(worst, spent)
+                    clock.advance(0.2 if wait is None else max(wait, 0.001))
+                stats = layout.stats()
+                rows[count] = {
+                    "cpu_pct": round(busy / seconds * 100, 1),
+                    "worst_pass_ms": round(worst * 1000, 1),
+                    "updates": sum(r["updates"] for r in stats["regions"].values()),
+                    "budget_exhausted": stats["budget_exhausted"],
+                }
+        result[mode] = rows
+    return result
+
+
+def check_region_rates(seconds=10):
+    """
+    Regions update at their own rates (every pass, every ``interval``
+    seconds, or only when woken), a view's returned delay overrides the
+    interval, and a pass cut short by the budget resumes where it stopped.
+    """
+    from base_view import BaseView
+    from layout import PanelLayout
+
+    class _Counter(BaseView):
+        def __init__(self, display, delay=None, cost=0):
+            super().__init__(None, None, display)
+            self.delay = delay
+            self.cost = cost
+            self.updates = 0
+
+        def update(self):
+            self.updates += 1
+            clock.advance(self.cost)
+            return self.delay
+
+    with simulator.FakeClock() as clock:
+        _, display = simulator.make_display()
+        layout = PanelLayout(display)
+        views = {}
+        for name, interval, delay in (("every", 0, None), ("second", 1, None),
+                                      ("woken", None, None), ("animated", 1, 0.1)):
+            region = layout.add_area(name, len(views) * 16, 0, 16, 32, interval=interval)
+            views[name] = _Counter(region, delay)
+            region.manager.add_view(views[name])
+            region.manager.set_view(0)
+            views[name].updates = 0         # set_view() updated it off-screen
+        for step in range(int(seconds / 0.05)):
+            if step % 50 == 25:
+                layout.region("woken").wake()
+            layout.update()
+            clock.advance(0.05)
+        counts = {name: view.updates for name, view in views.items()}
+    passes = int(seconds / 0.05)
+    assert counts["every"] == passes, counts
+    assert seconds <= counts["second"] <= seconds + 1, counts
+    assert counts["woken"] == 1 + seconds // 2.5, counts
+    assert 5 * counts["second"] < counts["animated"] <= 10 * seconds + 1, counts
+
+    with simulator.FakeClock() as clock:
+        _, display = simulator.make_display()
+        layout = PanelLayout(display, budget=0.01)
+        views = []
+        for i in range(4):
+            region = layout.add_area("r%d" % i, i * 16, 0, 16, 32)
+            views.append(_Counter(region, cost=0.004))
+            region.manager.add_view(views[-1])
+            region.manager.set_view(0)
+        for _ in range(30):
+            start = clock.monotonic()
+            layout.update()
+            assert clock.monotonic() - start <= 0.01 + 0.004, "pass ran past the budget"
+            clock.advance(0.05)
+        counts = [view.updates for view in views]
+    assert layout.budget_exhausted == 30 and max(counts) - min(counts) <= 1, counts
+
+
+def bench_transitions(switches=20, duration=0.4, fps=30, stall_every=7, stall=0.1):
+    """
+    Animated switches between the clock and YouTube views: cost of a
+    frame, achieved fps and frames skipped when the loop stalls for
+    ``stall`` seconds every ``stall_every`` frames.
+    """
+    from transitions import Fade, Slide
+
+    result = {}
+    for name, transition in (("slide", Slide(duration, fps)), ("fade", Fade(duration, fps))):
+        with simulator.FakeClock() as clock:
+            _, manager, _, _ = _make_views()
+            manager.transition = transition
+            starts = []
+            steps = []
+            stalled = 0
+            for i in range(switches):
+                start = _perf()
+                manager.set_view((i + 1) % 2)
+                starts.append(_perf() - start)
+                while manager._playing:
+                    start = _perf()
+                    wait = manager.update()
+                    steps.append(_perf() - start)
+                    if stall_every and transition.frames_shown // stall_every > stalled:
+                        stalled += 1
+                        clock.advance(stall)
+                    clock.advance(wait if wait is not None else 1 / fps)
+                clock.advance(1.0)
+            result[name] = transition.stats()
+            result[name]["start"] = percentiles(starts)
+            result[name]["frame"] = percentiles(steps)
+            result[name]["frames_expected"] = switches * transition.frames
+            result[name]["stalls"] = stalled
+    return result
+
+
+def check_transitions(duration=0.4, fps=30):
+    """
+    A transition lasts ``duration`` whatever frame rate the loop manages:
+    frames it is too late for are dropped, not played late. When it ends
+    the stage holds only the new view and the panel shows what a plain
+    cut would.
+    """
+    from transitions import Fade, Slide
+
+    result = bench_transitions(switches=6, duration=duration, fps=fps, stall_every=5)
+    for name in ("slide", "fade"):
+        stats = result[name]
+        assert stats["frames"] + stats["dropped"] == stats["frames_expected"], stats
+        assert stats["dropped"] > 0 and stats["fps"] < fps, stats
+
+    for transition in (Slide(duration, fps), Fade(duration, fps)):
+        with simulator.FakeClock() as clock:
+            _, animated, _, _ = _make_views()
+            _, cut, _, _ = _make_views()
+            animated.transition = transition
+            start = clock.monotonic()
+            for manager in (animated, cut):
+                manager.set_view(1)
+            assert len(animated.stage) > 1
+            while animated._playing:
+                wait = animated.update()
+                clock.advance(wait if wait is not None else 0)
+            assert abs(clock.monotonic() - start - duration) < 0.05, clock.monotonic() - start
+            youtube = animated.views[1]
+            assert list(animated.stage) == [youtube.group], list(animated.stage)
+            assert (youtube.group.x, youtube.group.y, youtube.group.hidden) == (0, 0, False)
+            assert simulator.render(animated.display) == simulator.render(cut.display), \
+                type(transition).__name__
+
+
+def bench_set_view(count):
+    """Cost of ViewManager.set_view alternating between the clock and YouTube views."""
+    _, manager, _, _ = _make_views()
+    samples = []
+    for i in range(count):
+        start = _perf()
+        manager.set_view((i + 1) % 2)
+        samples.append(_perf() - start)
+    result = percentiles(samples)
+    result["max_switch_us_reported"] = manager.max_switch_us
+    return result
+
+
+def check_view_switch():
+    """
+    set_view() brings the incoming view up to date off-screen and swaps
+    it into the one-slot stage, so the panel shows one whole view at a
+    time; refresh_hidden() only updates views that are not shown.
+    """
+    _, manager, mqtt, broker = _make_views()
+    mqtt.verbose = False
+    clock_view, youtube = manager.views
+    updated = []
+
+    def counting(view):
+        update = view.update
+
+        def counted():
+            updated.append(view)
+            return update()
+        return counted
+
+    for view in manager.views:
+        view.update = counting(view)
+    assert list(manager.stage) == [clock_view.group] and clock_view.visible
+    broker.publish("matrix/youtube", '{"state": "4321"}')
+    mqtt.loop()
+    manager.refresh_hidden()
+    assert updated == [youtube], updated
+
+    del updated[:]
+    manager.set_view(1)
+    assert updated == [youtube], "incoming view not updated before the swap"
+    assert list(manager.stage) == [youtube.group], list(manager.stage)
+    assert youtube.visible and not clock_view.visible
+    assert youtube.value_marquee.text == "4321"
+    manager.refresh_hidden()
+    assert updated == [youtube, clock_view], updated
+    manager.set_view(0)
+    assert list(manager.stage) == [clock_view.group]
+    assert manager.display.root_group.index(manager.stage) == 0
+
+
+def bench_async_runtime(seconds=2.0, ntp_delay=0.5):
+    """
+    Run the asyncio runtime in real time with an NTP call that blocks for
+    ``ntp_delay`` seconds, and report the longest gap between renders.
+    """
+    import asyncio
+    from async_runtime import AsyncRuntime
+    from instrumentation import Instruments
+
+    matrixportal, manager, mqtt, broker = _make_views()
+    instruments = Instruments(mqtt)
+    get_local_time = matrixportal.get_local_time
+
+    def slow_get_local_time(location=None):
+        time.sleep(ntp_delay)
+        return get_local_time(location)
+
+    matrixportal.get_local_time = slow_get_local_time
+    runtime = AsyncRuntime(manager, mqtt, matrixportal,
+                           ntp_interval=ntp_delay, view_interval=0.05,
+                           mqtt_interval=0.02, instruments=instruments)
+    periodic = []
+    runtime.add("periodic", lambda: periodic.append(time.monotonic()), 0.25, delay=0.25)
+    slack = []
+    overshoot = []
+    runtime.on_idle(slack.append)
+    runtime.on_wake(overshoot.append)
+    runtime.on_wake(instruments.overshoot)
+
+    async def traffic():
+        n = 0
+        while True:
+            broker.publish("matrix/youtube", '{"state": "%d"}' % n)
+            n += 1
+            await asyncio.sleep(0.01)
+
+    async def scenario():
+        tasks = [asyncio.create_task(runtime.main()), asyncio.create_task(traffic())]
+        await asyncio.sleep(seconds)
+        for task in tasks:
+            task.cancel()
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        asyncio.run(scenario())
+    return {
+        "seconds": seconds,
+        "ntp_delay_s": ntp_delay,
+        "ntp_syncs": runtime.ntp_syncs,
+        "renders": runtime.renders,
+        "max_render_gap_ms": round(runtime.max_render_gap * 1000, 2),
+        "periodic_runs": len(periodic),
+        "idle_calls": len(slack),
+        "max_overshoot_ms": round(max(overshoot, default=0) * 1000, 2),
+        "stages": instruments.summary(),
+    }
+
+
+def check_async_runtime(seconds=2.0, ntp_delay=0.5):
+    """
+    Rendering keeps going while NTP blocks for ``ntp_delay``, the
+    periodic jobs and idle hooks added to the runtime run, its
+    instruments time the NTP, MQTT and update stages, and
+    wake_render() starts a transition's frames without waiting for
+    the next render.
+    """
+    result = bench_async_runtime(seconds, ntp_delay)
+    assert result["ntp_syncs"] >= 1, result
+    assert result["max_render_gap_ms"] < ntp_delay * 1000, result
+    assert result["renders"] >= seconds / 0.05 / 2, result
+    assert result["periodic_runs"] >= seconds / 0.25 - 2, result
+    assert result["idle_calls"] >= result["renders"] - 1, result
+    stages = result["stages"]
+    assert stages["ntp"][3] >= ntp_delay * 1000, stages
+    assert stages["update"][4] >= result["renders"] - 1 and "mqtt" in stages, stages
+
+    # A transition started between renders plays from the next loop pass,
+    # not the next render, once on_transition wakes the render task
+    import asyncio
+    from async_runtime import AsyncRuntime
+    from transitions import Slide
+
+    matrixportal, manager, mqtt, _ = _make_views()
+    manager.transition = Slide(0.2, 30)
+    runtime = AsyncRuntime(manager, mqtt, matrixportal, view_interval=1.0)
+    manager.on_transition = runtime.wake_render
+    played = []
+
+    async def scenario():
+        task = asyncio.create_task(runtime.main())
+        await asyncio.sleep(0.3)
+        start = time.monotonic()
+        manager.set_view(1)
+        while manager._playing:
+            await asyncio.sleep(0.01)
+        played.append(time.monotonic() - start)
+        task.cancel()
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        asyncio.run(scenario())
+    assert played[0] < 0.2 + 0.15, played
+
+
+def check_scheduler():
+    """
+    Tasks run at their deadlines, earliest first, and the loop sleeps
+    exactly until the next one; a returned delay replaces the period,
+    and a task that falls behind drops the periods it missed.
+    """
+    from scheduler import Scheduler
+
+    with simulator.FakeClock() as clock:
+        scheduler = Scheduler()
+        runs = []
+        scheduler.add("fast", lambda: runs.append(("fast", clock.monotonic())), 1.0)
+        scheduler.add("slow", lambda: runs.append(("slow", clock.monotonic())), 2.5, delay=0.5)
+        scheduler.at("once", lambda: runs.append(("once", clock.monotonic())), 1.25)
+        slack = []
+        scheduler.on_idle(slack.append)
+        scheduler.run_forever(until=5.0)
+        assert runs == [("fast", 0.0), ("slow", 0.5), ("fast", 1.0), ("once", 1.25),
+                        ("fast", 2.0), ("fast", 3.0), ("slow", 3.0), ("fast", 4.0),
+                        ("fast", 5.0)], runs
+        assert clock.sleeps == 7 and clock.monotonic() == 5.0, clock.sleeps
+        assert slack[:4] == [0.5, 0.5, 0.25, 0.75], slack
+        assert scheduler.get("once") is None, "one-shot task left behind"
+
+        scheduler = Scheduler()
+        behind = scheduler.add("behind", lambda: clock.advance(2.5), 1.0)
+        scheduler.run_pending()
+        assert behind.overruns == 1 and behind.skipped == 2, behind.stats()
+        assert behind.next_run == clock.monotonic() + 0.5
+        retry = scheduler.add("retry", lambda: 0.25, 10)
+        scheduler.run_pending()
+        assert retry.runs == 1 and retry.next_run == clock.monotonic() + 0.25
+        scheduler.wake("behind")
+        scheduler.run_pending()
+        assert behind.runs == 2, "wake() did not run the task on the next pass"
+
+
+def bench_second_alignment(seconds=5.0):
+    """
+    Real-time run of the scheduler with the SecondTicker: how far from
+    each wall-clock second boundary the clock frame was committed.
+    """
+    from scheduler import Scheduler
+    from second_ticker import SecondTicker
+    from time_keeper import TimeKeeper
+    from view_clock import ClockView
+    from view_manager import ViewManager
+
+    mqtt, broker = _make_mqtt_manager()
+    _, display = simulator.make_display()
+    clock_view = ClockView(simulator.make_palette(), simulator.load_font(), display,
+                           sprites=True, aligned=True)
+    manager = ViewManager(display)
+    manager.add_view(clock_view)
+    manager.set_view(0)
+    keeper = TimeKeeper()
+    now = time.time()
+    keeper.add_sample(int(now), int(now % 1 * 1000))
+    ticker = SecondTicker(clock_view, keeper)
+
+    scheduler = Scheduler()
+    scheduler.add("tick", ticker.tick, 1)
+    scheduler.add("mqtt", mqtt.loop, 0.1)
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        scheduler.run_forever(until=time.monotonic() + seconds)
+    return ticker.stats()
+
+
+def check_second_ticker(seconds=30):
+    """
+    Frames are committed on the wall-clock second boundary, each showing
+    the second that starts there, also when the TimeKeeper's seconds
+    start part-way through the monotonic ones.
+    """
+    from scheduler import Scheduler
+    from second_ticker import SecondTicker
+    from time_keeper import TimeKeeper
+
+    class _View:
+        prepared = None
+
+        def __init__(self):
+            self.shown = []
+
+        def prepare(self, now):
+            self.prepared = now
+
+        def commit(self):
+            self.shown.append((self.prepared, keeper.now()))
+
+    with simulator.FakeClock(start=100.0) as clock:
+        keeper = TimeKeeper()
+        keeper.add_sample(int(time.time()) + 5, 370)
+        view = _View()
+        ticker = SecondTicker(view, keeper)
+        scheduler = Scheduler()
+        scheduler.add("tick", ticker.tick, 1)
+        scheduler.run_forever(until=clock.monotonic() + seconds)
+    assert ticker.commits >= seconds - 1, ticker.stats()
+    assert abs(ticker.max_error) <= 1, ticker.stats()
+    for prepared, (wall, into) in view.shown:
+        assert into <= 1 or into >= 999, into
+        if into >= 999:
+            wall += 1
+        assert prepared == time.gmtime(wall), (prepared, wall)
+
+
+def bench_time_keeper(hours=48, drift_ppm=80, jitter_ms=40):
+    """
+    Simulated days of a crystal running ``drift_ppm`` fast with NTP replies
+    off by up to ``jitter_ms``: how many syncs the TimeKeeper asks for, the
+    largest displayed jump between consecutive seconds, and the largest
+    error against true time.
+    """
+    import random
+    from time_keeper import TimeKeeper
+
+    rng = random.Random(1)
+    true_start = 1735732800
+    keeper = TimeKeeper()
+    mono_ms = 0
+    next_sync = 0
+    syncs = 0
+    max_jump = 0
+    max_error = 0
+    last = None
+    for second in range(hours * 3600):
+        # The crystal runs fast: each true second is slightly longer on it
+        mono_ms = second * (1000000 + drift_ppm) // 1000
+        true_ms = second * 1000
+        if mono_ms >= next_sync:
+            reply_ms = true_ms + rng.randint(-jitter_ms, jitter_ms)
+            keeper.add_sample(true_start + reply_ms // 1000, reply_ms % 1000, mono_ms)
+            next_sync = mono_ms + keeper.sync_interval * 1000
+            syncs += 1
+        wall, into = keeper.wall_at(mono_ms)
+        shown = (wall - true_start) * 1000 + into
+        if last is not None:
+            max_jump = max(max_jump, abs(shown - last - 1000))
+        last = shown
+        if syncs > 1:
+            max_error = max(max_error, abs(shown - true_ms))
+    return {
+        "hours": hours,
+        "drift_ppm": drift_ppm,
+        "syncs": syncs,
+        "naive_syncs_900s": hours * 4,
+        "estimated_drift_ppm": keeper.drift_ppm,
+        "final_interval_s": keeper.sync_interval,
+        "max_jump_ms": max_jump,
+        "max_error_ms": max_error,
+    }
+
+
+def check_time_keeper():
+    """
+    The TimeKeeper learns the crystal's drift and stretches its sync
+    interval without the displayed time jumping by more than the slew
+    rate; a large error steps at once and failed syncs back off.
+    """
+    from time_keeper import TimeKeeper, parse_time_reply
+
+    result = bench_time_keeper(hours=48, drift_ppm=80, jitter_ms=40)
+    assert abs(abs(result["estimated_drift_ppm"]) - 80) <= 5, result
+    assert result["syncs"] < result["naive_syncs_900s"] // 4, result
+    assert result["max_jump_ms"] <= TimeKeeper().slew_permille + 1, result
+    assert result["max_error_ms"] < 100, result
+
+    with simulator.FakeClock():
+        keeper = TimeKeeper()
+        now = int(time.time())
+        keeper.add_sample(now + 3600, 250)              # first sync: step
+        assert keeper.now() == (now + 3600, 250), keeper.now()
+        assert keeper.add_sample(now + 3600, 750) == 500
+        assert keeper.now() == (now + 3600, 250), "a small error was not slewed"
+        keeper.add_sample(now + 7200)                   # past step_ms: step
+        assert keeper.now() == (now + 7200, 0), keeper.now()
+    delays = [keeper.sync_failed() for _ in range(8)]
+    assert delays == [10, 20, 40, 80, 160, 320, 640, 900], delays
+    assert parse_time_reply("2025-01-01 12:34:56.789 001 3 -0800 PST")[1] == 789
+
+
+def bench_font_load():
+    """Boot cost of the font: BDF + full ASCII load_glyphs vs. packed font + clock glyphs."""
+    from adafruit_bitmap_font import bitmap_font
+    import packed_font
+
+    ascii_glyphs = b'0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz!@#$%^&*()-_=+[]{}|;:",.<>/?`~ '
+
+    def load_bdf():
+        font = bitmap_font.load_font("/RetroGaming-11.bdf")
+        font.load_glyphs(ascii_glyphs)
+        return font
+
+    def load_pgf():
+        font = packed_font.load_font("/RetroGaming-11.pgf")
+        font.load_glyphs(b"0123456789: M j'")
+        return font
+
+    results = {}
+    for name, load in (("bdf", load_bdf), ("pgf", load_pgf)):
+        start = _perf()
+        load()
+        elapsed = _perf() - start
+        tracemalloc.start()
+        font = load()
+        retained = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del font
+        results[name] = {"load_ms": round(elapsed * 1000, 3), "retained_bytes": retained}
+    return results
+
+
+def run_all(ticks, messages):
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "machine": platform.machine(),
+        },
+        "main_loop_clock": bench_main_loop(ticks, view=0),
+        "main_loop_youtube": bench_main_loop(ticks, view=1),
+        "compositor_clock": bench_compositor(ticks, view=0),
+        "compositor_youtube": bench_compositor(ticks, view=1),
+        "memory": bench_memory(ticks),
+        "warm_start": bench_warm_start(),
+        "allocations_clock": bench_allocations(min(ticks, 200), view=0),
+        "allocations_youtube": bench_allocations(min(ticks, 200), view=1),
+        "message_callback": bench_message_callback(messages),
+        "payload_codec": bench_payload_codec(messages),
+        "reconnect": bench_reconnect(),
+        "mqtt_burst": bench_mqtt_burst(),
+        "marquee": bench_marquee(),
+        "panels": bench_panels(),
+        "replay": bench_replay(),
+        "data_source": bench_data_source(),
+        "theme": bench_theme(),
+        "split_screen": bench_split_screen(),
+        "region_scaling": bench_region_scaling(),
+        "transitions": bench_transitions(),
+        "set_view": bench_set_view(min(messages, 2000)),
+        "async_runtime": bench_async_runtime(),
+        "font_load": bench_font_load(),
+        "second_alignment": bench_second_alignment(),
+        "time_keeper": bench_time_keeper(),
+    }
+
+
+def check_all():
+    """Run every check_* function; returns the names that passed."""
+    checks = [
+        check_sprites,
+        check_scheduler,
+        check_async_runtime,
+        check_topic_trie,
+        check_topic_store,
+        check_second_ticker,
+        check_time_keeper,
+        check_view_switch,
+        check_dirty_rects,
+        check_mqtt_drain,
+        check_instruments,
+        check_memory_manager,
+        check_marquee,
+        check_panels,
+        check_payload_codec,
+        check_reconnect,
+        check_snapshot_slots,
+        check_snapshot_time,
+        check_warm_start,
+        check_replay,
+        check_data_source,
+        check_byte_membership,
+        check_theme,
+        check_region_rates,
+        check_transitions,
+    ]
+    for check in checks:
+        check()
+        print("ok", check.__name__)
+    return [check.__name__ for check in checks]
+
+
+def compare(old, new, prefix=""):
+    """Print every numeric metric present in both result trees with its change."""
+    for key, value in new.items():
+        if key not in old:
+            continue
+        if isinstance(value, dict):
+            compare(old[key], value, prefix + key + ".")
+        elif isinstance(value, (int, float)) and isinstance(old[key], (int, float)):
+            change = (value - old[key]) / old[key] * 100 if old[key] else 0.0
+            print("%-48s %12s -> %12s  %+7.1f%%" % (prefix + key, old[key], value, change))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--ticks", type=int, default=1000)
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--output", help="also write the results to this file")
+    parser.add_argument("--compare", help="previous results file to diff against")
+    parser.add_argument("--replay", help="only replay this MQTT recording (mqtt_recorder.py)")
+    parser.add_argument("--check", action="store_true",
+                        help="run the behaviour checks instead of the benchmarks")
+    args = parser.parse_args(argv)
+
+    if args.check:
+        check_all()
+        return
+
+    if args.replay:
+        json.dump(bench_replay(path=args.replay), sys.stdout, indent=2, sort_keys=True)
+        print()
+        return
+
+    results = run_all(args.ticks, args.messages)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results)
+    else:
+        json.dump(results, sys.stdout, indent=2, sort_keys=True)
+        print()
+
+
+if __name__ == "__main__":
+    main()
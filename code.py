@@ -1,25 +1,38 @@
 import time
 import displayio
 import board
+import microcontroller
 import busio
 from digitalio import DigitalInOut
 
 import adafruit_connection_manager
 import adafruit_requests
 from adafruit_esp32spi import adafruit_esp32spi
-from adafruit_bitmap_font import bitmap_font
 from adafruit_matrixportal.matrixportal import MatrixPortal
 
 from secrets import secrets
 
 # Import our views and ViewManager
-from view_manager import ViewManager
+from layout import PanelLayout
 from mqtt_manager import MqttManager
 from view_clock import ClockView
 from view_youtube import YoutubeView
+from compositor import Compositor
+from scheduler import Scheduler
+from second_ticker import SecondTicker
+from time_keeper import TimeKeeper, parse_time_reply
+from instrumentation import Instruments
+from snapshot import NvmStore, Snapshot
+from memory_manager import MemoryManager
+from data_source import DataSources, HttpSource
+from theme import ThemeEngine
+from transitions import Fade, Slide
+import packed_font
+import payload_codec
+from topic_store import decode_payload
 
 # -------------------------
-# 1) WiFi + Hardware Setup
+# 1) Hardware Setup
 # -------------------------
 if secrets == {"ssid": None, "password": None}:
     raise RuntimeError(
@@ -39,17 +52,16 @@ pool = adafruit_connection_manager.get_radio_socketpool(esp)
 ssl_context = adafruit_connection_manager.get_radio_ssl_context(esp)
 requests = adafruit_requests.Session(pool, ssl_context)
 
-print("Connecting to WiFi...")
-while not esp.is_connected:
-    try:
-        esp.connect_AP(secrets["ssid"], secrets["password"])
-    except OSError as e:
-        print("Could not connect to AP, retrying:", e)
-        continue
-print("Connected to:", esp.ap_info.ssid)
-print("My IP address is", esp.ipv4_address)
-
-matrixportal = MatrixPortal(status_neopixel=board.NEOPIXEL, esp=esp)
+# Matrices de 64x32 encadenadas (1 a 4). Con más de una, el reloj va en
+# el primer panel y el valor de Home Assistant en los demás.
+PANELS = 1
+# Con un solo panel: reloj en la mitad de arriba y valor en la de abajo
+SPLIT_SCREEN = False
+# Bits por canal que muestra el panel: colores más oscuros que 1 << (8 - BIT_DEPTH)
+# salen negros (theme.py redondea a estos niveles)
+BIT_DEPTH = 2
+matrixportal = MatrixPortal(status_neopixel=board.NEOPIXEL, esp=esp, width=64 * PANELS,
+                            bit_depth=BIT_DEPTH)
 display = matrixportal.display
 
 # Set up the palette/colors
@@ -57,6 +69,12 @@ COLOR_BLACK = 0x000000
 COLOR_BLUE_GREEN = 0x0085FF
 COLOR_AMBER = 0xCC4000
 COLOR_GREENISH = 0x85FF00
+COLOR_YELLOW = 0xFFFF00
+
+# Horario de los temas (ver theme.py)
+DAY_START = 6                  # hora en que empieza el tema de día
+NIGHT_START = 18               # hora en que empieza el tema de noche
+NIGHT_BRIGHTNESS = 0.5         # brillo del tema de noche (antes de la gamma)
 
 PALETTE_SIZE = 4
 palette = displayio.Palette(PALETTE_SIZE)
@@ -66,11 +84,10 @@ palette[2] = COLOR_AMBER       # Ámbar
 palette[3] = COLOR_GREENISH    # Verdoso
 
 # Load font
-FONT_PATH = "/RetroGaming-11.bdf"
-font = bitmap_font.load_font(FONT_PATH)
-font.load_glyphs(
-    b'0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz!@#$%^&*()-_=+[]{}|;:",.<>/?`~ '
-)
+# Fuente precompilada (python compile_font.py RetroGaming-11.bdf): los
+# glifos se leen del archivo según se necesitan, sin parsear el BDF.
+FONT_PATH = "/RetroGaming-11.pgf"
+font = packed_font.load_font(FONT_PATH)
 
 # Clear anything from the display root group
 display.root_group = displayio.Group()
@@ -80,59 +97,263 @@ mqtt_manager = MqttManager(
     broker="192.168.0.22",
     port=1883,
     pool=pool,
-    keep_alive=60
+    # Con el enlace medio abierto, el ping de MiniMQTT bloquea hasta
+    # keep_alive segundos antes de darlo por perdido: corto
+    keep_alive=10,
+    socket_timeout=0.5,
+    # Cada pasada lee hasta 20 ms de mensajes y aplica solo el último
+    # de cada topic (p.ej. ráfagas de retained al arrancar)
+    drain_budget=0.02,
+    verbose=False,
+    # Payloads como bytes: permite topics en formato binario
+    use_binary_mode=True,
 )
-mqtt_manager.connect()
-
+# Todavía sin red: las suscripciones se hacen al conectar
 mqtt_manager.subscribe("matrix/view")
+
+# Topics que Home Assistant puede mandar en binario (encode_payload.py)
+# en vez de JSON: nombres de los campos, en orden. Si llega JSON, se
+# sigue entendiendo.
+BINARY_TOPICS = {
+    "matrix/youtube": ("state",),
+}
+for topic, schema in BINARY_TOPICS.items():
+    mqtt_manager.set_decoder(topic, payload_codec.decoder(schema, decode_payload))
 # -------------------------------------
 # 2) Create our Views and ViewManager
 # -------------------------------------
-clock_view = ClockView(palette, font, display)
-homeassistant_view = YoutubeView(
-    palette, font, display, mqtt_manager, "matrix/youtube")
+NTP_REFRESH_INTERVAL = 900     # segundos entre sincronizaciones de hora
+NTP_MAX_INTERVAL = 4 * 3600    # hasta aquí se alarga si la deriva es estable
+NTP_RETRY_INTERVAL = 10        # primer reintento tras un fallo de NTP
+
+# Sin auto_refresh: el compositor refresca el panel sólo cuando una
+# vista reporta que cambió algo
+compositor = Compositor(display)
+# Cada región es un "display" pequeño con su propio ViewManager, y se
+# actualiza a su ritmo: interval=None solo cuando algo la despierta (un
+# mensaje, un cambio de vista) o mientras su vista pide más (marquee).
+# Cada pasada del layout se corta tras LAYOUT_BUDGET segundos.
+LAYOUT_BUDGET = 0.01
+layout = PanelLayout(display, compositor=compositor, budget=LAYOUT_BUDGET)
+if SPLIT_SCREEN:
+    main_region = layout.add_area("main", 0, 0, display.width, display.height // 2,
+                                  interval=None)
+elif PANELS > 1:
+    main_region = layout.add_region("main", 0, interval=None)
+else:
+    # El reloj y el valor comparten la región: se actualiza en cada pasada
+    main_region = layout.add_region("main", 0)
+
+# Hora local estimada entre sincronizaciones (corrige la deriva del cristal)
+keeper = TimeKeeper(
+    min_interval=NTP_REFRESH_INTERVAL,
+    max_interval=NTP_MAX_INTERVAL,
+    retry=NTP_RETRY_INTERVAL,
+    max_retry=NTP_REFRESH_INTERVAL,
+)
 
-manager = ViewManager(display)
+# Colores por tema, con corrección gamma y atenuados de noche. Se
+# calculan una vez; el cambio de día a noche es un fundido por tablas
+# precalculadas y las vistas no hacen nada con colores en cada frame.
+theme = ThemeEngine(("clock", "value"), keeper=keeper, bit_depth=BIT_DEPTH)
+theme.add_theme("day", {"clock": COLOR_GREENISH, "value": COLOR_YELLOW})
+theme.add_theme("night", {"clock": COLOR_BLUE_GREEN, "value": COLOR_YELLOW},
+                brightness=NIGHT_BRIGHTNESS)
+theme.schedule(DAY_START, 0, "day")
+theme.schedule(NIGHT_START, 0, "night")
+theme.apply(theme.scheduled(), fade=False)
+
+# aligned=True: el reloj no se dibuja en cada update(), sino que el
+# SecondTicker lo cambia justo en el límite de cada segundo
+clock_view = ClockView(palette, font, main_region, sprites=True, aligned=True, theme=theme)
+ticker = SecondTicker(clock_view, keeper)
+
+# Arranque en caliente: hora, deriva, vista y últimos valores MQTT
+# guardados en NVM, restaurados antes de tocar la red para que el panel
+# muestre algo útil mientras se conecta. Los valores de los topics tienen
+# que estar antes de crear las vistas que los leen. En el M4 la NVM es
+# un solo bloque de flash: cada escritura lo borra entero (desgaste) y un
+# corte de luz a mitad puede perder el snapshot (arranque en frío).
+snapshot = Snapshot(NvmStore(microcontroller.nvm), keeper, mqtt_manager=mqtt_manager)
+warm_start = snapshot.restore()
+
+manager = main_region.manager
 manager.add_view(clock_view)
-manager.add_view(homeassistant_view)
+if SPLIT_SCREEN or PANELS > 1:
+    if SPLIT_SCREEN:
+        value_region = layout.add_area("value", 0, display.height // 2, display.width,
+                                       display.height // 2, interval=None)
+    else:
+        value_region = layout.add_region("side", 1, span=PANELS - 1, interval=None)
+    homeassistant_view = YoutubeView(
+        palette, font, value_region, mqtt_manager, "matrix/youtube", theme=theme)
+    value_region.manager.add_view(homeassistant_view)
+    value_region.manager.set_view(0)
+    # Solo se actualiza cuando llega un valor (y mientras se desplaza)
+    mqtt_manager.add_listener("matrix/youtube", value_region.wake)
+else:
+    homeassistant_view = YoutubeView(
+        palette, font, main_region, mqtt_manager, "matrix/youtube", theme=theme)
+    manager.add_view(homeassistant_view)
 
 # set view manager in mqtt to change views
 mqtt_manager.set_view_manager(manager)
 
-# Show the first view (clock)
-manager.set_view(0)
+# Show the first view (clock), or the one saved in the snapshot
+first_view = 0
+if warm_start and warm_start["view"] is not None and warm_start["view"] < len(manager.views):
+    first_view = warm_start["view"]
+manager.set_view(first_view)
+snapshot.manager = manager
+
+# Cambios de vista animados (matrix/view, rotación). Slide saca las
+# vistas por los bordes de la región, así que solo con una región que
+# ocupa todo el display; si tiene vecinas, fundido a negro.
+TRANSITION_TIME = 0.4          # segundos; None para cambio instantáneo
+TRANSITION_FPS = 30
+if TRANSITION_TIME:
+    if PANELS == 1 and not SPLIT_SCREEN:
+        manager.transition = Slide(TRANSITION_TIME, TRANSITION_FPS)
+    else:
+        manager.transition = Fade(TRANSITION_TIME, TRANSITION_FPS)
+if warm_start:
+    clock_view.prepare(time.localtime(keeper.now()[0]))
+    clock_view.commit()
+compositor.frame()
 
 # ---------------------
 # 3) Main Loop
 # ---------------------
-# variable para refrescar tiempo NTP
-ntp_refresh_time = None
-
-# variable para cambiar de vista
-view_switch_time = None
-
-while True:
-    # 1) Actualizar hora si pasan 900 seg
-    if (not ntp_refresh_time) or ((time.monotonic() - ntp_refresh_time) > 900):
-        try:
-            print("Obtaining time from Adafruit IO server...")
-            matrixportal.get_local_time()
-            ntp_refresh_time = time.monotonic()
-        except RuntimeError as e:
-            print("Unable to obtain time, retrying -", e)
-            continue
-
-    # 2) Actualizar la vista actual
-    manager.update()
-
-    # 3) Procesar MQTT
-    mqtt_manager.loop()
-
-    # 4) Cambiar de vista cada 10 segundos
-    # if (not view_switch_time) or ((time.monotonic() - view_switch_time) > 10):
-    #     manager.next_view()
-    #     # Reiniciamos el tiempo de cambio para que se cumplan
-    #     # otros 10 segundos antes de cambiar de nuevo
-    #     view_switch_time = time.monotonic()
-
-    time.sleep(0.2)
+# Cada tarea corre con su propio periodo y el loop duerme justo hasta
+# la siguiente que toque, en lugar de despertar cada 0.2 s.
+VIEW_UPDATE_INTERVAL = 0.2     # refresco de la vista actual
+MQTT_POLL_INTERVAL = 0.1       # procesar mensajes MQTT
+HIDDEN_REFRESH_INTERVAL = 1    # mantener listas las vistas ocultas
+VIEW_SWITCH_INTERVAL = None    # p.ej. 10 para rotar vistas automáticamente
+USE_ASYNCIO = False            # True: WiFi/NTP, MQTT y render como tareas asyncio
+STATS_ENABLED = True           # False: sin instrumentación (cero overhead)
+STATS_INTERVAL = 60            # publicar percentiles en STATS_TOPIC
+STATS_TOPIC = "matrix/stats"
+SNAPSHOT_INTERVAL = 60         # revisar si toca guardar (escribe como mucho cada 10 min)
+YOUTUBE_CHANNEL_ID = "UCjhbs3YjA7CPUw0-Dgb3f2A"  # Reemplaza con el ID de tu canal
+YOUTUBE_TTL = 300              # segundos entre consultas a la API (con ETag: 304 si no cambió)
+RECORD_PATH = None             # p.ej. "/mqtt.log" para grabar el tráfico MQTT (requiere
+                               # el filesystem escribible desde boot.py)
+
+if RECORD_PATH:
+    # Se reproduce en el host con bench.py --replay
+    from mqtt_recorder import MqttRecorder
+    MqttRecorder(RECORD_PATH).attach(mqtt_manager)
+
+# Tiempos por etapa en buffers circulares fijos (no asigna memoria)
+instruments = Instruments(mqtt_manager, STATS_TOPIC, enabled=STATS_ENABLED)
+
+# Se recolecta antes de tiempo en el hueco antes del siguiente tick
+# (después del refresh); el GC automático queda encendido pero con umbral
+# alto, para que no caiga en medio de un render
+memory = MemoryManager(instruments)
+
+# Suscriptores de YouTube por la API (si hay clave en secrets): se
+# entregan en el mismo topic que manda Home Assistant
+sources = None
+if "youtube-key" in secrets:
+    sources = DataSources(requests, mqtt_manager)
+    sources.add(HttpSource(
+        "youtube",
+        "https://youtube.googleapis.com/youtube/v3/channels?part=statistics&id=%s&key=%s"
+        % (YOUTUBE_CHANNEL_ID, secrets["youtube-key"]),
+        "matrix/youtube",
+        {"state": "subscriberCount"},
+        ttl=YOUTUBE_TTL,
+    ))
+
+
+def refresh_time():
+    """Sincronizar la hora con el servidor; devuelve cuándo repetir."""
+    try:
+        print("Obtaining time from Adafruit IO server...")
+        reply = matrixportal.get_local_time()
+    except RuntimeError as e:
+        print("Unable to obtain time, retrying -", e)
+        return keeper.sync_failed()  # espera exponencial entre reintentos
+    # La respuesta trae milisegundos. El keeper corrige la hora mostrada
+    # poco a poco (sin saltos) y decide cuándo volver a preguntar.
+    keeper.add_sample(*parse_time_reply(reply))
+    return keeper.sync_interval
+
+
+if USE_ASYNCIO:
+    from async_runtime import AsyncRuntime
+
+    runtime = AsyncRuntime(
+        manager,
+        mqtt_manager,
+        matrixportal,
+        esp=esp,
+        secrets=secrets,
+        ntp_interval=NTP_REFRESH_INTERVAL,
+        ntp_retry=NTP_RETRY_INTERVAL,
+        view_interval=VIEW_UPDATE_INTERVAL,
+        mqtt_interval=MQTT_POLL_INTERVAL,
+        hidden_interval=HIDDEN_REFRESH_INTERVAL,
+        switch_interval=VIEW_SWITCH_INTERVAL,
+        ticker=ticker,
+        keeper=keeper,
+        compositor=compositor,
+        layout=layout,
+        theme=theme,
+        sources=sources,
+        instruments=instruments,
+    )
+    # Como con el Scheduler: el primer frame de una transición sale ya
+    manager.on_transition = runtime.wake_render
+    runtime.add("snapshot", snapshot.save, SNAPSHOT_INTERVAL, delay=SNAPSHOT_INTERVAL)
+    runtime.on_idle(memory.idle)
+    if STATS_ENABLED:
+        runtime.add("stats", instruments.publish, STATS_INTERVAL, delay=STATS_INTERVAL)
+        runtime.on_wake(instruments.overshoot)
+    runtime.run()
+
+# -------------------------
+# WiFi + MQTT
+# -------------------------
+# Con USE_ASYNCIO no se llega aquí: la tarea wifi() del runtime conecta
+# (y reconecta) con espera entre intentos, y la tarea mqtt() conecta al
+# broker en cuanto hay WiFi. En CircuitPython cada llamada de red sigue
+# bloqueando el reloj mientras dura (no hay hilos); la acotan sus timeouts.
+print("Connecting to WiFi...")
+while not esp.is_connected:
+    try:
+        esp.connect_AP(secrets["ssid"], secrets["password"])
+    except OSError as e:
+        print("Could not connect to AP, retrying:", e)
+        continue
+print("Connected to:", esp.ap_info.ssid)
+print("My IP address is", esp.ipv4_address)
+
+mqtt_manager.connect()  # si falla, loop() reintenta por su cuenta
+
+scheduler = Scheduler()
+scheduler.add("ntp", instruments.timed("ntp", refresh_time), NTP_REFRESH_INTERVAL)
+scheduler.add("tick", ticker.tick, 1)
+scheduler.add("view", instruments.timed("update", layout.update), VIEW_UPDATE_INTERVAL)
+# El primer frame de una transición sale en la siguiente pasada, no al
+# cumplirse VIEW_UPDATE_INTERVAL
+manager.on_transition = lambda: scheduler.wake("view")
+scheduler.add("mqtt", instruments.timed("mqtt", mqtt_manager.loop), MQTT_POLL_INTERVAL)
+scheduler.add("hidden", layout.refresh_hidden, HIDDEN_REFRESH_INTERVAL)
+scheduler.add("theme", theme.update, theme.max_wait)
+if VIEW_SWITCH_INTERVAL:
+    scheduler.add("rotate", manager.next_view, VIEW_SWITCH_INTERVAL,
+                  delay=VIEW_SWITCH_INTERVAL)
+# Un solo refresh por vuelta, justo antes de dormir
+scheduler.on_idle(compositor.frame)
+scheduler.on_idle(memory.idle)
+if sources:
+    scheduler.add("sources", sources.poll, YOUTUBE_TTL)
+scheduler.add("snapshot", snapshot.save, SNAPSHOT_INTERVAL, delay=SNAPSHOT_INTERVAL)
+if STATS_ENABLED:
+    scheduler.add("stats", instruments.publish, STATS_INTERVAL, delay=STATS_INTERVAL)
+    scheduler.on_wake(instruments.overshoot)
+
+scheduler.run_forever()
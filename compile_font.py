@@ -0,0 +1,109 @@
+"""
+Offline converter from BDF to the packed glyph format read by packed_font.py.
+
+Runs on the host, not on the board:
+
+    python compile_font.py RetroGaming-11.bdf RetroGaming-18.bdf
+
+writes RetroGaming-11.pgf and RetroGaming-18.pgf next to the inputs.
+"""
+import os
+import struct
+import sys
+
+import simulator
+
+simulator.install()
+
+from packed_font import ENTRY, ENTRY_SIZE, HEADER, HEADER_SIZE, MAGIC  # noqa: E402
+
+
+def parse_bdf(path):
+    """Return (bounding box, ascent, descent, glyphs) with glyphs keyed by code point."""
+    boundingbox = (0, 0, 0, 0)
+    ascent = descent = 0
+    glyphs = {}
+    code = None
+    rows = None
+    with open(path, "rb") as f:
+        for line in f:
+            parts = line.split()
+            if not parts:
+                continue
+            key = parts[0]
+            if key == b"FONTBOUNDINGBOX":
+                boundingbox = tuple(int(v) for v in parts[1:5])
+            elif key == b"FONT_ASCENT":
+                ascent = int(parts[1])
+            elif key == b"FONT_DESCENT":
+                descent = int(parts[1])
+            elif key == b"ENCODING":
+                code = int(parts[1])
+                glyph = {"shift": (0, 0), "bbx": (0, 0, 0, 0)}
+            elif code is None:
+                continue
+            elif key == b"DWIDTH":
+                glyph["shift"] = (int(parts[1]), int(parts[2]))
+            elif key == b"BBX":
+                glyph["bbx"] = tuple(int(v) for v in parts[1:5])
+            elif key == b"BITMAP":
+                rows = []
+            elif key == b"ENDCHAR":
+                glyph["rows"] = rows or []
+                # Skip unencoded glyphs and anything outside the BMP
+                if 0 <= code <= 0xFFFF:
+                    glyphs[code] = glyph
+                code = None
+                rows = None
+            elif rows is not None:
+                rows.append(parts[0])
+    return boundingbox, ascent, descent, glyphs
+
+
+def pack_rows(hex_rows, width):
+    """BDF hex rows -> rows of (width + 7) // 8 bytes, MSB first."""
+    stride = (width + 7) // 8
+    packed = bytearray()
+    for row in hex_rows:
+        value = int(row, 16)
+        extra = len(row) * 4 - stride * 8
+        if extra > 0:
+            value >>= extra
+        else:
+            value <<= -extra
+        packed += value.to_bytes(stride, "big")
+    return bytes(packed)
+
+
+def compile_font(bdf_path, out_path):
+    boundingbox, ascent, descent, glyphs = parse_bdf(bdf_path)
+    codes = sorted(glyphs)
+    data_start = HEADER_SIZE + ENTRY_SIZE * len(codes)
+
+    index = bytearray()
+    data = bytearray()
+    for code in codes:
+        glyph = glyphs[code]
+        width, height, dx, dy = glyph["bbx"]
+        shift_x, shift_y = glyph["shift"]
+        index += struct.pack(ENTRY, code, data_start + len(data), width, height,
+                             dx, dy, shift_x, shift_y)
+        data += pack_rows(glyph["rows"][:height], width)
+
+    bw, bh, bx, by = boundingbox
+    with open(out_path, "wb") as f:
+        f.write(struct.pack(HEADER, MAGIC, len(codes), bw, bh, bx, by, ascent, descent))
+        f.write(index)
+        f.write(data)
+    return len(codes), os.path.getsize(bdf_path), data_start + len(data)
+
+
+def main(paths):
+    for bdf_path in paths:
+        out_path = os.path.splitext(bdf_path)[0] + ".pgf"
+        count, before, after = compile_font(bdf_path, out_path)
+        print("%s: %d glyphs, %d -> %d bytes" % (out_path, count, before, after))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:] or ["RetroGaming-11.bdf", "RetroGaming-18.bdf"])
@@ -0,0 +1,127 @@
+from array import array
+
+
+class Compositor:
+    """
+    Sits between the views and the display and decides when to refresh.
+
+    Views report the rectangles they changed with invalidate(); frame()
+    merges them and calls display.refresh() once, and only if something
+    changed. auto_refresh is turned off so displayio never pushes a frame
+    on its own. Stats count the pixels each refresh covered and, on a
+    chain of ``panel_width`` wide panels, how often each panel changed.
+    """
+
+    def __init__(self, display, max_rects=8, panel_width=64):
+        self.display = display
+        self.display.auto_refresh = False
+        self.max_rects = max_rects
+        self.panel_width = panel_width
+        self.panel_refreshes = [0] * max(1, -(-display.width // panel_width))
+
+        # Dirty rectangles as (x0, y0, x1, y1), exclusive ends
+        self._rects = array("h", [0] * (4 * max_rects))
+        self._count = 0
+
+        self.frames = 0             # frame() calls
+        self.refreshes = 0          # frames that pushed anything
+        self.pixels_pushed = 0
+        self.last_pixels = 0
+        self.max_pixels = 0
+
+    def invalidate(self, x, y, width, height):
+        """Mark a rectangle of the display as changed."""
+        x0 = max(0, x)
+        y0 = max(0, y)
+        x1 = min(self.display.width, x + width)
+        y1 = min(self.display.height, y + height)
+        if x0 >= x1 or y0 >= y1:
+            return
+        self._add(x0, y0, x1, y1)
+
+    def invalidate_all(self):
+        """Mark the whole display as changed (e.g. after a view switch)."""
+        self._count = 0
+        self._add(0, 0, self.display.width, self.display.height)
+
+    def _add(self, x0, y0, x1, y1):
+        r = self._rects
+        # Grow any rectangle this one touches, then fold the result back in
+        i = 0
+        while i < self._count:
+            j = i * 4
+            if x0 <= r[j + 2] and r[j] <= x1 and y0 <= r[j + 3] and r[j + 1] <= y1:
+                x0 = min(x0, r[j])
+                y0 = min(y0, r[j + 1])
+                x1 = max(x1, r[j + 2])
+                y1 = max(y1, r[j + 3])
+                self._remove(i)
+                i = 0
+                continue
+            i += 1
+        if self._count == self.max_rects:
+            # Out of slots: collapse everything into one bounding rectangle
+            for i in range(self._count):
+                j = i * 4
+                x0 = min(x0, r[j])
+                y0 = min(y0, r[j + 1])
+                x1 = max(x1, r[j + 2])
+                y1 = max(y1, r[j + 3])
+            self._count = 0
+        j = self._count * 4
+        r[j] = x0
+        r[j + 1] = y0
+        r[j + 2] = x1
+        r[j + 3] = y1
+        self._count += 1
+
+    def _remove(self, i):
+        last = (self._count - 1) * 4
+        j = i * 4
+        r = self._rects
+        r[j] = r[last]
+        r[j + 1] = r[last + 1]
+        r[j + 2] = r[last + 2]
+        r[j + 3] = r[last + 3]
+        self._count -= 1
+
+    @property
+    def dirty(self):
+        """True if something was invalidated since the last refresh."""
+        return self._count > 0
+
+    def frame(self, slack=None):
+        """Refresh once if anything was invalidated. Returns True if it did."""
+        self.frames += 1
+        if not self._count:
+            return False
+        r = self._rects
+        pixels = 0
+        panels = 0
+        for i in range(self._count):
+            j = i * 4
+            pixels += (r[j + 2] - r[j]) * (r[j + 3] - r[j + 1])
+            for panel in range(r[j] // self.panel_width, (r[j + 2] - 1) // self.panel_width + 1):
+                panels |= 1 << panel
+        self._count = 0
+        for panel in range(len(self.panel_refreshes)):
+            if panels >> panel & 1:
+                self.panel_refreshes[panel] += 1
+
+        self.display.refresh()
+        self.refreshes += 1
+        self.pixels_pushed += pixels
+        self.last_pixels = pixels
+        if pixels > self.max_pixels:
+            self.max_pixels = pixels
+        return True
+
+    def stats(self):
+        return {
+            "frames": self.frames,
+            "refreshes": self.refreshes,
+            "pixels_pushed": self.pixels_pushed,
+            "pixels_per_refresh": self.pixels_pushed // self.refreshes if self.refreshes else 0,
+            "max_pixels": self.max_pixels,
+            "panel_refreshes": list(self.panel_refreshes),
+        }
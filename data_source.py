@@ -0,0 +1,254 @@
+"""
+Polled HTTP data sources (e.g. the YouTube subscriber count) whose
+results are delivered into the MqttManager's topic store, so views read
+them exactly like MQTT topics.
+
+All sources share one ``adafruit_requests.Session``, which keeps the
+socket to each host open between requests. Each source has its own TTL
+and remembers the ETag of its last response: the next request carries
+If-None-Match, and a 304 costs no body at all. Bodies are not parsed as
+a whole; extract_fields() scans the response as it streams in for just
+the keys the source needs and stops reading once it has them.
+
+A request blocks for at most its source's ``timeout``. request() and
+deliver() are separate so AsyncRuntime can run only the first off the loop.
+"""
+import json
+import time
+from adafruit_requests import OutOfRetries
+
+# Byte values, as ints: MicroPython has no ``int in bytes``
+_SPACE = (0x20, 0x09, 0x0D, 0x0A)                  # " \t\r\n"
+_OPEN = (0x7B, 0x5B)                               # "{["
+_VALUE_END = (0x2C, 0x7D, 0x5D) + _SPACE           # ",}]" and whitespace
+
+
+def _scalar(buf, pos):
+    """
+    The JSON scalar after a key that ends at ``pos``: (value, True),
+    (None, None) if the buffer ends before it does, or (None, False) if
+    the key is not followed by a scalar (an object, or it was a value).
+    """
+    size = len(buf)
+    while pos < size and buf[pos] in _SPACE:
+        pos += 1
+    if pos >= size:
+        return None, None
+    if buf[pos] != 0x3A:  # ":"
+        return None, False
+    pos += 1
+    while pos < size and buf[pos] in _SPACE:
+        pos += 1
+    if pos >= size:
+        return None, None
+    first = buf[pos]
+    if first in _OPEN:
+        return None, False
+    if first == 0x22:  # '"'
+        end = pos + 1
+        while True:
+            end = buf.find(b'"', end)
+            if end < 0:
+                return None, None
+            escapes = 0
+            while buf[end - 1 - escapes] == 0x5C:  # "\"
+                escapes += 1
+            if escapes % 2 == 0:
+                break
+            end += 1
+        end += 1
+    else:
+        end = pos
+        while end < size and buf[end] not in _VALUE_END:
+            end += 1
+        if end >= size:
+            return None, None
+    return json.loads(str(buf[pos:end], "utf-8")), True
+
+
+def extract_fields(chunks, keys, max_value=64):
+    """
+    Scan JSON arriving as byte ``chunks`` for the first scalar value of
+    each of ``keys``, at any depth, and stop as soon as all are found.
+    Only a tail of ``max_value`` bytes plus the longest key is kept
+    between chunks, so longer values are not found. Returns {key: value}
+    for the keys seen.
+    """
+    found = {}
+    patterns = [(key, b'"' + key.encode("utf-8") + b'"') for key in keys]
+    keep = max(len(pattern) for _, pattern in patterns) + max_value
+    buf = b""
+    for chunk in chunks:
+        buf += chunk
+        for key, pattern in patterns:
+            if key in found:
+                continue
+            start = buf.find(pattern)
+            while start >= 0:
+                value, ok = _scalar(buf, start + len(pattern))
+                if ok:
+                    found[key] = value
+                    break
+                if ok is None:
+                    break  # wait for more data
+                start = buf.find(pattern, start + 1)
+        if len(found) == len(patterns):
+            break
+        if len(buf) > keep:
+            buf = buf[-keep:]
+    return found
+
+
+def _header(response, name):
+    for key, value in response.headers.items():
+        if key.lower() == name:
+            return value
+    return None
+
+
+class HttpSource:
+    """
+    A URL polled every ``ttl`` seconds. ``fields`` maps the names put in
+    the payload to the JSON keys to extract, e.g. {"state":
+    "subscriberCount"}; the payload delivered to ``topic`` is those
+    names and values as JSON. A request gives up after ``timeout`` seconds.
+    """
+
+    def __init__(self, name, url, topic, fields, ttl=300, headers=None, chunk_size=256,
+                 timeout=5):
+        self.name = name
+        self.url = url
+        self.topic = topic
+        self.fields = fields
+        self.ttl = ttl
+        self.headers = headers or {}
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+
+        self.etag = None
+        self.next_due = 0
+        self.retry_delay = None
+
+        self.fetches = 0
+        self.not_modified = 0
+        self.updates = 0
+        self.failures = 0
+        self.last_status = None
+
+    def stats(self):
+        return {
+            "fetches": self.fetches,
+            "not_modified": self.not_modified,
+            "updates": self.updates,
+            "failures": self.failures,
+            "last_status": self.last_status,
+        }
+
+
+class DataSources:
+    """
+    Fetches due HttpSources, one per poll(), and delivers their results
+    with ``mqtt_manager.inject()``. A failed fetch is retried after
+    ``retry`` seconds, doubling up to the source's TTL.
+    """
+
+    def __init__(self, session, mqtt_manager, min_gap=1.0, retry=30):
+        self.session = session
+        self.mqtt_manager = mqtt_manager
+        self.min_gap = min_gap
+        self.retry = retry
+        self.sources = []
+
+    def add(self, source):
+        self.sources.append(source)
+        return source
+
+    def poll(self):
+        """Fetch the most overdue source; returns the seconds until the next one is due."""
+        source = self.due()
+        if source is not None:
+            self.fetch(source)
+        return self.next_delay()
+
+    def due(self):
+        """The most overdue source, or None."""
+        now = time.monotonic()
+        due = None
+        for source in self.sources:
+            if source.next_due <= now and (due is None or source.next_due < due.next_due):
+                due = source
+        return due
+
+    def next_delay(self):
+        if not self.sources:
+            return None
+        wait = min(source.next_due for source in self.sources) - time.monotonic()
+        return max(self.min_gap, wait)
+
+    def fetch(self, source):
+        """Request ``source`` now. Returns True if it delivered a new payload."""
+        return self.deliver(source, self.request(source))
+
+    def request(self, source):
+        """
+        The network half of fetch(): the payload to deliver, or None.
+        Only touches ``source``, so it may run on a worker thread.
+        """
+        source.fetches += 1
+        headers = dict(source.headers)
+        if source.etag:
+            headers["If-None-Match"] = source.etag
+        try:
+            response = self.session.get(source.url, headers=headers, stream=True,
+                                        timeout=source.timeout)
+            try:
+                source.last_status = response.status_code
+                if response.status_code == 304:
+                    source.not_modified += 1
+                    self._done(source)
+                    return None
+                if response.status_code != 200:
+                    raise RuntimeError("HTTP %d" % response.status_code)
+                etag = _header(response, "etag")
+                keys = list(source.fields.values())
+                found = extract_fields(response.iter_content(source.chunk_size), keys)
+            finally:
+                # Reads what is left so the socket can be reused
+                response.close()
+        except (OSError, RuntimeError, ValueError, OutOfRetries) as e:
+            self._failed(source, e)
+            return None
+
+        values = {}
+        for name, key in source.fields.items():
+            if key in found:
+                values[name] = found[key]
+        if not values:
+            self._failed(source, "no fields in response")
+            return None
+        source.etag = etag
+        self._done(source)
+        return json.dumps(values)
+
+    def deliver(self, source, payload):
+        """Hand request()'s result to the topic store. Returns True if it changed."""
+        if payload is None:
+            return False
+        if self.mqtt_manager.inject(source.topic, payload):
+            source.updates += 1
+            return True
+        return False
+
+    def _done(self, source):
+        source.retry_delay = None
+        source.next_due = time.monotonic() + source.ttl
+
+    def _failed(self, source, error):
+        source.failures += 1
+        print("Data source", source.name, "failed -", error)
+        delay = self.retry if source.retry_delay is None else source.retry_delay * 2
+        source.retry_delay = min(delay, source.ttl)
+        source.next_due = time.monotonic() + source.retry_delay
+
+    def stats(self):
+        return {source.name: source.stats() for source in self.sources}
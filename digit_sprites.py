@@ -0,0 +1,61 @@
+import displayio
+
+# Sprite sheet order: digits 0-9, then colon and space
+CHARS = "0123456789: "
+COLON = 10
+SPACE = 11
+
+
+def ascent_descent(font):
+    """Ascent and descent the same way adafruit_display_text's Label measures them."""
+    ascent = 0
+    descent = 0
+    for char in "M j'":
+        glyph = font.get_glyph(ord(char))
+        if glyph:
+            ascent = max(ascent, glyph.height + glyph.dy)
+            descent = max(descent, -glyph.dy)
+    return ascent, descent
+
+
+class DigitSprites:
+    """
+    Pre-rasterizes the clock characters of a font into one sprite sheet.
+
+    Each character gets a cell of the same size; ``left[i]``, ``advance[i]``
+    and ``right[i]`` keep the glyph metrics needed to place cells exactly where
+    a Label would draw the same glyphs.
+    """
+
+    def __init__(self, font, palette):
+        self.ascent, self.descent = ascent_descent(font)
+        glyphs = [font.get_glyph(ord(char)) for char in CHARS]
+
+        # Shift every cell right if a glyph draws left of its origin
+        self.origin_x = -min(0, min(g.dx for g in glyphs))
+        self.tile_width = max(self.origin_x + g.dx + g.width for g in glyphs)
+        self.tile_height = self.ascent + self.descent
+        self.left = [g.dx for g in glyphs]
+        self.advance = [g.shift_x for g in glyphs]
+        self.right = [max(g.shift_x, g.dx + g.width) for g in glyphs]
+
+        self.bitmap = displayio.Bitmap(
+            self.tile_width * len(CHARS), self.tile_height, 2)
+        for index, glyph in enumerate(glyphs):
+            left = index * self.tile_width + self.origin_x + glyph.dx
+            top = self.ascent - glyph.height - glyph.dy
+            for y in range(glyph.height):
+                for x in range(glyph.width):
+                    if glyph.bitmap[x, y]:
+                        self.bitmap[left + x, top + y] = 1
+
+        self.palette = palette
+
+    def tile_grid(self):
+        """A one-cell TileGrid over the sheet, to be placed per character slot."""
+        return displayio.TileGrid(
+            self.bitmap,
+            pixel_shader=self.palette,
+            tile_width=self.tile_width,
+            tile_height=self.tile_height,
+        )
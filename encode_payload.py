@@ -0,0 +1,45 @@
+"""
+Encoder for the binary payload format (payload_codec.py), for the Home
+Assistant side. Runs on the host, not on the board.
+
+Each argument becomes one field: integers, floats, true/false/null, and
+anything else as a string. The payload goes to stdout, so it pipes
+straight into mosquitto_pub:
+
+    python encode_payload.py 12345 | mosquitto_pub -t matrix/youtube -s
+
+From Home Assistant, call it from a shell_command with the entity state
+as the argument. --hex prints the payload as hex instead.
+"""
+import sys
+
+from payload_codec import encode
+
+
+def parse_value(text):
+    if text == "true":
+        return True
+    if text == "false":
+        return False
+    if text == "null":
+        return None
+    for kind in (int, float):
+        try:
+            return kind(text)
+        except ValueError:
+            pass
+    return text
+
+
+def main(args):
+    as_hex = "--hex" in args
+    values = [parse_value(arg) for arg in args if arg != "--hex"]
+    payload = encode(*values)
+    if as_hex:
+        print(payload.hex())
+    else:
+        sys.stdout.buffer.write(payload)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
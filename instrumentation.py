@@ -0,0 +1,110 @@
+import gc
+import json
+import time
+from array import array
+
+# supervisor.ticks_ms() wraps at 2**29 so it always stays a small int
+_TICKS_MASK = (1 << 29) - 1
+
+try:
+    from supervisor import ticks_ms as _ticks_ms
+except ImportError:
+    def _ticks_ms():
+        return (time.monotonic_ns() // 1000000) & _TICKS_MASK
+
+STAGES = ("ntp", "update", "mqtt", "overshoot", "gc", "mem_free",
+          "largest_free", "fragmentation")
+
+
+class Ring:
+    """Fixed-size ring buffer of integer samples."""
+
+    def __init__(self, size):
+        self.values = array("l", [0] * size)
+        self.count = 0
+
+    def add(self, value):
+        self.values[self.count % len(self.values)] = value
+        self.count += 1
+
+    def summary(self):
+        """[p50, p90, p99, max, total samples] over the samples kept, or None."""
+        n = min(self.count, len(self.values))
+        if not n:
+            return None
+        recent = sorted(self.values[:n])
+        return [
+            recent[n // 2],
+            recent[n * 9 // 10],
+            recent[n * 99 // 100],
+            recent[-1],
+            self.count,
+        ]
+
+
+class Instruments:
+    """
+    Per-stage timings of the main loop, kept in preallocated rings.
+
+    Durations are integer milliseconds from supervisor.ticks_ms(), which
+    never allocates; recording a sample is an array store. publish()
+    summarizes every ring as percentiles and sends it on ``topic`` through
+    the MqttManager, and that is the only place anything is allocated.
+    With ``enabled=False`` timed() hands back the callback untouched and
+    nothing is recorded or published.
+    """
+
+    def __init__(self, mqtt_manager=None, topic="matrix/stats", size=64, enabled=True):
+        self.mqtt_manager = mqtt_manager
+        self.topic = topic
+        self.enabled = enabled
+        self.rings = {}
+        if enabled:
+            for name in STAGES:
+                self.rings[name] = Ring(size)
+        self.publishes = 0
+
+    def record(self, name, value):
+        if self.enabled:
+            self.rings[name].add(value)
+
+    def timed(self, name, callback):
+        """Wrap a no-argument callback so each call's duration lands in ``name``."""
+        if not self.enabled:
+            return callback
+        ring = self.rings[name]
+
+        def run():
+            start = _ticks_ms()
+            result = callback()
+            ring.add((_ticks_ms() - start) & _TICKS_MASK)
+            return result
+
+        return run
+
+    def overshoot(self, seconds):
+        """Scheduler wake hook: how late the loop woke up after a sleep."""
+        if self.enabled:
+            self.rings["overshoot"].add(int(seconds * 1000))
+
+    def sample_memory(self):
+        if self.enabled and hasattr(gc, "mem_free"):
+            self.rings["mem_free"].add(gc.mem_free())
+
+    def summary(self):
+        """Percentiles of every stage that has samples."""
+        result = {}
+        for name in STAGES:
+            ring = self.rings.get(name)
+            values = ring.summary() if ring else None
+            if values:
+                result[name] = values
+        return result
+
+    def publish(self):
+        """Send summary() as compact JSON on the stats topic."""
+        if not self.enabled or not self.mqtt_manager:
+            return
+        self.sample_memory()
+        self.mqtt_manager.publish(self.topic, json.dumps(self.summary()))
+        self.publishes += 1
@@ -0,0 +1,211 @@
+import time
+import displayio
+from view_manager import ViewManager
+
+
+class Region:
+    """
+    A rectangle of a chained display that looks like a small display of
+    its own to the views placed in it.
+
+    Views get the region as their ``display``: they lay out against its
+    width and height and append to its root_group, which the layout has
+    placed at (x, y). The region is also what their ViewManager reports
+    invalidations to; it clips them to its bounds and forwards them to the
+    layout's compositor in display coordinates, so a view switch only
+    invalidates this region. ``changes`` counts those reports.
+
+    ``interval`` is how often PanelLayout.update() updates the region's
+    view: 0 on every call, a number of seconds, or None for only when
+    woken with wake() (which can be an MqttManager listener as is) or a
+    view switch. A delay returned by the view's update() overrides it
+    for that one wait, so an animation runs at its own rate.
+    """
+
+    def __init__(self, name, x, y, width, height, compositor=None, background=0x000000,
+                 interval=0):
+        self.name = name
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.compositor = compositor
+        self.interval = interval
+        self.changes = 0
+        self.updates = 0
+
+        # None: due on every pass; otherwise monotonic time it is due
+        self.next_due = None if interval == 0 else 0
+        self.idle = False           # waiting for wake()
+
+        self.root_group = displayio.Group(x=x, y=y)
+        if background is not None:
+            # Opaque backdrop: hides whatever a neighbour draws past its edge
+            bitmap = displayio.Bitmap(1, 1, 1)
+            palette = displayio.Palette(1)
+            palette[0] = background
+            self.root_group.append(displayio.TileGrid(
+                bitmap, pixel_shader=palette, width=width, height=height,
+                tile_width=1, tile_height=1))
+
+        self.manager = ViewManager(self, self)
+
+    def invalidate(self, x, y, width, height):
+        x0 = max(0, x)
+        y0 = max(0, y)
+        x1 = min(self.width, x + width)
+        y1 = min(self.height, y + height)
+        if x0 >= x1 or y0 >= y1:
+            return
+        self.changes += 1
+        if self.compositor:
+            self.compositor.invalidate(self.x + x0, self.y + y0, x1 - x0, y1 - y0)
+
+    def invalidate_all(self):
+        # A view switch: the new view gets an update even if idle
+        self.wake()
+        self.invalidate(0, 0, self.width, self.height)
+
+    def wake(self, *args):
+        """Update the view on the next pass (arguments are ignored)."""
+        self.idle = False
+        self.next_due = 0
+
+    def due(self, now):
+        if self.idle:
+            return False
+        return self.next_due is None or self.next_due <= now
+
+    def update(self, now):
+        wait = self.manager.update()
+        self.updates += 1
+        if wait is None:
+            wait = self.interval
+        if wait is None:
+            self.idle = True
+        elif wait == 0:
+            self.next_due = None
+        else:
+            self.next_due = now + wait
+
+
+class PanelLayout:
+    """
+    Splits a chain of ``panel_width`` x ``panel_height`` matrices into
+    regions, each with its own ViewManager.
+
+    add_region() claims ``span`` panels starting at ``panel`` (or any
+    rectangle with add_area()). Regions are stacked right to left, so the
+    backdrop of a region covers anything a region to its right draws past
+    its left edge (a scrolling Marquee, say); content that can spill to
+    the right belongs in the rightmost region. update() drives the
+    regions that are due (see Region) and refresh_hidden() all of them;
+    since views only invalidate what they change, the compositor
+    refreshes only the panels that did.
+
+    With ``budget`` (seconds) an update() pass stops starting region
+    updates once it has run that long; the regions left over are due
+    first on the next pass. update() never asks to run again sooner than
+    1 / ``max_fps`` seconds, so regions that are due close together share
+    a pass, and with a budget the layout's share of the CPU stays bounded
+    however many regions there are.
+    """
+
+    def __init__(self, display, panel_width=64, panel_height=32, compositor=None,
+                 budget=None, max_fps=30):
+        self.display = display
+        self.panel_width = panel_width
+        self.panel_height = panel_height
+        self.compositor = compositor
+        self.budget = budget
+        self.min_delay = 1 / max_fps
+        self.columns = max(1, display.width // panel_width)
+        self.rows = max(1, display.height // panel_height)
+        self.regions = []
+        self._next = 0              # region the next pass starts from
+
+        self.passes = 0
+        self.budget_exhausted = 0   # passes cut short by the budget
+
+    @property
+    def panels(self):
+        return self.columns * self.rows
+
+    def add_region(self, name, panel=0, span=1, interval=0):
+        """A region covering ``span`` panels of one row, from ``panel`` on."""
+        column = panel % self.columns
+        if column + span > self.columns:
+            raise ValueError("region runs past the end of the chain")
+        return self.add_area(name, column * self.panel_width,
+                             panel // self.columns * self.panel_height,
+                             span * self.panel_width, self.panel_height, interval)
+
+    def add_area(self, name, x, y, width, height, interval=0):
+        """A region over any rectangle of the display (e.g. half a panel)."""
+        region = Region(name, x, y, width, height, self.compositor, interval=interval)
+        self.regions.append(region)
+        # Keep the groups ordered right to left (see class docstring)
+        root = self.display.root_group
+        index = 0
+        for other in self.regions:
+            if other is not region and other.x > region.x:
+                index = max(index, root.index(other.root_group) + 1)
+        root.insert(index, region.root_group)
+        return region
+
+    def region(self, name):
+        for region in self.regions:
+            if region.name == name:
+                return region
+        return None
+
+    def update(self):
+        """
+        Update the regions that are due. Returns the seconds until the
+        next one with a due time is, or None if only every-pass and idle
+        regions are left (the caller's own period applies).
+        """
+        self.passes += 1
+        regions = self.regions
+        count = len(regions)
+        now = time.monotonic()
+        deadline = None
+        if self.budget is not None:
+            deadline = time.monotonic_ns() + int(self.budget * 1000000000)
+        start = self._next
+        for i in range(count):
+            index = (start + i) % count
+            region = regions[index]
+            if not region.due(now):
+                continue
+            if deadline is not None and time.monotonic_ns() >= deadline:
+                self.budget_exhausted += 1
+                self._next = index
+                return self.min_delay
+            region.update(now)
+        return self.next_delay()
+
+    def next_delay(self):
+        due = None
+        for region in self.regions:
+            if region.idle or region.next_due is None:
+                continue
+            if due is None or region.next_due < due:
+                due = region.next_due
+        if due is None:
+            return None
+        return max(self.min_delay, due - time.monotonic())
+
+    def refresh_hidden(self):
+        for region in self.regions:
+            region.manager.refresh_hidden()
+
+    def stats(self):
+        return {
+            "passes": self.passes,
+            "budget_exhausted": self.budget_exhausted,
+            "regions": {
+                region.name: {"changes": region.changes, "updates": region.updates}
+                for region in self.regions
+            },
+        }
@@ -0,0 +1,146 @@
+import time
+import displayio
+from digit_sprites import ascent_descent
+
+
+def _mono_ms():
+    return time.monotonic_ns() // 1000000
+
+
+def render_text(font, text, max_width=1024):
+    """
+    Rasterize ``text`` once into a 1-bit Bitmap, laid out like a Label.
+    Returns (bitmap, left, width); glyphs past ``max_width`` are dropped.
+    """
+    ascent, descent = ascent_descent(font)
+    glyphs = []
+    left = 0
+    right = 0
+    cursor = 0
+    for char in text:
+        glyph = font.get_glyph(ord(char))
+        if glyph is None:
+            continue
+        if cursor + glyph.dx + glyph.width - left > max_width:
+            break
+        glyphs.append((cursor, glyph))
+        left = min(left, cursor + glyph.dx)
+        right = max(right, cursor + glyph.shift_x, cursor + glyph.dx + glyph.width)
+        cursor += glyph.shift_x
+
+    width = right - left
+    height = ascent + descent
+    bitmap = displayio.Bitmap(max(width, 1), max(height, 1), 2)
+    for origin, glyph in glyphs:
+        gx = origin + glyph.dx - left
+        gy = ascent - glyph.height - glyph.dy
+        source = glyph.bitmap
+        for py in range(glyph.height):
+            for px in range(glyph.width):
+                if source[px, py] and 0 <= gy + py < height:
+                    bitmap[gx + px, gy + py] = 1
+    return bitmap, left, width
+
+
+class Marquee:
+    """
+    One line of text that scrolls when it is wider than its window.
+
+    set_text() rasterizes the text once into two TileGrids one period
+    (text + ``gap``) apart; update() only moves them, ``speed`` px/s after
+    a ``hold`` ms pause each cycle, and returns the seconds until the next
+    pixel step, or None when the text fits. ``invalidate(x, y, w, h)`` is
+    told about every change.
+    """
+
+    def __init__(self, font, x=0, y=0, width=64, color=0xFFFFFF, speed=16, gap=16,
+                 hold=1500, invalidate=None):
+        self.font = font
+        self.width = width
+        self.speed = speed
+        self.gap = gap
+        self.hold = hold
+        self.invalidate = invalidate
+
+        self.ascent, self.descent = ascent_descent(font)
+        self.palette = displayio.Palette(2)
+        self.palette.make_transparent(0)
+        self.palette[1] = color
+
+        self.group = displayio.Group(x=x, y=y)
+        self.text = None
+        self.text_width = 0
+        self.scrolling = False
+        self._left = 0
+        self._tiles = []
+        self._offset = 0
+        self._start = 0
+
+    @property
+    def color(self):
+        return self.palette[1]
+
+    @color.setter
+    def color(self, value):
+        self.palette[1] = value
+        self._invalidate()
+
+    def set_text(self, text):
+        """Rasterize a new value and restart the scroll from the beginning."""
+        if text == self.text:
+            return
+        self._invalidate()
+        self.text = text
+        bitmap, self._left, self.text_width = render_text(self.font, text)
+        top = self.ascent // 2 - self.ascent
+        while len(self.group):
+            self.group.pop()
+        self._tiles = []
+        self.scrolling = self._left + self.text_width > self.width
+        for _ in range(2 if self.scrolling else 1):
+            tile = displayio.TileGrid(bitmap, pixel_shader=self.palette, y=top)
+            self._tiles.append(tile)
+            self.group.append(tile)
+        self._offset = 0
+        self._start = _mono_ms()
+        self._place()
+        self._invalidate()
+
+    def _place(self):
+        x = self._left - self._offset
+        for tile in self._tiles:
+            tile.x = x
+            x += self.text_width + self.gap
+
+    def _invalidate(self):
+        if not self.invalidate or self.text is None:
+            return
+        x = self.group.x
+        width = self.width
+        if self.scrolling:
+            # Text scrolled out of the window may still be drawn to its
+            # left, up to the panel edge; the compositor clips the rest
+            x -= self.text_width + self.gap
+            width += self.text_width + self.gap
+        self.invalidate(x, self.group.y + self.ascent // 2 - self.ascent,
+                        width, self.ascent + self.descent)
+
+    def update(self):
+        """Move to where real time says the text should be now."""
+        if not self.scrolling:
+            return None
+        period = self.text_width + self.gap
+        cycle = self.hold + period * 1000 // self.speed
+        t = (_mono_ms() - self._start) % cycle
+        if t < self.hold:
+            offset = 0
+            wait = self.hold - t
+        else:
+            moving = t - self.hold
+            offset = moving * self.speed // 1000
+            wait = ((offset + 1) * 1000 + self.speed - 1) // self.speed - moving
+        if offset != self._offset:
+            self._offset = offset
+            self._place()
+            self._invalidate()
+        return wait / 1000
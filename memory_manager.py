@@ -0,0 +1,152 @@
+import gc
+import time
+
+
+def _mono_ms():
+    return time.monotonic_ns() // 1000000
+
+
+def largest_free_block(limit):
+    """Largest bytearray that can be allocated right now, found by bisection."""
+    low = 0
+    high = limit
+    while low < high:
+        size = (low + high + 1) // 2
+        try:
+            block = bytearray(size)
+        except MemoryError:
+            high = size - 1
+        else:
+            del block
+            low = size
+    return low
+
+
+def _bisect_steps(limit):
+    """Allocations largest_free_block(limit) tries: about log2(limit)."""
+    steps = 0
+    while limit:
+        limit >>= 1
+        steps += 1
+    return steps
+
+
+class MemoryManager:
+    """
+    Runs the garbage collector on purpose, in idle slack.
+
+    idle(slack) collects once ``collect_bytes`` were allocated (or every
+    ``max_interval`` seconds) if the slack covers the average pause, and
+    below ``critical_free`` regardless. Automatic collection stays on as a
+    backstop, its threshold raised to ``auto_bytes`` (default four times
+    ``collect_bytes``). Every ``probe_interval`` seconds probe() measures
+    the largest free block, when the slack also covers the collections
+    its failed allocations cause on MicroPython.
+    """
+
+    def __init__(self, instruments=None, collect_bytes=8192, critical_free=4096,
+                 max_interval=30, margin_ms=5, probe_interval=300, auto_bytes=None):
+        self.instruments = instruments
+        self.collect_bytes = collect_bytes
+        self.critical_free = critical_free
+        self.max_interval = max_interval * 1000
+        self.margin_ms = margin_ms
+        self.probe_interval = probe_interval * 1000
+        self.has_mem_info = hasattr(gc, "mem_free") and hasattr(gc, "mem_alloc")
+
+        gc.enable()
+        if hasattr(gc, "threshold"):
+            gc.threshold(auto_bytes or collect_bytes * 4)
+        gc.collect()
+
+        self._last_collect = _mono_ms()
+        self._last_probe = None
+        self._alloc_after = gc.mem_alloc() if self.has_mem_info else 0
+
+        self.pause_ms = 10          # running average of collection pauses
+        self.max_pause_ms = 0
+        self.collections = 0
+        self.forced = 0             # collected without enough slack
+        self.deferred = 0           # due, but the slack was too short
+        self.overruns = 0           # pauses that ran past the slack
+        self.free = 0
+        self.largest_free = 0
+        self.fragmentation = 0      # permille of free memory not in the largest block
+
+    def pressure(self):
+        """Bytes allocated since the last collection."""
+        if not self.has_mem_info:
+            return 0
+        return gc.mem_alloc() - self._alloc_after
+
+    def idle(self, slack):
+        """Collect if due and ``slack`` seconds allow it."""
+        now = _mono_ms()
+        critical = self.has_mem_info and gc.mem_free() < self.critical_free
+        due = (critical or self.pressure() >= self.collect_bytes
+               or now - self._last_collect >= self.max_interval)
+        if not due:
+            return
+        slack_ms = int(slack * 1000)
+        if slack_ms < self.pause_ms + self.margin_ms:
+            if not critical:
+                self.deferred += 1
+                return
+            self.forced += 1
+        pause = self.collect()
+        if pause > slack_ms:
+            self.overruns += 1
+        if not self.has_mem_info:
+            return
+        if self._last_probe is None or now - self._last_probe >= self.probe_interval:
+            cost = self.pause_ms * (_bisect_steps(gc.mem_free()) // 2 + 1)
+            if slack_ms - pause >= cost:
+                self._last_probe = now
+                self.probe()
+
+    def collect(self):
+        """gc.collect(), timed. Returns the pause in ms."""
+        start = _mono_ms()
+        gc.collect()
+        end = _mono_ms()
+        pause = end - start
+
+        self._last_collect = end
+        self.collections += 1
+        self.pause_ms = (self.pause_ms * 3 + pause + 3) // 4
+        if pause > self.max_pause_ms:
+            self.max_pause_ms = pause
+        if self.has_mem_info:
+            self._alloc_after = gc.mem_alloc()
+            self.free = gc.mem_free()
+        if self.instruments:
+            self.instruments.record("gc", pause)
+            self.instruments.sample_memory()
+        return pause
+
+    def probe(self):
+        """Measure the largest free block against total free memory."""
+        if not self.has_mem_info:
+            return
+        free = gc.mem_free()
+        largest = largest_free_block(free)
+        gc.collect()  # drop the probe's own allocations
+        self.free = free
+        self.largest_free = largest
+        self.fragmentation = 1000 - largest * 1000 // free if free else 0
+        if self.instruments:
+            self.instruments.record("largest_free", largest)
+            self.instruments.record("fragmentation", self.fragmentation)
+
+    def stats(self):
+        return {
+            "collections": self.collections,
+            "forced": self.forced,
+            "deferred": self.deferred,
+            "overruns": self.overruns,
+            "pause_ms": self.pause_ms,
+            "max_pause_ms": self.max_pause_ms,
+            "free": self.free,
+            "largest_free": self.largest_free,
+            "fragmentation_permille": self.fragmentation,
+        }
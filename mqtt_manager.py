@@ -1,27 +1,95 @@
-import json
+import time
+import random
+from collections import OrderedDict
 import adafruit_minimqtt.adafruit_minimqtt as MQTT
+from topic_trie import TopicTrie
+from topic_store import TopicStore
+
+# Estados de la conexión
+DISCONNECTED = "disconnected"
+CONNECTED = "connected"
+
+# Errores que significan "se cayó el enlace"
+LINK_ERRORS = (MQTT.MMQTTException, OSError, RuntimeError)
 
 
 class MqttManager:
     """
     Maneja la conexión MQTT y el almacenamiento de datos para múltiples topics.
+    Si se cae el enlace, loop() reintenta con espera exponencial sin
+    bloquear y, al reconectar, restaura suscripciones y envía la cola offline.
     """
 
-    def __init__(self, broker, port, pool, keep_alive=60):
+    def __init__(self, broker, port, pool, keep_alive=60,
+                 max_topics=32, max_topic_bytes=4096,
+                 drain_budget=None, verbose=True, use_binary_mode=False,
+                 retry=1, max_retry=60, max_offline=16, socket_timeout=1):
         self.broker = broker
         self.port = port
         self.keep_alive = keep_alive
 
-        # Este dict almacenará el último payload de cada topic
-        # clave: topic, valor: lo que se haya recibido
-        self.topic_data = {}
+        # Máquina de estados de la conexión
+        self.state = DISCONNECTED
+        self.retry = retry
+        self.max_retry = max_retry
+        self._retry_delay = retry
+        self._next_attempt = 0
+        self._last_activity = 0
+        self.offline_queue = []    # (topic, payload, retain) sin enviar
+        self.max_offline = max_offline
+
+        # Estadísticas de la conexión
+        self.connects = 0          # conexiones logradas
+        self.failures = 0          # intentos fallidos
+        self.links_lost = 0
+        self.offline_dropped = 0   # publish descartados con la cola llena
+
+        # drain_budget (segundos): loop() lee mensajes hasta vaciar el
+        # socket o agotar el tiempo, y de cada topic aplica solo el
+        # último. None: un solo mqtt_client.loop() por llamada.
+        self.drain_budget = drain_budget
+        self.verbose = verbose
+        self._draining = False
+        self.pending = OrderedDict()
+
+        # Estadísticas del drenado
+        self.received = 0          # mensajes recibidos
+        self.coalesced = 0         # descartados por llegar otro más nuevo
+        self.queue_depth = 0       # topics en la cola al último flush
+        self.max_queue_depth = 0
+        self.budget_exhausted = 0  # drenados cortados por tiempo
+        self.bad_messages = 0      # payloads o listeners que fallaron
+
+        # Grabador opcional (mqtt_recorder.MqttRecorder): guarda cada
+        # mensaje recibido para reproducirlo después en el simulador.
+        self.recorder = None
+
+        # Último payload de cada topic, guardado en crudo. El JSON se
+        # decodifica solo cuando alguien lo lee; si se llena, se
+        # descartan los topics menos usados (LRU).
+        self.topic_data = TopicStore(max_topics, max_topic_bytes)
 
-        # Creamos el cliente MQTT de Adafruit MiniMQTT
+        # Callbacks registradas por filtro de topic (admite "+" y "#").
+        # Se llaman solo cuando el valor de un topic cambia.
+        self.listeners = TopicTrie()
+        self.subscriptions = []
+
+        # Topics de comandos: se avisa aunque el payload se repita
+        self.command_topics = []
+
+        # Creamos el cliente MQTT de Adafruit MiniMQTT.
+        # use_binary_mode: los payloads llegan como bytes (necesario para
+        # topics en formato binario, ver payload_codec.py)
+        # connect_retries=1: los reintentos los lleva loop(), sin
+        # dormir dentro de connect()
         self.mqtt_client = MQTT.MQTT(
             broker=self.broker,
             port=self.port,
             socket_pool=pool,
-            keep_alive=self.keep_alive
+            keep_alive=self.keep_alive,
+            socket_timeout=socket_timeout,
+            use_binary_mode=use_binary_mode,
+            connect_retries=1,
         )
 
         # Callback cuando llega un mensaje
@@ -36,55 +104,288 @@ class MqttManager:
         recibe un mensaje con un "comando" de cambio de vista.
         """
         self.view_manager = view_manager
+        self.add_listener("matrix/view", self._on_view_command)
+        if "matrix/view" not in self.command_topics:
+            self.command_topics.append("matrix/view")
+
+    @property
+    def connected(self):
+        return self.state == CONNECTED
 
     def connect(self):
+        """
+        Intenta conectar una vez. Devuelve True si lo logró; si no,
+        programa el siguiente intento (lo hará loop()).
+        """
         print("Conectando a MQTT...")
-        self.mqtt_client.connect()
+        try:
+            self.mqtt_client.connect()
+        except LINK_ERRORS as e:
+            self.failures += 1
+            # Espera exponencial con jitter: entre la mitad y el total
+            delay = self._retry_delay * (0.5 + random.random() / 2)
+            self._retry_delay = min(self._retry_delay * 2, self.max_retry)
+            self._next_attempt = time.monotonic() + delay
+            print("No se pudo conectar a MQTT, reintento en %.1f s -" % delay, e)
+            return False
         print("Conectado a MQTT broker:", self.broker)
+        self.state = CONNECTED
+        self.connects += 1
+        self._retry_delay = self.retry
+        self._last_activity = time.monotonic()
+
+        # Sesión nueva: restaurar suscripciones y enviar lo pendiente
+        try:
+            for topic in self.subscriptions:
+                self.mqtt_client.subscribe(topic)
+            while self.offline_queue:
+                topic, payload, retain = self.offline_queue[0]
+                self.mqtt_client.publish(topic, payload, retain=retain)
+                self.offline_queue.pop(0)
+        except LINK_ERRORS as e:
+            self._link_lost(e)
+            return False
+        return True
+
+    def _link_lost(self, error):
+        print("Conexión MQTT perdida -", error)
+        # Soltar el socket: si no, el siguiente connect() no consigue otro
+        # para el mismo host:puerto ("An existing socket is already connected")
+        try:
+            self.mqtt_client.disconnect()
+        except LINK_ERRORS:
+            pass
+        self.state = DISCONNECTED
+        self.links_lost += 1
+        self._draining = False
+        self._next_attempt = time.monotonic()
 
-    def subscribe(self, topic):
-        """Suscribe a un topic dado."""
+    def subscribe(self, topic, callback=None):
+        """
+        Suscribe a un topic dado (puede llevar comodines "+" y "#").
+        Si se pasa 'callback', se registra con add_listener().
+        """
+        if callback:
+            self.add_listener(topic, callback)
+        if topic in self.subscriptions:
+            return
         print("Suscribiendo a topic:", topic)
-        self.mqtt_client.subscribe(topic)
+        self.subscriptions.append(topic)
+        # Sin conexión se suscribe al reconectar
+        if self.connected:
+            try:
+                self.mqtt_client.subscribe(topic)
+            except LINK_ERRORS as e:
+                self._link_lost(e)
+
+    def publish(self, topic, payload, retain=False):
+        """
+        Publica 'payload' (str o bytes) en 'topic'. Sin conexión se
+        encola y se envía al reconectar.
+        """
+        if self.connected:
+            try:
+                self.mqtt_client.publish(topic, payload, retain=retain)
+                return
+            except LINK_ERRORS as e:
+                self._link_lost(e)
+        if len(self.offline_queue) >= self.max_offline:
+            self.offline_queue.pop(0)
+            self.offline_dropped += 1
+        self.offline_queue.append((topic, payload, retain))
+
+    def set_decoder(self, topic, decoder):
+        """
+        Usa 'decoder' para los payloads de 'topic' en lugar de JSON,
+        p.ej. payload_codec.decoder(("state",)) para el formato binario.
+        """
+        self.topic_data.set_decoder(topic, decoder)
+
+    def add_listener(self, topic_filter, callback):
+        """
+        Registra callback(topic, data) para los topics que coincidan
+        con 'topic_filter'. Solo se llama cuando el valor cambia.
+        """
+        self.listeners.add(topic_filter, callback)
+
+    def remove_listener(self, topic_filter, callback):
+        self.listeners.remove(topic_filter, callback)
+
+    def loop(self, budget=None):
+        """
+        Se llama periódicamente en el bucle principal.
+        Con 'budget' (o drain_budget) drena mensajes hasta que no llegue
+        ninguno nuevo o se acabe el tiempo, y luego aplica la cola.
+        """
+        if not self.connected:
+            # Reintentar solo cuando toque; mientras, no bloquear
+            if time.monotonic() >= self._next_attempt:
+                self.connect()
+            return
+        try:
+            self._pump(budget)
+            self._keep_alive()
+        except LINK_ERRORS as e:
+            self._link_lost(e)
+        self.flush()
+
+    def _pump(self, budget):
+        if budget is None:
+            budget = self.drain_budget
+        if budget is None:
+            self._read()
+            return
+
+        deadline = time.monotonic_ns() + int(budget * 1000000000)
+        self._draining = True
+        try:
+            while True:
+                before = self.received
+                self._read()
+                if self.received == before:
+                    break
+                if time.monotonic_ns() >= deadline:
+                    self.budget_exhausted += 1
+                    break
+        finally:
+            self._draining = False
+
+    def _read(self):
+        """Un mqtt_client.loop(); cualquier paquete recibido (también un PINGRESP) es actividad."""
+        if self.mqtt_client.loop():
+            self._last_activity = time.monotonic()
+
+    def _keep_alive(self):
+        """
+        El PINGREQ lo manda el cliente dentro de loop() tras keep_alive
+        segundos sin enviar nada, y espera el PINGRESP hasta keep_alive
+        segundos: con el enlace medio abierto ese loop() bloquea, por eso
+        keep_alive debe ser corto. Si los publish no dejan que el cliente
+        llegue a hacer ping, aquí se mira sin esperar: nada recibido en
+        1.5 × keep_alive es un enlace muerto.
+        """
+        limit = self.keep_alive * 1.5
+        if time.monotonic() - self._last_activity >= limit:
+            raise MQTT.MMQTTException("Sin respuesta del broker en %d s" % limit)
 
-    def loop(self):
-        """Se llama periódicamente en el bucle principal."""
-        self.mqtt_client.loop()
+    def flush(self):
+        """Aplica los mensajes en cola, el último de cada topic."""
+        depth = len(self.pending)
+        self.queue_depth = depth
+        if depth > self.max_queue_depth:
+            self.max_queue_depth = depth
+        while self.pending:
+            topic = next(iter(self.pending))
+            self._apply(topic, self.pending.pop(topic))
+
+    def stats(self):
+        return {
+            "state": self.state,
+            "connects": self.connects,
+            "failures": self.failures,
+            "links_lost": self.links_lost,
+            "offline_queued": len(self.offline_queue),
+            "offline_dropped": self.offline_dropped,
+            "received": self.received,
+            "coalesced": self.coalesced,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "budget_exhausted": self.budget_exhausted,
+            "bad_messages": self.bad_messages,
+        }
 
     def _message_callback(self, client, topic, payload):
         """
         Maneja los mensajes recibidos de MQTT.
-        - Almacena el payload en self.topic_data[topic].
-        - Si es un topic especial para cambiar vistas, lo procesa.
+        Mientras se drena, solo se encola: un mensaje nuevo en el mismo
+        topic reemplaza al anterior (y pasa al final de la cola).
         """
-        print("Mensaje MQTT recibido ->", topic, payload)
+        self.received += 1
+        self._last_activity = time.monotonic()
+        if self.recorder:
+            self.recorder.record(topic, payload)
+        if not self._draining:
+            self._apply(topic, payload)
+            return
+        if self.pending.pop(topic, None) is not None:
+            self.coalesced += 1
+        self.pending[topic] = payload
 
-        # Convertimos a string o dict (si viene en JSON)
-        # Ajusta según tu formato de datos
-        data_str = payload
-        try:
-            data_json = json.loads(payload)  # si es JSON
-        except ValueError:
-            data_json = None
+    def _apply(self, topic, payload):
+        """
+        - Almacena el payload crudo en self.topic_data.
+        - Si cambió, llama a los listeners cuyo filtro coincide
+          (p.ej. "matrix/view" para cambiar de vista).
+        Devuelve True si el payload cambió.
+        """
+        if self.verbose:
+            print("Mensaje MQTT recibido ->", topic, payload)
 
-        # Guardamos
-        self.topic_data[topic] = data_json if data_json else data_str
+        # Si el payload no cambió, no hay nada que avisar
+        changed = self.topic_data.put(topic, payload)
+        if not changed and topic not in self.command_topics:
+            return False
 
-        # (Opcional) Si hay un topic especial para cambiar vistas, por ejemplo:
-        #    "homeassistant/view" con payload = "0" o "clock" o "weather"
-        if topic == "matrix/view" and self.view_manager:
-            # Ejemplo 1: si en el payload viene un índice de vista
+        # Avisamos a quien esté escuchando ese topic. El payload se
+        # decodifica (JSON o string) solo si hay alguien escuchando.
+        callbacks = self.listeners.match(topic)
+        if not callbacks:
+            return changed
+        # Un mensaje mal formado (binario truncado, bytes que no son
+        # UTF-8...) o un listener que falla no debe parar el bucle: se
+        # registra y se descarta solo ese mensaje.
+        try:
+            data = self.topic_data.get(topic)
+        except Exception as e:
+            self.topic_data.remove(topic)
+            self._bad_message(topic, e)
+            return False
+        for callback in callbacks:
             try:
-                new_view_index = int(data_str)
-                self.view_manager.set_view(new_view_index)
-            except ValueError:
-                print("No se pudo convertir payload a int para cambiar de vista.")
-            # Ejemplo 2: si en el payload viene un nombre de vista y mapeas texto->índice
-            #   ...
-            #   self.view_manager.set_view( some_index )
+                callback(topic, data)
+            except Exception as e:
+                self._bad_message(topic, e)
+        return changed
+
+    def _bad_message(self, topic, error):
+        self.bad_messages += 1
+        print("Mensaje descartado en", topic, "-", repr(error))
+
+    def inject(self, topic, payload):
+        """
+        Entrega un payload que no vino del broker (p.ej. de data_source.py):
+        se guarda y se avisa a los listeners igual que un mensaje MQTT.
+        Devuelve True si cambió.
+        """
+        return self._apply(topic, payload)
+
+    def _on_view_command(self, topic, data):
+        """
+        Cambia la vista activa con un payload como "0" o "1".
+        (Si en el payload viene un nombre de vista, mapea texto->índice aquí.)
+        """
+        if not self.view_manager:
+            return
+        try:
+            new_view_index = int(data)
+        except (ValueError, TypeError):
+            print("No se pudo convertir payload a int para cambiar de vista.")
+            return
+        # Con varias regiones (PANELS > 1, SPLIT_SCREEN) este manager
+        # puede tener menos vistas de las que Home Assistant conoce
+        if not 0 <= new_view_index < len(self.view_manager.views):
+            print("Vista", new_view_index, "no existe en esta región, se ignora.")
+            return
+        self.view_manager.set_view(new_view_index)
 
     def get_data(self, topic):
         """
-        Devuelve el último payload almacenado para 'topic'.
+        Devuelve el último payload almacenado para 'topic'
+        (dict si venía en JSON, o string). None si no se puede decodificar.
         """
-        return self.topic_data.get(topic, None)
+        try:
+            return self.topic_data.get(topic)
+        except Exception as e:
+            self.topic_data.remove(topic)
+            self._bad_message(topic, e)
+            return None
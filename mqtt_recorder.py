@@ -0,0 +1,144 @@
+"""
+Record and replay of the MQTT messages an MqttManager receives.
+
+The log is append-only: a 4-byte magic b"MQR1", then one record per
+message, little-endian:
+
+    header  "<IBBH"  ms since recording started, flags, topic length,
+                     payload length
+    topic, payload   raw bytes; flag bit 0 means the payload was bytes
+                     (client in binary mode) rather than str
+
+Replay feeds the messages back into MqttManager._message_callback, so
+they take the same path through the TopicStore, listeners and views as
+live traffic.
+"""
+import struct
+import time
+
+MAGIC = b"MQR1"
+RECORD = "<IBBH"
+RECORD_SIZE = struct.calcsize(RECORD)
+
+BINARY_PAYLOAD = 0x01
+
+# Replay latencies are real time even when the clock is simulated
+_timer = getattr(time, "perf_counter", time.monotonic)
+
+
+def _mono_ms():
+    return time.monotonic_ns() // 1000000
+
+
+class MqttRecorder:
+    """
+    Appends every message an MqttManager receives to a log file.
+    ``flush_every`` records are buffered between writes to the file.
+    """
+
+    def __init__(self, path, flush_every=16):
+        self.path = path
+        self.flush_every = flush_every
+        self._file = open(path, "ab")
+        if self._file.tell() == 0:
+            self._file.write(MAGIC)
+        self._start = _mono_ms()
+        self._unflushed = 0
+        self.records = 0
+
+    def attach(self, mqtt_manager):
+        mqtt_manager.recorder = self
+        return self
+
+    def record(self, topic, payload):
+        flags = 0
+        if isinstance(payload, str):
+            payload = payload.encode("utf-8")
+        else:
+            flags |= BINARY_PAYLOAD
+        topic = topic.encode("utf-8")
+        if len(topic) > 255 or len(payload) > 0xFFFF:
+            return
+        self._file.write(struct.pack(RECORD, _mono_ms() - self._start, flags,
+                                     len(topic), len(payload)))
+        self._file.write(topic)
+        self._file.write(payload)
+        self.records += 1
+        self._unflushed += 1
+        if self._unflushed >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        self._file.flush()
+        self._unflushed = 0
+
+    def close(self):
+        self._file.close()
+
+
+def read_log(path):
+    """Yield (ms, topic, payload) from a log; stops at a truncated record."""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError("not an MQTT recording")
+        while True:
+            header = f.read(RECORD_SIZE)
+            if len(header) < RECORD_SIZE:
+                return
+            ms, flags, topic_len, payload_len = struct.unpack(RECORD, header)
+            data = f.read(topic_len + payload_len)
+            if len(data) < topic_len + payload_len:
+                return
+            topic = str(data[:topic_len], "utf-8")
+            payload = data[topic_len:]
+            if not flags & BINARY_PAYLOAD:
+                payload = str(payload, "utf-8")
+            yield ms, topic, payload
+
+
+class Replayer:
+    """
+    Feeds a log back into an MqttManager, keeping the recorded spacing.
+
+    With ``clock`` (a simulator.FakeClock) the clock is advanced to each
+    message's time, so hours of traffic go through in seconds. Without
+    one, ``realtime=True`` sleeps until each message is due and
+    ``realtime=False`` sends them back to back. ``step(ms)``, if given,
+    runs after each message (e.g. the views' update and a frame) and is
+    timed together with the callback.
+    """
+
+    def __init__(self, mqtt_manager, clock=None, realtime=False, step=None):
+        self.mqtt_manager = mqtt_manager
+        self.clock = clock
+        self.realtime = realtime
+        self.step = step
+        self.messages = 0
+        self.latencies = []       # seconds per message, callback + step
+
+    def _wait_until(self, start, ms):
+        if self.clock is not None:
+            due = start + ms / 1000
+            if due > self.clock.monotonic():
+                self.clock.advance(due - self.clock.monotonic())
+        elif self.realtime:
+            delay = start + ms / 1000 - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+    def replay(self, path):
+        """Replay every message in ``path``; returns the recorded span in ms."""
+        clock = self.clock if self.clock is not None else time
+        start = clock.monotonic()
+        callback = self.mqtt_manager._message_callback
+        last = 0
+        for ms, topic, payload in read_log(path):
+            self._wait_until(start, ms)
+            begin = _timer()
+            callback(None, topic, payload)
+            if self.step:
+                self.step(ms)
+            self.latencies.append(_timer() - begin)
+            self.messages += 1
+            last = ms
+        return last
@@ -0,0 +1,106 @@
+"""
+Loader for packed glyph fonts (.pgf) made by compile_font.py.
+
+Layout, little-endian:
+
+    header   "<4sHBBbbBB"  magic b"PGF1", glyph count, bounding box
+                           (width, height, x offset, y offset), ascent, descent
+    index    "<HIBBbbbb"   one entry per glyph, sorted by code point: code,
+                           bitmap offset, width, height, dx, dy, shift_x, shift_y
+    bitmaps                rows of (width + 7) // 8 bytes, most significant bit first
+
+Glyphs are read on demand by binary-searching the index on disk, so the
+file is never parsed as a whole and only a few recently used glyphs stay
+in RAM.
+"""
+import struct
+from collections import OrderedDict
+
+import displayio
+from fontio import Glyph
+
+MAGIC = b"PGF1"
+HEADER = "<4sHBBbbBB"
+ENTRY = "<HIBBbbbb"
+HEADER_SIZE = struct.calcsize(HEADER)
+ENTRY_SIZE = struct.calcsize(ENTRY)
+
+
+class PackedFont:
+    """A font backed by a .pgf file with a small LRU glyph cache."""
+
+    def __init__(self, f, cache_size=24):
+        self.file = f
+        self.cache_size = cache_size
+        self._glyphs = OrderedDict()
+        self._entry = bytearray(ENTRY_SIZE)
+
+        magic, count, bw, bh, bx, by, ascent, descent = struct.unpack(
+            HEADER, f.read(HEADER_SIZE))
+        if magic != MAGIC:
+            raise ValueError("Not a packed glyph font")
+        self.glyph_count = count
+        self._boundingbox = (bw, bh, bx, by)
+        self.ascent = ascent
+        self.descent = descent
+
+    def get_bounding_box(self):
+        return self._boundingbox
+
+    def _read_entry(self, i):
+        self.file.seek(HEADER_SIZE + i * ENTRY_SIZE)
+        self.file.readinto(self._entry)
+        return struct.unpack(ENTRY, self._entry)
+
+    def _find(self, code_point):
+        lo = 0
+        hi = self.glyph_count - 1
+        while lo <= hi:
+            mid = (lo + hi) // 2
+            entry = self._read_entry(mid)
+            if entry[0] == code_point:
+                return entry
+            if entry[0] < code_point:
+                lo = mid + 1
+            else:
+                hi = mid - 1
+        return None
+
+    def _load(self, code_point):
+        entry = self._find(code_point)
+        if entry is None:
+            return None
+        _, offset, width, height, dx, dy, shift_x, shift_y = entry
+        stride = (width + 7) // 8
+        self.file.seek(offset)
+        rows = self.file.read(stride * height)
+        bitmap = displayio.Bitmap(width, height, 2)
+        for y in range(height):
+            row = y * stride
+            for x in range(width):
+                if rows[row + (x >> 3)] & (0x80 >> (x & 7)):
+                    bitmap[x, y] = 1
+        return Glyph(bitmap, 0, width, height, dx, dy, shift_x, shift_y)
+
+    def get_glyph(self, code_point):
+        glyph = self._glyphs.pop(code_point, False)
+        if glyph is False:
+            glyph = self._load(code_point)
+            if len(self._glyphs) >= self.cache_size:
+                self._glyphs.pop(next(iter(self._glyphs)))
+        self._glyphs[code_point] = glyph
+        return glyph
+
+    def load_glyphs(self, code_points):
+        """Warm the cache, like BDF.load_glyphs. Optional: glyphs load on demand."""
+        if isinstance(code_points, int):
+            code_points = (code_points,)
+        for code_point in code_points:
+            if isinstance(code_point, str):
+                code_point = ord(code_point)
+            self.get_glyph(code_point)
+
+
+def load_font(filename, cache_size=24):
+    """Open a .pgf font. The file stays open for on-demand glyph reads."""
+    return PackedFont(open(filename, "rb"), cache_size)
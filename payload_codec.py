@@ -0,0 +1,123 @@
+"""
+Compact binary MQTT payloads, for topics where JSON parsing is the cost.
+
+A payload is a 2-byte header (MAGIC, field count) followed by typed
+fields, each a type byte and its value:
+
+    T_INT    int32, little endian
+    T_FLOAT  float32, little endian
+    T_STR    length byte + UTF-8 bytes (up to 255)
+    T_TRUE, T_FALSE, T_NONE    no value
+
+Fields are positional; a schema (tuple of names) turns them into a dict
+on the device, so a payload built from ``encode(12345)`` decodes to
+``{"state": 12345}`` under the schema ``("state",)``. Without a schema a
+single field decodes to its value and several to a list.
+"""
+import struct
+
+MAGIC = 0xB1
+HEADER = "<BB"
+HEADER_SIZE = 2
+
+T_INT = 0x01
+T_FLOAT = 0x02
+T_STR = 0x03
+T_TRUE = 0x04
+T_FALSE = 0x05
+T_NONE = 0x06
+
+_INT_MIN = -(1 << 31)
+_INT_MAX = (1 << 31) - 1
+
+
+def is_binary(payload):
+    return isinstance(payload, (bytes, bytearray)) and len(payload) >= HEADER_SIZE \
+        and payload[0] == MAGIC
+
+
+def encode(*values):
+    """Pack ``values`` (int, float, str, bool or None) into a binary payload."""
+    if len(values) > 255:
+        raise ValueError("too many fields")
+    out = bytearray(struct.pack(HEADER, MAGIC, len(values)))
+    for value in values:
+        if value is None:
+            out.append(T_NONE)
+        elif value is True:
+            out.append(T_TRUE)
+        elif value is False:
+            out.append(T_FALSE)
+        elif isinstance(value, int) and _INT_MIN <= value <= _INT_MAX:
+            out.append(T_INT)
+            out += struct.pack("<i", value)
+        elif isinstance(value, (int, float)):
+            out.append(T_FLOAT)
+            out += struct.pack("<f", value)
+        else:
+            data = str(value).encode("utf-8")
+            if len(data) > 255:
+                raise ValueError("string field longer than 255 bytes")
+            out.append(T_STR)
+            out.append(len(data))
+            out += data
+    return bytes(out)
+
+
+def decode(payload, schema=None):
+    """
+    Unpack a binary payload; see the module docstring for the result
+    shape. A truncated or corrupt payload raises ValueError.
+    """
+    if not is_binary(payload):
+        raise ValueError("not a binary payload")
+    size = len(payload)
+    count = payload[1]
+    values = []
+    pos = HEADER_SIZE
+    for _ in range(count):
+        if pos >= size:
+            raise ValueError("truncated payload")
+        kind = payload[pos]
+        pos += 1
+        if kind == T_INT or kind == T_FLOAT:
+            if pos + 4 > size:
+                raise ValueError("truncated payload")
+            values.append(struct.unpack_from("<i" if kind == T_INT else "<f", payload, pos)[0])
+            pos += 4
+        elif kind == T_STR:
+            if pos >= size or pos + 1 + payload[pos] > size:
+                raise ValueError("truncated payload")
+            length = payload[pos]
+            values.append(str(payload[pos + 1:pos + 1 + length], "utf-8"))
+            pos += 1 + length
+        elif kind == T_TRUE:
+            values.append(True)
+        elif kind == T_FALSE:
+            values.append(False)
+        elif kind == T_NONE:
+            values.append(None)
+        else:
+            raise ValueError("unknown field type")
+
+    if schema:
+        return {name: values[i] for i, name in enumerate(schema) if i < count}
+    if count == 1:
+        return values[0]
+    return values
+
+
+def decoder(schema=None, fallback=None):
+    """
+    A TopicStore decoder for one topic: binary payloads are unpacked with
+    ``schema``, anything else (e.g. a retained JSON message from before
+    the switch) goes to ``fallback``.
+    """
+    def decode_topic(payload):
+        if is_binary(payload):
+            return decode(payload, schema)
+        if fallback:
+            return fallback(payload)
+        return payload
+
+    return decode_topic
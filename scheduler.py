@@ -0,0 +1,165 @@
+import time
+
+
+class Task:
+    """A job the Scheduler runs on its own period, plus its timing stats."""
+
+    def __init__(self, name, callback, period, next_run):
+        self.name = name
+        self.callback = callback
+        self.period = period
+        self.next_run = next_run
+        self.enabled = True
+
+        self.runs = 0
+        self.skipped = 0        # periods dropped because the task fell behind
+        self.overruns = 0       # runs that took longer than the period
+        self.last_duration = 0.0
+        self.max_duration = 0.0
+        self.last_lateness = 0.0
+        self.max_lateness = 0.0
+        self.total_lateness = 0.0
+
+    def stats(self):
+        """Timing summary for this task, in seconds."""
+        return {
+            "runs": self.runs,
+            "skipped": self.skipped,
+            "overruns": self.overruns,
+            "last_duration": self.last_duration,
+            "max_duration": self.max_duration,
+            "max_lateness": self.max_lateness,
+            "mean_lateness": self.total_lateness / self.runs if self.runs else 0.0,
+        }
+
+
+class Scheduler:
+    """
+    Cooperative, deadline-driven scheduler for the main loop.
+
+    Each task runs when its deadline comes up and the loop sleeps exactly
+    until the earliest next deadline, instead of waking on a fixed tick.
+    A callback may return a number of seconds to override when it runs
+    next (e.g. to retry sooner after a failure); returning None keeps its
+    period. Tasks with ``period=None`` run once at their deadline.
+
+    Idle hooks run after each batch of due tasks, right before the loop
+    sleeps, and get the slack in seconds until the next deadline. Wake
+    hooks get how late, in seconds, the loop woke up from that sleep.
+    """
+
+    def __init__(self):
+        self.tasks = []
+        self.idle_hooks = []
+        self.wake_hooks = []
+
+    def add(self, name, callback, period, delay=0.0):
+        """Run ``callback`` every ``period`` seconds, first after ``delay``."""
+        task = Task(name, callback, period, time.monotonic() + delay)
+        self.tasks.append(task)
+        return task
+
+    def at(self, name, callback, when):
+        """Run ``callback`` once at monotonic time ``when``."""
+        task = Task(name, callback, None, when)
+        self.tasks.append(task)
+        return task
+
+    def get(self, name):
+        for task in self.tasks:
+            if task.name == name:
+                return task
+        return None
+
+    def remove(self, name):
+        task = self.get(name)
+        if task:
+            self.tasks.remove(task)
+
+    def wake(self, name):
+        """Run task ``name`` on the next pass instead of at its deadline."""
+        task = self.get(name)
+        if task:
+            task.next_run = time.monotonic()
+
+    def on_idle(self, hook):
+        """Call ``hook(slack)`` each time the loop is about to sleep."""
+        self.idle_hooks.append(hook)
+
+    def on_wake(self, hook):
+        """Call ``hook(overshoot)`` after each sleep."""
+        self.wake_hooks.append(hook)
+
+    def next_deadline(self):
+        """Monotonic time of the earliest enabled task, or None if there is none."""
+        deadline = None
+        for task in self.tasks:
+            if task.enabled and (deadline is None or task.next_run < deadline):
+                deadline = task.next_run
+        return deadline
+
+    def run_pending(self):
+        """Run every task whose deadline has passed, earliest first."""
+        while True:
+            now = time.monotonic()
+            due = None
+            for task in self.tasks:
+                if task.enabled and task.next_run <= now and (
+                        due is None or task.next_run < due.next_run):
+                    due = task
+            if due is None:
+                return
+            self._run(due, now)
+
+    def _run(self, task, start):
+        lateness = start - task.next_run
+        result = task.callback()
+        end = time.monotonic()
+        duration = end - start
+
+        task.runs += 1
+        task.last_duration = duration
+        if duration > task.max_duration:
+            task.max_duration = duration
+        task.last_lateness = lateness
+        task.total_lateness += lateness
+        if lateness > task.max_lateness:
+            task.max_lateness = lateness
+
+        if result is not None:
+            task.next_run = end + result
+        elif task.period is None:
+            self.tasks.remove(task)
+        else:
+            if duration > task.period:
+                task.overruns += 1
+            task.next_run += task.period
+            if task.next_run <= end:
+                # Fell behind: drop the missed periods instead of bursting
+                missed = int((end - task.next_run) / task.period) + 1
+                task.skipped += missed
+                task.next_run += missed * task.period
+
+    def run_forever(self, until=None):
+        """
+        Run tasks as they come due and sleep until the next deadline.
+        Returns once no task is left, or after monotonic time ``until``.
+        """
+        while True:
+            self.run_pending()
+            deadline = self.next_deadline()
+            if deadline is None:
+                return
+            for hook in self.idle_hooks:
+                hook(deadline - time.monotonic())
+            if until is not None and deadline > until:
+                return
+            delay = deadline - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+                for hook in self.wake_hooks:
+                    hook(time.monotonic() - deadline)
+
+    def stats(self):
+        """Per-task timing stats keyed by task name."""
+        return {task.name: task.stats() for task in self.tasks}
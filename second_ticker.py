@@ -0,0 +1,53 @@
+import time
+from array import array
+
+
+def _mono_ms():
+    return time.monotonic_ns() // 1000000
+
+
+class SecondTicker:
+    """
+    Commits the clock's frame on each wall-clock second boundary.
+
+    tick() shows the frame prepared earlier, prepares the next second's
+    and returns the delay to the next boundary of the TimeKeeper's time.
+    """
+
+    def __init__(self, view, keeper, history=32):
+        self.view = view
+        self.keeper = keeper
+
+        self._boundary = None       # monotonic ms of the prepared frame
+        self.errors = array("h", [0] * history)
+        self.commits = 0
+        self.max_error = 0
+
+    def tick(self):
+        now = _mono_ms()
+        if self._boundary is not None:
+            self.view.commit()
+            error = now - self._boundary
+            self.errors[self.commits % len(self.errors)] = max(-32768, min(32767, error))
+            self.commits += 1
+            if abs(error) > abs(self.max_error):
+                self.max_error = error
+
+        # Render ahead: lay out the next second now, commit it on the boundary
+        wall, into = self.keeper.wall_at(now)
+        self.view.prepare(time.localtime(wall + 1))
+        self._boundary = now + 1000 - into
+        return (self._boundary - _mono_ms()) / 1000
+
+    def stats(self):
+        """Commit error (ms from the second boundary) over the last commits."""
+        n = min(self.commits, len(self.errors))
+        if not n:
+            return {"commits": 0}
+        recent = sorted(self.errors[i] for i in range(n))
+        return {
+            "commits": self.commits,
+            "p50_ms": recent[n // 2],
+            "max_abs_ms": max(abs(recent[0]), abs(recent[-1])),
+            "worst_ms": self.max_error,
+        }
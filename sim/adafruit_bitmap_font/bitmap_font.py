@@ -0,0 +1,94 @@
+"""
+Host-side stand-in for ``adafruit_bitmap_font.bitmap_font``.
+
+Only BDF is supported. Glyphs are parsed on first use, like the real
+library, so ``load_glyphs`` still matters for profiling.
+"""
+import displayio
+from fontio import Glyph
+
+
+class BDF:
+    """A BDF font whose glyphs are loaded on demand."""
+
+    def __init__(self, f):
+        self.file = f
+        self._glyphs = {}
+        self._boundingbox = (0, 0, 0, 0)
+        self.ascent = 0
+        self.descent = 0
+        self.file.seek(0)
+        for line in self.file:
+            if line.startswith(b"FONTBOUNDINGBOX "):
+                self._boundingbox = tuple(int(v) for v in line.split()[1:5])
+            elif line.startswith(b"FONT_ASCENT "):
+                self.ascent = int(line.split()[1])
+            elif line.startswith(b"FONT_DESCENT "):
+                self.descent = int(line.split()[1])
+            elif line.startswith(b"CHARS "):
+                break
+
+    def get_bounding_box(self):
+        return self._boundingbox
+
+    def get_glyph(self, code_point):
+        if code_point not in self._glyphs:
+            self.load_glyphs((code_point,))
+        return self._glyphs[code_point]
+
+    def load_glyphs(self, code_points):
+        if isinstance(code_points, int):
+            code_points = (code_points,)
+        elif isinstance(code_points, str):
+            code_points = [ord(c) for c in code_points]
+        wanted = set(code_points) - set(self._glyphs)
+        if not wanted:
+            return
+
+        self.file.seek(0)
+        code = None
+        shift_x = shift_y = 0
+        width = height = dx = dy = 0
+        bitmap = None
+        row = -1
+        for line in self.file:
+            if line.startswith(b"ENCODING "):
+                code = int(line.split()[1])
+                if code not in wanted:
+                    code = None
+            elif code is None:
+                continue
+            elif line.startswith(b"DWIDTH "):
+                shift_x, shift_y = (int(v) for v in line.split()[1:3])
+            elif line.startswith(b"BBX "):
+                width, height, dx, dy = (int(v) for v in line.split()[1:5])
+            elif line.startswith(b"BITMAP"):
+                bitmap = displayio.Bitmap(width, height, 2)
+                row = 0
+            elif line.startswith(b"ENDCHAR"):
+                self._glyphs[code] = Glyph(
+                    bitmap, 0, width, height, dx, dy, shift_x, shift_y)
+                wanted.discard(code)
+                code = None
+                if not wanted:
+                    break
+            elif 0 <= row < height:
+                bits = int(line.strip(), 16)
+                nbits = len(line.strip()) * 4
+                for x in range(width):
+                    if bits & (1 << (nbits - 1 - x)):
+                        bitmap[x, row] = 1
+                row += 1
+
+        # Code points missing from the font resolve to None, like the real one
+        for missing in wanted:
+            self._glyphs[missing] = None
+
+
+def load_font(filename, bitmap=None):
+    """Load a font from ``filename``. Only BDF is supported on the host."""
+    f = open(filename, "rb")
+    first = f.read(16)
+    if not first.startswith(b"STARTFONT"):
+        raise ValueError("Unknown magic number %r" % first[:4])
+    return BDF(f)
@@ -0,0 +1,10 @@
+"""Host-side stand-in for ``adafruit_connection_manager``."""
+import fakenet
+
+
+def get_radio_socketpool(radio):
+    return fakenet.SocketPool(fakenet.BROKER)
+
+
+def get_radio_ssl_context(radio):
+    return None
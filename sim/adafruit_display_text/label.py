@@ -0,0 +1,159 @@
+"""
+Host-side stand-in for ``adafruit_display_text.label``.
+
+Like the real Label, every ``text`` assignment lays the string out again
+into a fresh bitmap, so the cost of relayout shows up in profiles.
+"""
+import displayio
+
+
+class Label(displayio.Group):
+    """A single line of text rendered into one bitmap-backed TileGrid."""
+
+    def __init__(self, font, *, x=0, y=0, text="", color=0xFFFFFF,
+                 background_color=None, scale=1, anchor_point=None,
+                 anchored_position=None, **kwargs):
+        super().__init__(x=x, y=y, scale=scale)
+        self._font = font
+        self._text = None
+        self._palette = displayio.Palette(2)
+        self._palette[1] = color
+        self._color = color
+        self.background_color = background_color
+        self._anchor_point = anchor_point
+        self._anchored_position = anchored_position
+        self._ascent, self._descent = self._get_ascent_descent()
+        self._bounding_box = (0, 0, 0, 0)
+        self._bitmap = None
+        self._tilegrid = None
+        self.text = text
+
+    def _get_ascent_descent(self):
+        ascent = 0
+        descent = 0
+        for char in "M j'":
+            glyph = self._font.get_glyph(ord(char))
+            if glyph:
+                ascent = max(ascent, glyph.height + glyph.dy)
+                descent = max(descent, -glyph.dy)
+        return ascent, descent
+
+    @property
+    def font(self):
+        return self._font
+
+    @property
+    def bitmap(self):
+        return self._bitmap
+
+    @property
+    def text(self):
+        return self._text
+
+    @text.setter
+    def text(self, new_text):
+        self._text = new_text
+        self._reset_text()
+
+    @property
+    def color(self):
+        return self._color
+
+    @color.setter
+    def color(self, new_color):
+        self._color = new_color
+        if new_color is None:
+            self._palette.make_transparent(1)
+        else:
+            self._palette[1] = new_color
+            self._palette.make_opaque(1)
+
+    @property
+    def background_color(self):
+        return self._background_color
+
+    @background_color.setter
+    def background_color(self, new_color):
+        self._background_color = new_color
+        if new_color is None:
+            self._palette.make_transparent(0)
+        else:
+            self._palette[0] = new_color
+            self._palette.make_opaque(0)
+
+    @property
+    def bounding_box(self):
+        return self._bounding_box
+
+    @property
+    def width(self):
+        return self._bounding_box[2]
+
+    @property
+    def height(self):
+        return self._bounding_box[3]
+
+    @property
+    def anchor_point(self):
+        return self._anchor_point
+
+    @anchor_point.setter
+    def anchor_point(self, new_anchor_point):
+        self._anchor_point = new_anchor_point
+        self._update_anchored_position()
+
+    @property
+    def anchored_position(self):
+        return self._anchored_position
+
+    @anchored_position.setter
+    def anchored_position(self, new_position):
+        self._anchored_position = new_position
+        self._update_anchored_position()
+
+    def _update_anchored_position(self):
+        if self._anchor_point is None or self._anchored_position is None:
+            return
+        box_x, box_y, box_w, box_h = self._bounding_box
+        self.x = int(self._anchored_position[0] - box_x * self.scale
+                     - round(self._anchor_point[0] * box_w * self.scale))
+        self.y = int(self._anchored_position[1] - box_y * self.scale
+                     - round(self._anchor_point[1] * box_h * self.scale))
+
+    def _reset_text(self):
+        text = self._text or ""
+        glyphs = []
+        left = 0
+        right = 0
+        cursor = 0
+        for char in text:
+            glyph = self._font.get_glyph(ord(char))
+            if glyph is None:
+                continue
+            glyphs.append((cursor, glyph))
+            left = min(left, cursor + glyph.dx)
+            right = max(right, cursor + glyph.shift_x, cursor + glyph.dx + glyph.width)
+            cursor += glyph.shift_x
+
+        y_offset = self._ascent // 2
+        box_w = right - left
+        box_h = self._ascent + self._descent
+        bitmap = displayio.Bitmap(max(box_w, 1), max(box_h, 1), 2)
+        for origin, glyph in glyphs:
+            gx = origin + glyph.dx - left
+            gy = self._ascent - glyph.height - glyph.dy
+            source = glyph.bitmap
+            for py in range(glyph.height):
+                for px in range(glyph.width):
+                    if source[px, py] and 0 <= gx + px < box_w and 0 <= gy + py < box_h:
+                        bitmap[gx + px, gy + py] = 1
+
+        tilegrid = displayio.TileGrid(
+            bitmap, pixel_shader=self._palette, x=left, y=y_offset - self._ascent)
+        if self._tilegrid is not None:
+            self.remove(self._tilegrid)
+        self.append(tilegrid)
+        self._bitmap = bitmap
+        self._tilegrid = tilegrid
+        self._bounding_box = (left, y_offset - self._ascent, box_w, box_h)
+        self._update_anchored_position()
@@ -0,0 +1,19 @@
+"""Host-side stand-in for ``adafruit_esp32spi``. Connecting always succeeds."""
+from collections import namedtuple
+
+WL_IDLE_STATUS = 0
+
+_APInfo = namedtuple("_APInfo", ("ssid", "rssi"))
+
+
+class ESP_SPIcontrol:
+    def __init__(self, spi, cs, ready, reset, *args, **kwargs):
+        self.is_connected = False
+        self.ap_info = None
+        self.ipv4_address = "0.0.0.0"
+        self.status = WL_IDLE_STATUS
+
+    def connect_AP(self, ssid, password, timeout_s=10):
+        self.is_connected = True
+        self.ap_info = _APInfo(ssid, -40)
+        self.ipv4_address = "127.0.0.1"
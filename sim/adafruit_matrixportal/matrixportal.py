@@ -0,0 +1,33 @@
+"""
+Host-side stand-in for ``adafruit_matrixportal.matrixportal``.
+
+The display is a ``FramebufferDisplay`` over an in-memory 64x32 framebuffer,
+or over a chain of 64x32 panels when ``width`` is a multiple of 64.
+``get_local_time`` does not touch the network; the host clock is already set.
+"""
+import time
+
+from framebufferio import ChainedFramebuffer, Framebuffer, FramebufferDisplay
+
+PANEL_WIDTH = 64
+
+
+class MatrixPortal:
+    """Just enough of MatrixPortal to drive the views and the main loop."""
+
+    def __init__(self, *, status_neopixel=None, esp=None, width=64, height=32,
+                 bit_depth=2, debug=False, **kwargs):
+        self.esp = esp
+        if width > PANEL_WIDTH and width % PANEL_WIDTH == 0:
+            self.framebuffer = ChainedFramebuffer(PANEL_WIDTH, height, width // PANEL_WIDTH)
+        else:
+            self.framebuffer = Framebuffer(width, height)
+        self.display = FramebufferDisplay(self.framebuffer)
+        self.time_requests = 0
+
+    def get_local_time(self, location=None):
+        """Pretend to sync the RTC and return the time service's reply string."""
+        self.time_requests += 1
+        now = time.time()
+        return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(now)) + \
+            ".%03d" % int((now % 1) * 1000)
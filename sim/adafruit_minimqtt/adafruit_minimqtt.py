@@ -0,0 +1,126 @@
+"""
+Host-side stand-in for ``adafruit_minimqtt.adafruit_minimqtt``.
+
+Messages come from the ``fakenet.Broker`` carried by ``socket_pool``.
+``loop(timeout)`` follows MiniMQTT: each pass reads at most one message and
+passes repeat until ``timeout`` seconds have elapsed. Once ``keep_alive``
+seconds have passed since the client last sent anything, loop() pings
+instead: ping() returns the PINGRESP (0xD0) at once, but if the broker is
+hung it waits out ``keep_alive`` seconds, as the real one does, and
+raises MMQTTException. Like adafruit_connection_manager, the client holds its socket
+until disconnect(): connecting again without it raises RuntimeError.
+"""
+import time
+from collections import deque
+
+
+class MMQTTException(Exception):
+    pass
+
+
+class MQTT:
+    def __init__(self, *, broker, port=None, username=None, password=None,
+                 client_id=None, is_ssl=None, keep_alive=60, socket_pool=None,
+                 ssl_context=None, use_binary_mode=False, socket_timeout=1,
+                 connect_retries=5, user_data=None):
+        self.broker = broker
+        self.port = port
+        self.keep_alive = keep_alive
+        self._pool = socket_pool
+        self._use_binary_mode = use_binary_mode
+        self._subscriptions = []
+        self._inbox = deque()
+        self._connected = False
+        self._sock = None
+        self._last_sent = None
+        self.pings = 0
+        self.on_message = None
+
+    @property
+    def _broker(self):
+        return self._pool.broker
+
+    def _check_link(self):
+        if not self._connected or self not in self._broker.clients:
+            raise MMQTTException("Connection lost")
+
+    def connect(self, clean_session=True, host=None, port=None, keep_alive=None):
+        if self._sock is not None:
+            raise RuntimeError("An existing socket is already connected")
+        if not self._broker.running:
+            raise MMQTTException("Repeated connect failures")
+        self._broker.attach(self)
+        self._sock = self._broker
+        self._connected = True
+        self._last_sent = time.monotonic()
+        if clean_session:
+            self._subscriptions = []
+        return 0
+
+    def disconnect(self):
+        if not self._connected:
+            raise MMQTTException("MiniMQTT is not connected")
+        self._broker.detach(self)
+        self._sock = None
+        self._connected = False
+
+    def is_connected(self):
+        return self._connected and self in self._broker.clients
+
+    def subscribe(self, topic, qos=0):
+        self._check_link()
+        self._last_sent = time.monotonic()
+        if topic not in self._subscriptions:
+            self._subscriptions.append(topic)
+        self._broker.subscribed(self, topic)
+
+    def unsubscribe(self, topic):
+        self._check_link()
+        if topic in self._subscriptions:
+            self._subscriptions.remove(topic)
+
+    def publish(self, topic, msg, retain=False, qos=0):
+        self._check_link()
+        self._last_sent = time.monotonic()
+        self._broker.publish(topic, msg, retain)
+
+    def ping(self):
+        self._check_link()
+        self.pings += 1
+        self._last_sent = time.monotonic()
+        if self._broker.responding:
+            return [0xD0]
+        time.sleep(self.keep_alive)
+        raise MMQTTException("PINGRESP not returned from broker within %d seconds."
+                             % self.keep_alive)
+
+    def _wait_for_msg(self, timeout=None):
+        if not self._inbox:
+            return None
+        topic, payload = self._inbox.popleft()
+        if not self._use_binary_mode and isinstance(payload, (bytes, bytearray)):
+            payload = str(payload, "utf-8")
+        elif self._use_binary_mode and isinstance(payload, str):
+            payload = payload.encode("utf-8")
+        if self.on_message:
+            self.on_message(self, topic, payload)
+        return 0x30
+
+    def loop(self, timeout=0):
+        self._check_link()
+        stamp = time.monotonic()
+        if stamp - self._last_sent >= self.keep_alive:
+            return self.ping() or None
+        rcs = []
+        while True:
+            rc = self._wait_for_msg(timeout)
+            if rc is not None:
+                rcs.append(rc)
+            elapsed = time.monotonic() - stamp
+            if elapsed >= timeout:
+                break
+            if rc is None:
+                # Nothing queued: a real socket read would block until timeout
+                time.sleep(timeout - elapsed)
+                break
+        return rcs if rcs else None
@@ -0,0 +1,127 @@
+"""
+Host-side stand-in for ``adafruit_requests``.
+
+Requests go out through ``http.client`` (the socket pool handed in is
+ignored), with one kept-alive connection per host like the real
+Session's socket reuse, so data sources can be exercised against a local
+HTTP server such as ``fakehttp.Server``.
+"""
+import http.client
+import json as _json
+from urllib.parse import urlsplit
+
+
+class OutOfRetries(Exception):
+    """Raised when the socket fails on every attempt, as in adafruit_requests."""
+
+
+class Response:
+    def __init__(self, session, key, response, stream):
+        self._session = session
+        self._key = key
+        self._response = response
+        self.status_code = response.status
+        self.reason = response.reason
+        self.headers = {name.lower(): value for name, value in response.getheaders()}
+        self._content = None
+        if not stream:
+            self._content = response.read()
+            self._session.bytes_read += len(self._content)
+
+    def iter_content(self, chunk_size=1, decode_unicode=False):
+        if self._content is not None:
+            for i in range(0, len(self._content), chunk_size):
+                yield self._content[i:i + chunk_size]
+            return
+        while True:
+            chunk = self._response.read(chunk_size)
+            if not chunk:
+                return
+            self._session.bytes_read += len(chunk)
+            yield chunk
+
+    @property
+    def content(self):
+        if self._content is None:
+            self._content = b"".join(self.iter_content(1024))
+        return self._content
+
+    @property
+    def text(self):
+        return str(self.content, "utf-8")
+
+    def json(self):
+        return _json.loads(self.content)
+
+    def close(self):
+        # Drain what was not read so the connection can carry the next request
+        if self._content is None:
+            rest = self._response.read()
+            self._session.bytes_drained += len(rest)
+            self._content = b""
+        if self._response.will_close:
+            self._session._drop(self._key)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Session:
+    def __init__(self, socket_pool, ssl_context=None):
+        self._socket_pool = socket_pool
+        self._ssl_context = ssl_context
+        self._connections = {}
+        self.connections_opened = 0
+        self.requests = 0
+        self.bytes_read = 0       # body bytes handed to the caller
+        self.bytes_drained = 0    # body bytes read by close() and thrown away
+
+    def _connection(self, key, timeout):
+        connection = self._connections.get(key)
+        if connection is None:
+            scheme, netloc = key
+            cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+            connection = cls(netloc, timeout=timeout)
+            self._connections[key] = connection
+            self.connections_opened += 1
+        else:
+            connection.timeout = timeout
+            if connection.sock:
+                connection.sock.settimeout(timeout)
+        return connection
+
+    def _drop(self, key):
+        connection = self._connections.pop(key, None)
+        if connection:
+            connection.close()
+
+    def request(self, method, url, data=None, json=None, headers=None, stream=False, timeout=60):
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.netloc)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        if json is not None:
+            data = _json.dumps(json)
+        self.requests += 1
+        for attempt in range(2):
+            connection = self._connection(key, timeout)
+            try:
+                connection.request(method, path, body=data, headers=headers or {})
+                response = connection.getresponse()
+                break
+            except (http.client.RemoteDisconnected, ConnectionError):
+                # The server closed the kept-alive socket; reconnect once
+                self._drop(key)
+                if attempt:
+                    raise OutOfRetries("Repeated socket failures")
+        return Response(self, key, response, stream)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
@@ -0,0 +1,10 @@
+"""Host-side stand-in for ``board`` on the MatrixPortal M4."""
+ESP_CS = "ESP_CS"
+ESP_BUSY = "ESP_BUSY"
+ESP_RESET = "ESP_RESET"
+SCK = "SCK"
+MOSI = "MOSI"
+MISO = "MISO"
+NEOPIXEL = "NEOPIXEL"
+BUTTON_UP = "BUTTON_UP"
+BUTTON_DOWN = "BUTTON_DOWN"
@@ -0,0 +1,183 @@
+"""
+Host-side stand-in for CircuitPython's ``displayio``.
+
+Only the pieces the views use are implemented: Group, Palette, Bitmap and
+TileGrid. Compositing into a framebuffer lives in ``_composite`` and is
+called by ``framebufferio.FramebufferDisplay.refresh()``.
+"""
+
+
+class Palette:
+    """Maps bitmap values to 24-bit RGB colors."""
+
+    def __init__(self, color_count):
+        self._colors = [0] * color_count
+        self._transparent = [False] * color_count
+
+    def __len__(self):
+        return len(self._colors)
+
+    def __getitem__(self, index):
+        return self._colors[index]
+
+    def __setitem__(self, index, value):
+        if isinstance(value, (tuple, list)):
+            value = (value[0] << 16) | (value[1] << 8) | value[2]
+        self._colors[index] = value & 0xFFFFFF
+
+    def make_transparent(self, index):
+        self._transparent[index] = True
+
+    def make_opaque(self, index):
+        self._transparent[index] = False
+
+    def is_transparent(self, index):
+        return self._transparent[index]
+
+
+class Bitmap:
+    """A 2D array of palette indices backed by a flat bytearray."""
+
+    def __init__(self, width, height, value_count):
+        if value_count > 256:
+            raise ValueError("value_count must be <= 256 in the simulator")
+        self.width = width
+        self.height = height
+        self.value_count = value_count
+        self._data = bytearray(width * height)
+
+    def _offset(self, index):
+        if isinstance(index, tuple):
+            x, y = index
+            if not (0 <= x < self.width and 0 <= y < self.height):
+                raise IndexError("pixel out of bounds")
+            return y * self.width + x
+        return index
+
+    def __getitem__(self, index):
+        return self._data[self._offset(index)]
+
+    def __setitem__(self, index, value):
+        if value >= self.value_count:
+            raise ValueError("value out of range")
+        self._data[self._offset(index)] = value
+
+    def fill(self, value):
+        self._data[:] = bytes((value,)) * len(self._data)
+
+
+class TileGrid:
+    """A grid of tiles, each one a tile_width x tile_height window into a bitmap."""
+
+    def __init__(self, bitmap, *, pixel_shader, width=1, height=1,
+                 tile_width=None, tile_height=None, default_tile=0, x=0, y=0):
+        if tile_width is None:
+            tile_width = bitmap.width
+        if tile_height is None:
+            tile_height = bitmap.height
+        self.bitmap = bitmap
+        self.pixel_shader = pixel_shader
+        self.width = width
+        self.height = height
+        self.tile_width = tile_width
+        self.tile_height = tile_height
+        self.x = x
+        self.y = y
+        self.hidden = False
+        self._tiles = bytearray([default_tile]) * (width * height)
+        self._tiles_per_row = bitmap.width // tile_width
+
+    def _offset(self, index):
+        if isinstance(index, tuple):
+            return index[1] * self.width + index[0]
+        return index
+
+    def __getitem__(self, index):
+        return self._tiles[self._offset(index)]
+
+    def __setitem__(self, index, value):
+        self._tiles[self._offset(index)] = value
+
+
+class Group:
+    """A list-like container of TileGrids and other Groups."""
+
+    def __init__(self, *, scale=1, x=0, y=0):
+        self.scale = scale
+        self.x = x
+        self.y = y
+        self.hidden = False
+        self._layers = []
+
+    def __len__(self):
+        return len(self._layers)
+
+    def __getitem__(self, index):
+        return self._layers[index]
+
+    def __setitem__(self, index, layer):
+        self._layers[index] = layer
+
+    def __contains__(self, layer):
+        return layer in self._layers
+
+    def __iter__(self):
+        return iter(self._layers)
+
+    def append(self, layer):
+        self._layers.append(layer)
+
+    def insert(self, index, layer):
+        self._layers.insert(index, layer)
+
+    def remove(self, layer):
+        self._layers.remove(layer)
+
+    def index(self, layer):
+        return self._layers.index(layer)
+
+    def pop(self, index=-1):
+        return self._layers.pop(index)
+
+
+def _composite(layer, pixels, width, height, ox=0, oy=0, scale=1):
+    """Draw ``layer`` (and its children) into the flat ``pixels`` array."""
+    if layer.hidden:
+        return
+    if isinstance(layer, Group):
+        ox += layer.x * scale
+        oy += layer.y * scale
+        scale *= layer.scale
+        for child in layer._layers:
+            _composite(child, pixels, width, height, ox, oy, scale)
+        return
+
+    bitmap = layer.bitmap
+    shader = layer.pixel_shader
+    tw = layer.tile_width
+    th = layer.tile_height
+    per_row = layer._tiles_per_row
+    left = ox + layer.x * scale
+    top = oy + layer.y * scale
+    for ty in range(layer.height):
+        for tx in range(layer.width):
+            tile = layer._tiles[ty * layer.width + tx]
+            sx0 = (tile % per_row) * tw
+            sy0 = (tile // per_row) * th
+            for py in range(th):
+                for px in range(tw):
+                    value = bitmap._data[(sy0 + py) * bitmap.width + sx0 + px]
+                    if shader.is_transparent(value):
+                        continue
+                    color = shader[value]
+                    bx = left + (tx * tw + px) * scale
+                    by = top + (ty * th + py) * scale
+                    for dy in range(scale):
+                        y = by + dy
+                        if not 0 <= y < height:
+                            continue
+                        row = y * width
+                        for dx in range(scale):
+                            x = bx + dx
+                            if 0 <= x < width:
+                                pixels[row + x] = color
@@ -0,0 +1,99 @@
+"""
+Local HTTP server for exercising data sources in the simulator.
+
+``Server`` serves one JSON body per path on 127.0.0.1 with HTTP/1.1
+keep-alive and a strong ETag, answering If-None-Match with 304, and
+counts what it was asked for. ``delay`` makes it answer that many
+(real) seconds late:
+
+    server = Server()
+    server.set("/channels", {"items": [{"statistics": {"subscriberCount": "10"}}]})
+    url = server.url("/channels")
+"""
+import hashlib
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server.owner
+        path = self.path.split("?")[0]
+        server.requests += 1
+        if server.delay:
+            # An Event, not time.sleep(), which a FakeClock may have replaced
+            threading.Event().wait(server.delay)
+        body = server.bodies.get(path)
+        if body is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        etag = '"%s"' % hashlib.sha1(body).hexdigest()[:16]
+        if self.headers.get("If-None-Match") == etag:
+            server.not_modified += 1
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+        server.bytes_sent += len(body)
+
+    def handle(self):
+        try:
+            super().handle()
+        except ConnectionError:
+            pass  # the client gave up (e.g. timed out) before the reply
+
+    def log_message(self, *args):
+        pass
+
+
+class Server:
+    def __init__(self, port=0, delay=0):
+        self.bodies = {}
+        self.delay = delay
+        self.requests = 0
+        self.not_modified = 0
+        self.bytes_sent = 0
+        self.connections = 0
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+        self._httpd.owner = self
+        self._httpd.daemon_threads = True
+        original = self._httpd.process_request
+
+        def process_request(request, address):
+            self.connections += 1
+            original(request, address)
+
+        self._httpd.process_request = process_request
+        self.port = self._httpd.server_address[1]
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+
+    def url(self, path):
+        return "http://127.0.0.1:%d%s" % (self.port, path)
+
+    def set(self, path, value):
+        """Serve ``value`` (JSON-encoded unless bytes) at ``path``."""
+        if not isinstance(value, bytes):
+            value = json.dumps(value).encode("utf-8")
+        self.bodies[path] = value
+
+    def close(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,83 @@
+"""
+In-process MQTT broker and socket pool used by the simulator.
+
+The ``adafruit_minimqtt`` stand-in talks to a ``Broker`` through the pool
+handed to it, so tests and benchmarks can inject traffic with
+``broker.publish()`` and see what the device publishes back.
+"""
+from collections import deque
+
+
+def topic_matches(topic_filter, topic):
+    """MQTT filter matching with ``+`` and ``#`` wildcards."""
+    filter_levels = topic_filter.split("/")
+    topic_levels = topic.split("/")
+    for i, level in enumerate(filter_levels):
+        if level == "#":
+            return True
+        if i >= len(topic_levels):
+            return False
+        if level != "+" and level != topic_levels[i]:
+            return False
+    return len(filter_levels) == len(topic_levels)
+
+
+class Broker:
+    """Routes publishes to connected clients' inboxes and keeps retained messages."""
+
+    def __init__(self):
+        self.clients = []
+        self.retained = {}
+        self.published = deque((), 1000)
+        self.running = True
+        self.responding = True
+
+    def attach(self, client):
+        if client not in self.clients:
+            self.clients.append(client)
+
+    def detach(self, client):
+        if client in self.clients:
+            self.clients.remove(client)
+
+    def subscribed(self, client, topic_filter):
+        for topic, payload in self.retained.items():
+            if topic_matches(topic_filter, topic):
+                client._inbox.append((topic, payload))
+
+    def publish(self, topic, payload, retain=False):
+        self.published.append((topic, payload))
+        if retain:
+            self.retained[topic] = payload
+        if not self.responding:
+            return
+        for client in self.clients:
+            for topic_filter in client._subscriptions:
+                if topic_matches(topic_filter, topic):
+                    client._inbox.append((topic, payload))
+                    break
+
+    def stop(self):
+        """Simulate the broker going away: every client link dies."""
+        self.running = False
+        for client in self.clients:
+            client._inbox.clear()
+        self.clients = []
+
+    def start(self):
+        self.running = True
+        self.responding = True
+
+    def hang(self):
+        """Simulate a half-open link: clients stay attached but nothing comes back."""
+        self.responding = False
+
+
+BROKER = Broker()
+
+
+class SocketPool:
+    """Carries the broker to the MQTT stand-in in place of real sockets."""
+
+    def __init__(self, broker=None):
+        self.broker = broker if broker is not None else BROKER
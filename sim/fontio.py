@@ -0,0 +1,7 @@
+"""Host-side stand-in for CircuitPython's ``fontio``."""
+from collections import namedtuple
+
+Glyph = namedtuple(
+    "Glyph",
+    ("bitmap", "tile_index", "width", "height", "dx", "dy", "shift_x", "shift_y"),
+)
@@ -0,0 +1,92 @@
+"""
+Host-side stand-in for ``framebufferio`` plus an array-backed framebuffer
+that plays the role of ``rgbmatrix.RGBMatrix``.
+"""
+from array import array
+
+import displayio
+
+
+class Framebuffer:
+    """A width x height array of 24-bit RGB pixels."""
+
+    def __init__(self, width=64, height=32):
+        self.width = width
+        self.height = height
+        self.pixels = array("L", [0]) * (width * height)
+
+    def write(self, pixels):
+        """Take a freshly composited frame."""
+        self.pixels[:] = pixels
+
+    def pixel(self, x, y):
+        return self.pixels[y * self.width + x]
+
+    def snapshot(self):
+        """Return the framebuffer as bytes, suitable for exact comparisons."""
+        return self.pixels.tobytes()
+
+    def to_ascii(self, on="#", off="."):
+        """Render lit pixels as text, one line per row. Handy when debugging."""
+        rows = []
+        for y in range(self.height):
+            row = self.pixels[y * self.width:(y + 1) * self.width]
+            rows.append("".join(on if p else off for p in row))
+        return "\n".join(rows)
+
+
+class ChainedFramebuffer(Framebuffer):
+    """
+    ``count`` panels of ``panel_width`` side by side, like rgbmatrix
+    driving a chain. A frame only reaches the panels whose pixels changed;
+    ``panel_updates`` counts those pushes per panel.
+    """
+
+    def __init__(self, panel_width=64, height=32, count=2):
+        super().__init__(panel_width * count, height)
+        self.panel_width = panel_width
+        self.count = count
+        self.panel_updates = [0] * count
+
+    def write(self, pixels):
+        pw = self.panel_width
+        for panel in range(self.count):
+            changed = False
+            for y in range(self.height):
+                start = y * self.width + panel * pw
+                row = pixels[start:start + pw]
+                if self.pixels[start:start + pw] != row:
+                    self.pixels[start:start + pw] = row
+                    changed = True
+            if changed:
+                self.panel_updates[panel] += 1
+
+    def panel(self, index):
+        """One panel's pixels as its own Framebuffer."""
+        fb = Framebuffer(self.panel_width, self.height)
+        for y in range(self.height):
+            start = y * self.width + index * self.panel_width
+            fb.pixels[y * self.panel_width:(y + 1) * self.panel_width] = \
+                self.pixels[start:start + self.panel_width]
+        return fb
+
+
+class FramebufferDisplay:
+    """Composites ``root_group`` into a Framebuffer on every refresh."""
+
+    def __init__(self, framebuffer, *, auto_refresh=True):
+        self.framebuffer = framebuffer
+        self.width = framebuffer.width
+        self.height = framebuffer.height
+        self.auto_refresh = auto_refresh
+        self.brightness = 1.0
+        self.root_group = displayio.Group()
+        self.refresh_count = 0
+
+    def refresh(self, *, target_frames_per_second=None, minimum_frames_per_second=0):
+        pixels = array("L", [0]) * (self.width * self.height)
+        if self.root_group is not None:
+            displayio._composite(self.root_group, pixels, self.width, self.height)
+        self.framebuffer.write(pixels)
+        self.refresh_count += 1
+        return True
@@ -0,0 +1,9 @@
+"""
+Host-side stand-in for ``microcontroller``.
+
+``nvm`` is a plain bytearray the size of the MatrixPortal M4's NVM. It
+lives as long as the module, so running code.py again in the same
+process behaves like a reboot that kept its NVM contents.
+"""
+
+nvm = bytearray(b"\xff" * 8192)
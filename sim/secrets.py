@@ -0,0 +1,2 @@
+"""Dummy credentials for the simulator."""
+secrets = {"ssid": "simulator", "password": "simulator", "timezone": "UTC"}
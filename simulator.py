@@ -0,0 +1,153 @@
+"""
+Headless simulator for running the views on plain CPython.
+
+``install()`` puts the stand-ins in ``sim/`` ahead of everything else on
+``sys.path`` so ``displayio``, ``adafruit_display_text``,
+``adafruit_bitmap_font``, ``adafruit_matrixportal`` and the board, WiFi and
+MQTT libraries resolve to them, and maps absolute CIRCUITPY paths such as
+"/RetroGaming-11.bdf" onto this folder. The views and code.py run on top of
+it unchanged; MQTT traffic goes through the in-process broker in
+``sim/fakenet.py``, and ``FakeClock`` makes time deterministic.
+
+    python simulator.py          # render the clock once and print it
+"""
+import builtins
+import calendar
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+SIM_DIR = os.path.join(ROOT, "sim")
+
+_host_open = builtins.open
+
+
+def host_path(path):
+    """Map an absolute CIRCUITPY path onto the repo if it doesn't exist on the host."""
+    if isinstance(path, str) and path.startswith("/"):
+        top = path[1:].split("/", 1)[0]
+        if top and not os.path.exists("/" + top):
+            return os.path.join(ROOT, path[1:])
+    return path
+
+
+def _circuitpy_open(file, *args, **kwargs):
+    return _host_open(host_path(file), *args, **kwargs)
+
+
+def install():
+    """Make the simulator stand-ins importable. Safe to call more than once."""
+    if SIM_DIR not in sys.path:
+        sys.path.insert(0, SIM_DIR)
+    if ROOT not in sys.path:
+        sys.path.insert(1, ROOT)
+    builtins.open = _circuitpy_open
+
+
+class FakeClock:
+    """
+    A deterministic replacement for ``time``'s clock functions.
+
+    ``sleep()`` advances the clock instead of blocking, and ``localtime()``
+    reads the simulated wall clock the way CircuitPython reads its RTC.
+    """
+
+    def __init__(self, start=0.0, wall=1735732800.0):
+        self.now = start
+        self.wall_offset = wall - start
+        self.sleeps = 0
+        self.on_sleep = None
+        self._saved = None
+
+    def monotonic(self):
+        return self.now
+
+    def monotonic_ns(self):
+        return int(self.now * 1000000000)
+
+    def time(self):
+        return self.now + self.wall_offset
+
+    def localtime(self, secs=None):
+        return time.gmtime(self.time() if secs is None else secs)
+
+    def mktime(self, t):
+        return calendar.timegm(t)
+
+    def advance(self, seconds):
+        self.now += seconds
+
+    def sleep(self, seconds):
+        self.sleeps += 1
+        if seconds > 0:
+            self.now += seconds
+        if self.on_sleep:
+            self.on_sleep(seconds)
+
+    def install(self):
+        names = ("monotonic", "monotonic_ns", "time", "localtime", "mktime", "sleep")
+        self._saved = {name: getattr(time, name) for name in names}
+        for name in names:
+            setattr(time, name, getattr(self, name))
+        return self
+
+    def restore(self):
+        if self._saved:
+            for name, fn in self._saved.items():
+                setattr(time, name, fn)
+            self._saved = None
+
+    def __enter__(self):
+        return self.install()
+
+    def __exit__(self, *exc):
+        self.restore()
+
+
+def make_palette():
+    """The same four-colour palette code.py builds."""
+    import displayio
+
+    palette = displayio.Palette(4)
+    palette[0] = 0x000000
+    palette[1] = 0x0085FF
+    palette[2] = 0xCC4000
+    palette[3] = 0x85FF00
+    return palette
+
+
+def make_display(width=64, height=32):
+    """Return a (matrixportal, display) pair with an empty root group."""
+    import displayio
+    from adafruit_matrixportal.matrixportal import MatrixPortal
+
+    matrixportal = MatrixPortal(width=width, height=height)
+    display = matrixportal.display
+    display.root_group = displayio.Group()
+    return matrixportal, display
+
+
+def load_font(path="/RetroGaming-11.bdf"):
+    from adafruit_bitmap_font import bitmap_font
+
+    return bitmap_font.load_font(path)
+
+
+def render(display):
+    """Refresh ``display`` and return its framebuffer contents as bytes."""
+    display.refresh()
+    return display.framebuffer.snapshot()
+
+
+if __name__ == "__main__":
+    install()
+    from view_clock import ClockView
+    from view_manager import ViewManager
+
+    _, display = make_display()
+    manager = ViewManager(display)
+    manager.add_view(ClockView(make_palette(), load_font(), display))
+    manager.set_view(0)
+    render(display)
+    print(display.framebuffer.to_ascii())
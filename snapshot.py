@@ -0,0 +1,250 @@
+"""
+Warm-start snapshot: last known wall time, crystal drift, current view
+and the raw MQTT topic payloads, so a reboot can show something useful
+before WiFi, MQTT and NTP are back.
+
+Every record is framed, little-endian:
+
+    header  "<4sIHI"  magic b"SNP1", sequence number, body length, CRC32 of body
+    body    "<IiBbB"  wall seconds, drift ppm, flags, view index, topic count
+            then per topic: topic length (B), topic, payload length (H),
+            payload; flag bit 0 of the body marks payloads kept as bytes
+
+A record that fails its CRC (power lost mid-write) is ignored.
+"""
+import os
+import struct
+import time
+from binascii import crc32
+
+MAGIC = b"SNP1"
+HEADER = "<4sIHI"
+HEADER_SIZE = struct.calcsize(HEADER)
+BODY = "<IiBbB"
+BODY_SIZE = struct.calcsize(BODY)
+
+BINARY_PAYLOADS = 0x01
+
+
+def frame(seq, body):
+    return struct.pack(HEADER, MAGIC, seq, len(body), crc32(body)) + body
+
+
+def unframe(data):
+    """(seq, body) of a valid record, or None."""
+    if data is None or len(data) < HEADER_SIZE:
+        return None
+    magic, seq, length, crc = struct.unpack_from(HEADER, data)
+    if magic != MAGIC or HEADER_SIZE + length > len(data):
+        return None
+    body = bytes(data[HEADER_SIZE:HEADER_SIZE + length])
+    if crc32(body) != crc:
+        return None
+    return seq, body
+
+
+class NvmStore:
+    """
+    A/B record slots in ``microcontroller.nvm``. Each write goes to the
+    slot that does not hold the newest valid record, and a read skips a
+    slot that fails its CRC.
+
+    On SAMD51 (MatrixPortal M4) the whole of nvm is one flash erase
+    block, so every write erases both slots and a power loss mid-write
+    can lose both: the next boot is then a cold start, never a corrupt
+    one. The block is rated for about 25,000 erase cycles; keep writes
+    rare (see Snapshot's ``min_interval``). FileStore is the safer choice
+    where the filesystem is writable.
+    """
+
+    def __init__(self, nvm, offset=0, size=None):
+        self.nvm = nvm
+        self.offset = offset
+        self.slot_size = (size if size is not None else len(nvm) - offset) // 2
+        self.capacity = self.slot_size - HEADER_SIZE   # largest body that fits
+
+    def _slot(self, index):
+        start = self.offset + index * self.slot_size
+        return unframe(self.nvm[start:start + self.slot_size])
+
+    def read(self):
+        """(seq, body) of the newest valid record, or None."""
+        best = None
+        for index in range(2):
+            record = self._slot(index)
+            if record and (best is None or record[0] > best[0]):
+                best = record
+        return best
+
+    def write(self, seq, body):
+        data = frame(seq, body)
+        if len(data) > self.slot_size:
+            raise ValueError("snapshot larger than an NVM slot")
+        a = self._slot(0)
+        b = self._slot(1)
+        # Overwrite the older (or broken) slot
+        index = 0 if a is None or (b is not None and a[0] < b[0]) else 1
+        start = self.offset + index * self.slot_size
+        self.nvm[start:start + len(data)] = data
+
+
+class FileStore:
+    """
+    A record in a file, replaced atomically: written to ``path + ".tmp"``
+    and renamed over the old one. The filesystem must be writable from
+    code (remounted in boot.py).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.capacity = None
+
+    def read(self):
+        try:
+            with open(self.path, "rb") as f:
+                return unframe(f.read())
+        except OSError:
+            return None
+
+    def write(self, seq, body):
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(frame(seq, body))
+        os.rename(tmp, self.path)
+
+
+class Snapshot:
+    """
+    Saves and restores warm-start state through an NvmStore or FileStore.
+
+    save() is meant to run as a periodic task. It writes only when the
+    view or topic data changed and ``min_interval`` seconds passed since
+    the last write, or after ``max_interval`` to refresh the time, so
+    flash wear stays bounded whatever the caller's period. Nothing is
+    written before the keeper has synced at least once.
+    """
+
+    def __init__(self, store, keeper=None, manager=None, mqtt_manager=None,
+                 min_interval=600, max_interval=6 * 3600):
+        self.store = store
+        self.keeper = keeper
+        self.manager = manager
+        self.mqtt_manager = mqtt_manager
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+
+        self.seq = 0
+        self._last_write = None
+        self._last_state = None     # body minus the time fields, last written
+        self.writes = 0
+        self.skipped = 0
+        self.restored = False
+
+    def load(self):
+        """Decoded newest record as a dict, or None."""
+        record = self.store.read()
+        if record is None:
+            return None
+        self.seq, body = record
+        wall, drift, flags, view, count = struct.unpack_from(BODY, body)
+        topics = []
+        pos = BODY_SIZE
+        for _ in range(count):
+            size = body[pos]
+            topic = str(body[pos + 1:pos + 1 + size], "utf-8")
+            pos += 1 + size
+            size = struct.unpack_from("<H", body, pos)[0]
+            payload = body[pos + 2:pos + 2 + size]
+            if not flags & BINARY_PAYLOADS:
+                payload = str(payload, "utf-8")
+            pos += 2 + size
+            topics.append((topic, payload))
+        return {
+            "wall": wall,
+            "drift_ppm": drift,
+            "view": view if view >= 0 else None,
+            "topics": topics,
+        }
+
+    def restore_topics(self, state):
+        """Put the saved payloads back in the MqttManager's store (before views read it)."""
+        for topic, payload in state["topics"]:
+            self.mqtt_manager.topic_data.put(topic, payload)
+
+    def restore(self):
+        """
+        Load the newest snapshot and apply it: drift to the keeper, and
+        the saved time too if the RTC is behind it (it was reset), since
+        after a soft reset the RTC is right and the save may be hours
+        old; payloads to the topic store. Returns the state (for the view
+        index) or None if there is no valid snapshot.
+        """
+        state = self.load()
+        if state is None:
+            return None
+        if self.keeper:
+            if self.keeper.now()[0] < state["wall"]:
+                self.keeper.seed(state["wall"], state["drift_ppm"])
+            else:
+                self.keeper.drift_ppm = state["drift_ppm"]
+        if self.mqtt_manager:
+            self.restore_topics(state)
+        self.restored = True
+        return state
+
+    def _state(self):
+        """Body without the time fields: what counts as a change."""
+        view = -1
+        if self.manager and self.manager.current_view_index is not None:
+            view = self.manager.current_view_index
+        flags = 0
+        entries = []
+        if self.mqtt_manager:
+            for topic, payload in self.mqtt_manager.topic_data.items():
+                if isinstance(payload, str):
+                    payload = payload.encode("utf-8")
+                else:
+                    flags |= BINARY_PAYLOADS
+                topic = topic.encode("utf-8")
+                if len(topic) > 255 or len(payload) > 0xFFFF:
+                    continue
+                entries.append(struct.pack("<B", len(topic)) + topic +
+                               struct.pack("<H", len(payload)) + payload)
+        # Over the store's capacity, leave out the least recently used topics
+        entries = entries[-255:]
+        if self.store.capacity is not None:
+            size = BODY_SIZE + sum(len(e) for e in entries)
+            while entries and size > self.store.capacity:
+                size -= len(entries.pop(0))
+        return flags, view, len(entries), b"".join(entries)
+
+    def save(self, force=False):
+        """Write a snapshot if one is due (``writes`` counts them)."""
+        if self.keeper and not self.keeper.synced:
+            return  # never overwrite a good snapshot with an unset clock
+        now = time.monotonic()
+        state = self._state()
+        if not force and self._last_write is not None:
+            elapsed = now - self._last_write
+            changed = state != self._last_state
+            if elapsed < self.min_interval or (not changed and elapsed < self.max_interval):
+                self.skipped += 1
+                return
+
+        wall = self.keeper.now()[0] if self.keeper else int(time.time())
+        drift = self.keeper.drift_ppm if self.keeper else 0
+        flags, view, count, entries = state
+        body = struct.pack(BODY, wall, drift, flags, view, count) + entries
+        self.seq += 1
+        self.store.write(self.seq, body)
+        self._last_write = now
+        self._last_state = state
+        self.writes += 1
+
+    def stats(self):
+        return {
+            "seq": self.seq,
+            "writes": self.writes,
+            "skipped": self.skipped,
+            "restored": self.restored,
+        }
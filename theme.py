@@ -0,0 +1,200 @@
+"""
+Themes: named sets of colours by role ("clock", "value", ...), swapped
+at fixed times of day with an optional fade.
+
+All colour math happens when a theme is added or a fade between two
+themes is first needed: each theme is stored as its gamma-corrected
+colours (brightness applied before the gamma curve, so a dimmed night
+theme still looks like the same hue), quantized to the levels the
+panel can show at its ``bit_depth``, and a fade as a table of
+``fade_steps`` corrected colours per role, interpolated in linear light.
+At run time the engine only hands precomputed integers to the setters
+bound to each role (a Marquee's ``color``, ClockView.set_color, ...),
+and only when they change.
+"""
+import time
+from array import array
+
+
+def correct(rgb, brightness=1.0, gamma=2.2, bit_depth=8):
+    """
+    ``rgb`` scaled by ``brightness``, gamma-corrected for the LEDs and
+    rounded to the levels a panel showing the top ``bit_depth`` bits of
+    each channel can display. A channel lit in ``rgb`` never rounds down
+    to off, so a dim colour stays visible (at the lowest level).
+    """
+    step = 1 << (8 - bit_depth)
+    top = 256 - step
+    out = 0
+    for shift in (16, 8, 0):
+        channel = (rgb >> shift) & 0xFF
+        if not channel or brightness <= 0:
+            continue
+        level = 255 * (channel / 255 * brightness) ** gamma
+        level = int(level / step + 0.5) * step
+        out |= max(step, min(top, level)) << shift
+    return out
+
+
+def _mix(a, b, t):
+    """Channel-wise a + (b - a) * t, before gamma correction."""
+    out = 0
+    for shift in (16, 8, 0):
+        ca = (a >> shift) & 0xFF
+        cb = (b >> shift) & 0xFF
+        out |= int(ca + (cb - ca) * t + 0.5) << shift
+    return out
+
+
+class ThemeEngine:
+    """
+    Holds the themes, the daily schedule and the setters bound to each
+    role. update() fades to the theme the schedule wants now (wall time
+    from ``keeper``, else the RTC) and returns when it next needs to run,
+    at most ``max_wait`` seconds.
+    """
+
+    def __init__(self, roles, keeper=None, gamma=2.2, fade_steps=16, fade_time=2.0,
+                 max_wait=60, bit_depth=8):
+        self.roles = roles
+        self.keeper = keeper
+        self.gamma = gamma
+        self.bit_depth = bit_depth
+        self.fade_steps = fade_steps
+        self.fade_time = fade_time
+        self.max_wait = max_wait
+
+        self._raw = {}              # theme -> (colours by role, brightness)
+        self._colors = {}           # theme -> array of corrected colours by role
+        self._fades = {}            # (from, to) -> array, fade_steps rows of roles
+        self._setters = [[] for _ in roles]
+        self._shown = array("l", [-1] * len(roles))
+        self._schedule = []         # (minute of day, theme), sorted
+
+        self.current = None
+        self._fade = None           # table being stepped through
+        self._step = 0
+        self._target = None
+        self.swaps = 0
+        self.fade_frames = 0
+
+    def add_theme(self, name, colors, brightness=1.0):
+        """``colors`` maps roles to 0xRRGGBB; roles left out are black."""
+        raw = [colors.get(role, 0) for role in self.roles]
+        self._raw[name] = (raw, brightness)
+        self._colors[name] = array("l", [correct(c, brightness, self.gamma, self.bit_depth)
+                                         for c in raw])
+
+    def schedule(self, hour, minute, name):
+        """Show theme ``name`` from hour:minute every day."""
+        self._schedule.append((hour * 60 + minute, name))
+        self._schedule.sort()
+        # Precompute the fades the schedule will use
+        for i, (_, theme) in enumerate(self._schedule):
+            self._fade_table(self._schedule[i - 1][1], theme)
+
+    def bind(self, role, setter):
+        """Call ``setter(color)`` whenever the colour of ``role`` changes."""
+        index = self.roles.index(role)
+        self._setters[index].append(setter)
+        if self._shown[index] >= 0:
+            setter(self._shown[index])
+
+    def color(self, role):
+        """Corrected colour currently shown for ``role`` (-1 before any theme)."""
+        return self._shown[self.roles.index(role)]
+
+    def _fade_table(self, start, end):
+        key = (start, end)
+        table = self._fades.get(key)
+        if table is None and start != end:
+            raw_a, bright_a = self._raw[start]
+            raw_b, bright_b = self._raw[end]
+            table = array("l")
+            for step in range(1, self.fade_steps + 1):
+                t = step / self.fade_steps
+                brightness = bright_a + (bright_b - bright_a) * t
+                for a, b in zip(raw_a, raw_b):
+                    table.append(correct(_mix(a, b, t), brightness, self.gamma,
+                                         self.bit_depth))
+            self._fades[key] = table
+        return table
+
+    def _show(self, colors, offset=0):
+        shown = self._shown
+        for index in range(len(self.roles)):
+            color = colors[offset + index]
+            if color != shown[index]:
+                shown[index] = color
+                for setter in self._setters[index]:
+                    setter(color)
+
+    def apply(self, name, fade=True):
+        """Switch to theme ``name`` now, fading from the current one if ``fade``."""
+        if name == self.current and self._fade is None:
+            return
+        self.swaps += 1
+        if fade and self.current is not None and self.fade_steps > 1:
+            self._fade = self._fade_table(self.current, name)
+            self._step = 0
+            self._target = name
+        else:
+            self._fade = None
+            self._show(self._colors[name])
+        self.current = name
+
+    def scheduled(self, wall=None):
+        """Theme the schedule wants at ``wall`` seconds (default: now)."""
+        if not self._schedule:
+            return self.current
+        now = time.localtime(wall if wall is not None else self._wall())
+        minute = now[3] * 60 + now[4]
+        name = self._schedule[-1][1]  # before the first entry: yesterday's last
+        for start, theme in self._schedule:
+            if start > minute:
+                break
+            name = theme
+        return name
+
+    def _wall(self):
+        if self.keeper:
+            return self.keeper.now()[0]
+        return time.time()
+
+    def update(self):
+        if self._fade is not None:
+            roles = len(self.roles)
+            self._show(self._fade, self._step * roles)
+            self._step += 1
+            self.fade_frames += 1
+            if self._step >= self.fade_steps:
+                self._fade = None
+            else:
+                return self.fade_time / self.fade_steps
+        wall = self._wall()
+        name = self.scheduled(wall)
+        if name is not None and name != self.current:
+            self.apply(name)
+            if self._fade is not None:
+                return 0
+        if not self._schedule:
+            return self.max_wait
+        # Seconds to the next scheduled change
+        now = time.localtime(wall)
+        second = (now[3] * 60 + now[4]) * 60 + now[5]
+        wait = None
+        for start, _ in self._schedule:
+            delta = (start * 60 - second) % 86400
+            if delta and (wait is None or delta < wait):
+                wait = delta
+        if wait is None:
+            wait = 86400
+        return min(self.max_wait, wait)
+
+    def stats(self):
+        return {
+            "theme": self.current,
+            "swaps": self.swaps,
+            "fade_frames": self.fade_frames,
+            "fade_tables": len(self._fades),
+        }
@@ -0,0 +1,160 @@
+import time
+
+
+def _mono_ms():
+    return time.monotonic_ns() // 1000000
+
+
+def parse_time_reply(reply):
+    """
+    Wall time from the time service reply MatrixPortal.get_local_time()
+    returns ("2025-01-01 12:34:56.789 ..."), as (seconds, milliseconds).
+    """
+    date, clock = reply.split(" ")[:2]
+    year, month, mday = (int(v) for v in date.split("-"))
+    hms, _, ms = clock.partition(".")
+    hour, minute, second = (int(v) for v in hms.split(":"))
+    seconds = int(time.mktime((year, month, mday, hour, minute, second, 0, -1, -1)))
+    return seconds, int(ms[:3]) if ms else 0
+
+
+class TimeKeeper:
+    """
+    Local time model fed by occasional (monotonic, wall) samples.
+
+    Between syncs wall time is extrapolated from the monotonic clock,
+    corrected by the crystal drift estimated from past samples. A new
+    sample never makes the displayed time jump: the prediction error is
+    slewed in at ``slew_permille`` ms per second of monotonic time, unless
+    it is larger than ``step_ms`` (first sync, RTC reset), which is applied
+    at once. Once predictions stay within ``stable_ms`` the sync interval
+    doubles up to ``max_interval``; failed syncs back off exponentially.
+
+    Everything is integer milliseconds counted from the last step, so
+    precision holds on CircuitPython's short floats.
+    """
+
+    def __init__(self, min_interval=900, max_interval=4 * 3600, retry=10,
+                 max_retry=900, history=8, slew_permille=50, step_ms=2000,
+                 stable_ms=250):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.retry = retry
+        self.max_retry = max_retry
+        self.slew_permille = slew_permille
+        self.step_ms = step_ms
+        self.stable_ms = stable_ms
+
+        # Until the first sync, trust the RTC as it is
+        self._epoch = int(time.time())     # wall second all ms values count from
+        self._base_mono = _mono_ms()
+        self._base_wall = 0                # wall ms (from _epoch) at _base_mono
+        self._correction = 0               # ms still to be slewed in
+        self.drift_ppm = 0
+        self.synced = False
+
+        self._mono = [0] * history
+        self._wall = [0] * history
+        self.samples = 0
+
+        self.sync_interval = min_interval
+        self._retry_delay = retry
+        self.failures = 0
+        self.last_error = 0
+
+    def _predict(self, mono_ms):
+        elapsed = mono_ms - self._base_mono
+        wall = self._base_wall + elapsed + elapsed * self.drift_ppm // 1000000
+        slewed = elapsed * self.slew_permille // 1000
+        if self._correction >= 0:
+            wall += min(self._correction, slewed)
+        else:
+            wall += max(self._correction, -slewed)
+        return wall
+
+    def wall_at(self, mono_ms):
+        """(wall second, ms into it) at monotonic ``mono_ms``."""
+        wall = self._predict(mono_ms)
+        return self._epoch + wall // 1000, wall % 1000
+
+    def now(self):
+        """Current (wall second, ms into it)."""
+        return self.wall_at(_mono_ms())
+
+    def seed(self, wall_seconds, drift_ppm=0):
+        """
+        Start from a saved wall time (warm start) instead of the RTC. The
+        keeper stays unsynced, so the first real sample steps to it.
+        """
+        self._epoch = wall_seconds
+        self._base_mono = _mono_ms()
+        self._base_wall = 0
+        self._correction = 0
+        self.drift_ppm = drift_ppm
+
+    def add_sample(self, wall_seconds, wall_ms=0, mono_ms=None):
+        """Record a sync result and return the prediction error in ms."""
+        if mono_ms is None:
+            mono_ms = _mono_ms()
+        actual = (wall_seconds - self._epoch) * 1000 + wall_ms
+        predicted = self._predict(mono_ms)
+        error = actual - predicted
+
+        self._base_mono = mono_ms
+        if not self.synced or abs(error) > self.step_ms:
+            # Step: count from this sample and forget samples from before it
+            self._epoch = wall_seconds
+            actual = wall_ms
+            self._base_wall = actual
+            self._correction = 0
+            self.samples = 0
+        else:
+            # Restart the model from where the display is now, slew the rest
+            self._base_wall = predicted
+            self._correction = error
+        self.synced = True
+
+        i = self.samples % len(self._mono)
+        self._mono[i] = mono_ms
+        self._wall[i] = actual
+        self.samples += 1
+        self._estimate_drift()
+
+        self.last_error = error
+        self.failures = 0
+        self._retry_delay = self.retry
+        if abs(error) <= self.stable_ms and self.samples > 2:
+            self.sync_interval = min(self.sync_interval * 2, self.max_interval)
+        else:
+            self.sync_interval = self.min_interval
+        return error
+
+    def _estimate_drift(self):
+        """ppm between the oldest and newest sample kept."""
+        n = min(self.samples, len(self._mono))
+        if n < 2:
+            return
+        newest = (self.samples - 1) % len(self._mono)
+        oldest = (self.samples - n) % len(self._mono)
+        span = self._mono[newest] - self._mono[oldest]
+        if span <= 0:
+            return
+        gained = (self._wall[newest] - self._wall[oldest]) - span
+        self.drift_ppm = gained * 1000000 // span
+
+    def sync_failed(self):
+        """Note a failed sync; returns how long to wait before retrying."""
+        self.failures += 1
+        delay = self._retry_delay
+        self._retry_delay = min(self._retry_delay * 2, self.max_retry)
+        return delay
+
+    def stats(self):
+        return {
+            "synced": self.synced,
+            "samples": self.samples,
+            "drift_ppm": self.drift_ppm,
+            "last_error_ms": self.last_error,
+            "sync_interval": self.sync_interval,
+            "failures": self.failures,
+        }
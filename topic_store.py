@@ -0,0 +1,120 @@
+import json
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+def decode_payload(payload):
+    """
+    JSON if the payload parses to something truthy, otherwise the raw
+    payload (as str, or as bytes if it is not UTF-8).
+    """
+    try:
+        if isinstance(payload, (bytes, bytearray)):
+            # MQTT client in binary mode
+            payload = str(payload, "utf-8")
+        value = json.loads(payload)
+    except ValueError:  # includes UnicodeError
+        return payload
+    return value if value else payload
+
+
+class TopicStore:
+    """
+    Bounded store of the last payload seen on each topic.
+
+    Payloads are kept raw and only decoded when someone reads them; the
+    decoded value is cached until the payload changes. Re-storing an
+    identical payload is a no-op. When ``max_entries`` or ``max_bytes``
+    would be exceeded the least recently used topics are evicted.
+    Topics can have their own decoder (see set_decoder()).
+    """
+
+    def __init__(self, max_entries=32, max_bytes=4096, decoder=decode_payload):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.decoder = decoder
+
+        self._raw = OrderedDict()   # topic -> raw payload, least recent first
+        self._decoded = {}          # topic -> decoded value
+        self._decoders = {}         # topic -> decoder, when not the default
+        self.size = 0               # bytes held by raw payloads
+
+        self.hits = 0               # reads served from the decoded cache
+        self.misses = 0             # reads that had to decode, or found nothing
+        self.evictions = 0
+        self.duplicates = 0         # puts skipped because nothing changed
+
+    def put(self, topic, payload):
+        """Store ``payload``. Returns False if it was identical to the stored one."""
+        old = self._raw.pop(topic, None)
+        if old is not None:
+            if old == payload:
+                self._raw[topic] = old
+                self.duplicates += 1
+                return False
+            self.size -= len(old)
+            self._decoded.pop(topic, None)
+        self._raw[topic] = payload
+        self.size += len(payload)
+        self._evict()
+        return True
+
+    def get(self, topic, default=None):
+        """The decoded value for ``topic``, decoding it on first read."""
+        raw = self._raw.pop(topic, None)
+        if raw is None:
+            self.misses += 1
+            return default
+        self._raw[topic] = raw
+        value = self._decoded.get(topic, _MISSING)
+        if value is _MISSING:
+            self.misses += 1
+            value = self._decoders.get(topic, self.decoder)(raw)
+            self._decoded[topic] = value
+        else:
+            self.hits += 1
+        return value
+
+    def set_decoder(self, topic, decoder):
+        """Decode ``topic`` with ``decoder`` instead of the default."""
+        self._decoders[topic] = decoder
+        self._decoded.pop(topic, None)
+
+    def raw(self, topic):
+        return self._raw.get(topic)
+
+    def items(self):
+        """(topic, raw payload) pairs, least recently used first."""
+        return self._raw.items()
+
+    def remove(self, topic):
+        raw = self._raw.pop(topic, None)
+        if raw is not None:
+            self.size -= len(raw)
+            self._decoded.pop(topic, None)
+
+    def _evict(self):
+        while self._raw and (len(self._raw) > self.max_entries
+                             or self.size > self.max_bytes):
+            # Keep the newest entry even if it alone is over max_bytes
+            if len(self._raw) == 1:
+                return
+            self.remove(next(iter(self._raw)))
+            self.evictions += 1
+
+    def __contains__(self, topic):
+        return topic in self._raw
+
+    def __len__(self):
+        return len(self._raw)
+
+    def stats(self):
+        return {
+            "entries": len(self._raw),
+            "bytes": self.size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "duplicates": self.duplicates,
+        }
@@ -0,0 +1,78 @@
+class _Node:
+    __slots__ = ("children", "callbacks")
+
+    def __init__(self):
+        self.children = {}
+        self.callbacks = []
+
+
+class TopicTrie:
+    """
+    Subscription registry keyed by MQTT topic filter.
+
+    Filters are split on "/" into a trie, so matching a topic costs one
+    lookup per level regardless of how many filters are registered.
+    Supports the MQTT wildcards "+" (one level) and "#" (rest of the topic).
+    """
+
+    def __init__(self):
+        self._root = _Node()
+
+    def add(self, topic_filter, callback):
+        node = self._root
+        for level in topic_filter.split("/"):
+            child = node.children.get(level)
+            if child is None:
+                child = _Node()
+                node.children[level] = child
+            node = child
+        node.callbacks.append(callback)
+
+    def remove(self, topic_filter, callback):
+        """Unregister ``callback``. Returns False if it was not registered."""
+        path = []
+        node = self._root
+        for level in topic_filter.split("/"):
+            child = node.children.get(level)
+            if child is None:
+                return False
+            path.append((node, level))
+            node = child
+        if callback not in node.callbacks:
+            return False
+        node.callbacks.remove(callback)
+        # Prune branches that no longer lead anywhere
+        while path and not node.callbacks and not node.children:
+            parent, level = path.pop()
+            del parent.children[level]
+            node = parent
+        return True
+
+    def match(self, topic):
+        """Return the callbacks whose filters match ``topic``."""
+        found = []
+        self._match(self._root, topic.split("/"), 0, found)
+        return found
+
+    def _match(self, node, levels, i, found):
+        hash_node = node.children.get("#")
+        if hash_node is not None:
+            # "#" also matches the parent level ("a/#" matches "a")
+            found.extend(hash_node.callbacks)
+        if i == len(levels):
+            found.extend(node.callbacks)
+            return
+        child = node.children.get(levels[i])
+        if child is not None:
+            self._match(child, levels, i + 1, found)
+        plus = node.children.get("+")
+        if plus is not None:
+            self._match(plus, levels, i + 1, found)
+
+    def __contains__(self, topic_filter):
+        node = self._root
+        for level in topic_filter.split("/"):
+            node = node.children.get(level)
+            if node is None:
+                return False
+        return bool(node.callbacks)
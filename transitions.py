@@ -0,0 +1,197 @@
+"""
+Animated view switches for ViewManager.set_view().
+
+Nothing is laid out during a transition: both views' Groups are already
+built (the ViewManager keeps every view laid out off-screen) and are
+frozen while it plays, so each frame only applies one precomputed step,
+a pair of Group offsets (Slide) or a few palette entries of a dither
+mask (Fade). Frames are paced at ``fps`` from the first one shown; when
+the loop falls behind, the frames whose time has passed are skipped,
+not played late, so a transition always lasts ``duration``.
+"""
+import time
+from array import array
+import displayio
+
+# 4x4 ordered-dither thresholds
+_BAYER = (0, 8, 2, 10, 12, 4, 14, 6, 3, 11, 1, 9, 15, 7, 13, 5)
+LEVELS = 16
+
+
+class Transition:
+    """
+    Frame pacing and stats shared by the transitions. Subclasses fill
+    in _prepare(width, height), called once per display size, and
+    _apply(frame) / _finish(); _begin() runs before frame 0.
+    """
+
+    def __init__(self, duration=0.4, fps=30):
+        self.fps = fps
+        self.frames = max(1, int(duration * fps))
+        self._size = None
+        self._old = None
+        self._new = None
+        self._start = None
+        self.shown = -1             # frame on screen
+
+        self.transitions = 0
+        self.frames_shown = 0
+        self.dropped = 0
+        self.last_fps = 0.0         # achieved by the last transition
+
+    def start(self, stage, old, new, width, height):
+        """Begin a switch from Group ``old`` to ``new``, both in ``stage``."""
+        if self._size != (width, height):
+            self._size = (width, height)
+            self._prepare(width, height)
+        self._stage = stage
+        self._old = old
+        self._new = new
+        self._start = None
+        self.transitions += 1
+        self._shown_before = self.frames_shown
+        self._begin()
+        self._apply(0)
+        self.shown = 0
+        self.frames_shown += 1
+
+    def _begin(self):
+        pass
+
+    def step(self):
+        """
+        Show the frame due now. Returns the seconds until the next one,
+        or None once the transition is over (call finish()).
+        """
+        now = time.monotonic_ns()
+        if self._start is None:
+            self._start = now
+        frame = (now - self._start) * self.fps // 1000000000
+        if frame >= self.frames:
+            # Past the end: the frames not reached were skipped too
+            self.dropped += self.frames - 1 - self.shown
+            self.shown = self.frames - 1
+            return None
+        if frame != self.shown:
+            if frame > self.shown + 1:
+                self.dropped += frame - self.shown - 1
+            self.shown = frame
+            self.frames_shown += 1
+            self._apply(frame)
+        next_frame = self._start + (frame + 1) * 1000000000 // self.fps
+        # Whole ms, rounded up, so the wake-up lands on or after the boundary
+        return ((next_frame - time.monotonic_ns()) // 1000000 + 1) / 1000
+
+    def finish(self):
+        """Put both Groups back as a plain switch would leave them."""
+        if self._start is not None:
+            elapsed = time.monotonic_ns() - self._start
+            if elapsed > 0:
+                shown = self.frames_shown - self._shown_before
+                self.last_fps = shown * 1000000000 / elapsed
+        self._finish()
+        self._old = self._new = self._stage = None
+
+    def stats(self):
+        return {
+            "transitions": self.transitions,
+            "frames": self.frames_shown,
+            "dropped": self.dropped,
+            "fps": round(self.last_fps, 1),
+        }
+
+
+class Slide(Transition):
+    """
+    The new view pushes the old one out, easing out, from ``direction``
+    ("left": the new view comes in from the right, "right", "up",
+    "down"). The Groups move past the edges of the display they belong
+    to, so use Fade in a region with neighbours on those sides.
+    """
+
+    def __init__(self, duration=0.4, fps=30, direction="left"):
+        super().__init__(duration, fps)
+        self.dx, self.dy = {
+            "left": (-1, 0), "right": (1, 0), "up": (0, -1), "down": (0, 1),
+        }[direction]
+        self.offsets = None
+
+    def _prepare(self, width, height):
+        span = width if self.dx else height
+        n = self.frames
+        # Distance covered at the end of each frame, cubic ease-out
+        self.offsets = array("h", [int(span * (1 - (1 - (i + 1) / n) ** 3) + 0.5)
+                                   for i in range(n)])
+        self.span = span
+
+    def _apply(self, frame):
+        moved = self.offsets[frame]
+        ahead = self.span - moved
+        self._old.x = self.dx * moved
+        self._old.y = self.dy * moved
+        self._new.x = -self.dx * ahead
+        self._new.y = -self.dy * ahead
+
+    def _finish(self):
+        self._old.x = self._old.y = 0
+        self._new.x = self._new.y = 0
+
+
+class Fade(Transition):
+    """
+    Dissolve through black: the old view fades out, the new one in. A
+    dither mask over the display, one Bayer threshold per pixel, darkens
+    pixels as the palette entries at or below the level go opaque black,
+    so a frame changes at most a few palette entries.
+    """
+
+    def __init__(self, duration=0.5, fps=30):
+        super().__init__(duration, fps)
+        self.levels = None
+        self.mask = None
+        self._level = 0
+
+    def _prepare(self, width, height):
+        bitmap = displayio.Bitmap(width, height, LEVELS)
+        for y in range(height):
+            for x in range(width):
+                bitmap[x, y] = _BAYER[(y & 3) * 4 + (x & 3)]
+        self.palette = displayio.Palette(LEVELS)
+        for i in range(LEVELS):
+            self.palette[i] = 0x000000
+            self.palette.make_transparent(i)
+        self.mask = displayio.TileGrid(bitmap, pixel_shader=self.palette)
+        self._level = 0
+        # Mask level per frame: up to full black by the middle, then back
+        n = self.frames
+        half = max(1, n // 2)
+        self.levels = bytearray([
+            LEVELS * (i + 1) // half if i < half else LEVELS * (n - 1 - i) // max(1, n - half)
+            for i in range(n)])
+
+    def _set_level(self, level):
+        palette = self.palette
+        while self._level < level:
+            palette.make_opaque(self._level)
+            self._level += 1
+        while self._level > level:
+            self._level -= 1
+            palette.make_transparent(self._level)
+
+    def _begin(self):
+        self._stage.append(self.mask)
+        self._new.hidden = True
+
+    def _apply(self, frame):
+        self._set_level(self.levels[frame])
+        if frame >= self.frames // 2 and self._new.hidden:
+            # Fully dark: swap the views under the mask
+            self._new.hidden = False
+            self._old.hidden = True
+
+    def _finish(self):
+        self._set_level(0)
+        self._old.hidden = False
+        self._new.hidden = False
+        if self.mask in self._stage:
+            self._stage.remove(self.mask)
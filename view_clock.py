@@ -1,30 +1,99 @@
 import time
+from array import array
+import displayio
 from adafruit_display_text.label import Label
 from base_view import BaseView
+from digit_sprites import DigitSprites, COLON, SPACE
+
+# "HH:MM:SS" is the longest string the clock shows
+MAX_CHARS = 8
+
+
+def _centered(span, width):
+    """round(span / 2 - width / 2) in integer math (ties to even, like round())."""
+    diff = span - width
+    half = diff >> 1
+    if diff & 1 and half & 1:
+        half += 1
+    return half
 
 
 class ClockView(BaseView):
-    def __init__(self, palette, font, display, blink=True):
+    def __init__(self, palette, font, display, blink=True, sprites=False, aligned=False,
+                 theme=None):
         super().__init__(palette, font, display)
 
-        self.clock_label = Label(font)
-        self.group.append(self.clock_label)
-
         self.blink = blink
         self.palette = palette
 
+        # aligned=True: update() does nothing and a SecondTicker calls
+        # prepare()/commit() on each second boundary instead
+        self.aligned = aligned
+
+        self.sprites = None
+        if sprites:
+            self._init_sprites(font)
+        else:
+            self.clock_label = Label(font)
+            self.group.append(self.clock_label)
+            self._next_text = None
+            self._next_color = None
+            self._color = None
+
+        # With a ThemeEngine the colour comes from its "clock" role and
+        # changes only when the theme does; otherwise it follows the hour
+        self._theme_color = None
+        if theme:
+            theme.bind("clock", self.set_color)
+
+    def _init_sprites(self, font):
+        """
+        Sprite mode: the time is drawn by one single-cell TileGrid per
+        character over a pre-rasterized sheet, so a tick only writes tile
+        indices and positions. No strings, no relayout, no allocations.
+        """
+        self.sprite_palette = displayio.Palette(2)
+        self.sprite_palette.make_transparent(0)
+        self.sprites = DigitSprites(font, self.sprite_palette)
+
+        self.slots = []
+        for _ in range(MAX_CHARS):
+            slot = self.sprites.tile_grid()
+            slot.hidden = True
+            self.slots.append(slot)
+            self.group.append(slot)
+
+        # Frame prepared by prepare(), shown by commit()
+        self._chars = bytearray(MAX_CHARS)
+        self._xs = array("h", [0] * MAX_CHARS)
+        self._count = 0
+        self._y = 0
+        self._key = -1
+        self._next_color = -1
+
+        # What is on screen right now
+        self._shown = -1
+        self._color = -1
+
     def update(self):
         # Called every loop iteration. Just update_time for the clock.
-        self.update_time()
+        if not self.aligned:
+            self.update_time()
 
     def update_time(self, hours=None, minutes=None, show_colon=False):
-        now = time.localtime()  # Get the time values we need
+        self.prepare(time.localtime(), hours, minutes, show_colon)
+        self.commit()
+
+    def prepare(self, now, hours=None, minutes=None, show_colon=False):
+        """Lay out the frame for time tuple ``now`` without touching the display."""
         if hours is None:
             hours = now[3]
-        if hours >= 18 or hours < 6:  # evening hours to morning
-            self.clock_label.color = self.palette[1]
+        if self._theme_color is not None:
+            color = self._theme_color
+        elif hours >= 18 or hours < 6:  # evening hours to morning
+            color = self.palette[1]
         else:
-            self.clock_label.color = self.palette[3]  # daylight hours
+            color = self.palette[3]  # daylight hours
         if hours > 12:  # Handle times later than 12:59
             hours -= 12
         elif not hours:  # Handle times between 0:00 and 0:59
@@ -36,15 +105,123 @@ class ClockView(BaseView):
         seconds = now[5]
 
         if self.blink:
-            colon = ":" if show_colon or now[5] % 2 else " "
+            colon_on = show_colon or now[5] % 2
         else:
-            colon = ":"
+            colon_on = True
+
+        if self.sprites:
+            self._layout_sprites(hours, minutes, seconds, colon_on, color)
+            return
 
-        self.clock_label.text = "{hours}{colon}{minutes:02d}{colon}{seconds:02d}".format(
+        colon = ":" if colon_on else " "
+        self._next_color = color
+        self._next_text = "{hours}{colon}{minutes:02d}{colon}{seconds:02d}".format(
             hours=hours, minutes=minutes, colon=colon, seconds=seconds
         )
 
+    def commit(self):
+        """Show the frame laid out by the last prepare()."""
+        if self.sprites:
+            self._commit_sprites()
+            return
+
+        self.invalidate_label(self.clock_label)
+        self._apply_color()
+        self.clock_label.text = self._next_text
+
         bbx, bby, bbwidth, bbh = self.clock_label.bounding_box
         # Center the label
         self.clock_label.x = round(self.display.width / 2 - bbwidth / 2)
         self.clock_label.y = self.display.height // 2
+        self.invalidate_label(self.clock_label)
+
+    def set_color(self, color):
+        """Fixed colour (bound to a ThemeEngine role); shown right away."""
+        self._theme_color = color
+        self._next_color = color
+        self._apply_color()
+
+    def _apply_color(self):
+        if self._next_color is None or self._next_color == self._color:
+            return
+        self._color = self._next_color
+        if not self.sprites:
+            self.clock_label.color = self._color
+            self.invalidate_label(self.clock_label)
+            return
+        self.sprite_palette[1] = self._color
+        w = self.sprites.tile_width
+        h = self.sprites.tile_height
+        for slot in self.slots:
+            if not slot.hidden:
+                self.invalidate(slot.x, slot.y, w, h)
+
+    def _layout_sprites(self, hours, minutes, seconds, colon_on, color):
+        key = ((hours * 60 + minutes) * 60 + seconds) * 2 + (1 if colon_on else 0)
+        self._next_color = color
+        if key == self._key:
+            return  # Same string as the frame already laid out
+        self._key = key
+
+        sprites = self.sprites
+        chars = self._chars
+        sep = COLON if colon_on else SPACE
+        n = 0
+        if hours >= 10:
+            chars[0] = hours // 10
+            n = 1
+        chars[n] = hours % 10
+        chars[n + 1] = sep
+        chars[n + 2] = minutes // 10
+        chars[n + 3] = minutes % 10
+        chars[n + 4] = sep
+        chars[n + 5] = seconds // 10
+        chars[n + 6] = seconds % 10
+        count = n + 7
+
+        # Same extents the Label's bounding box would have for this string
+        cursor = 0
+        left = 0
+        right = 0
+        for i in range(count):
+            c = chars[i]
+            left = min(left, cursor + sprites.left[c])
+            right = max(right, cursor + sprites.right[c])
+            cursor += sprites.advance[c]
+
+        x = _centered(self.display.width, right - left) - sprites.origin_x
+        cursor = 0
+        for i in range(count):
+            self._xs[i] = x + cursor
+            cursor += sprites.advance[chars[i]]
+        self._count = count
+        self._y = self.display.height // 2 + sprites.ascent // 2 - sprites.ascent
+
+    def _commit_sprites(self):
+        self._apply_color()
+        w = self.sprites.tile_width
+        h = self.sprites.tile_height
+        if self._key == self._shown:
+            return  # Nothing visible changed since the last commit
+        self._shown = self._key
+
+        # Only slots whose glyph or position changed are reported dirty
+        count = self._count
+        y = self._y
+        for i in range(count):
+            slot = self.slots[i]
+            c = self._chars[i]
+            x = self._xs[i]
+            if slot.hidden or slot[0] != c or slot.x != x or slot.y != y:
+                if not slot.hidden:
+                    self.invalidate(slot.x, slot.y, w, h)
+                self.invalidate(x, y, w, h)
+                slot[0] = c
+                slot.x = x
+                slot.y = y
+                slot.hidden = False
+        for i in range(count, MAX_CHARS):
+            slot = self.slots[i]
+            if not slot.hidden:
+                self.invalidate(slot.x, slot.y, w, h)
+                slot.hidden = True
@@ -1,35 +1,122 @@
+import time
+import displayio
+
+
 class ViewManager:
-    """Manages multiple views and displays one at a time."""
+    """
+    Manages multiple views and displays one at a time.
+
+    Views stay laid out off-screen and the current one sits in a one-slot
+    ``stage`` Group, so a switch is a single assignment. A switch can be
+    animated with a Transition (transitions.py); ``on_transition`` is
+    called when one starts.
+    """
 
-    def __init__(self, display):
+    def __init__(self, display, compositor=None, transition=None):
         self.display = display
+        self.compositor = compositor
+        self.transition = transition
+        self.on_transition = None
         self.views = []
         self.current_view_index = None
         self.current_view = None
+        self._playing = None        # Transition in progress
+        self._leaving = None        # view it is switching away from
+
+        self.stage = displayio.Group()
+        self.display.root_group.append(self.stage)
+        self._next_hidden = 0
+
+        # Switch latency, from set_view() to the swap, in microseconds
+        self.switches = 0
+        self.last_switch_us = 0
+        self.max_switch_us = 0
 
     def add_view(self, view):
         """Register a new view with the manager."""
+        view.compositor = self.compositor
         self.views.append(view)
 
-    def set_view(self, index):
-        """Hide the old view and show the new one by index."""
-        # Hide old view
-        if self.current_view:
-            self.current_view.hide()
+    def set_view(self, index, transition=None):
+        """
+        Bring the new view up to date off-screen, then swap it in, cut or
+        through ``transition`` (default: self.transition).
+        """
+        start = time.monotonic_ns()
+        if self._playing:
+            self._end_transition()
+        view = self.views[index]
+        if view is not self.current_view:
+            view.update()
+            if transition is None:
+                transition = self.transition
+            if transition and self.current_view:
+                self.stage.append(view.group)
+                transition.start(self.stage, self.current_view.group, view.group,
+                                 self.display.width, self.display.height)
+                self._playing = transition
+                self._leaving = self.current_view
+            elif len(self.stage):
+                self.stage[0] = view.group
+            else:
+                self.stage.append(view.group)
+            if self.current_view:
+                self.current_view.visible = False
+            view.visible = True
+            if self.compositor:
+                self.compositor.invalidate_all()
+            if self._playing and self.on_transition:
+                self.on_transition()
 
-        # Set and show new view
         self.current_view_index = index
-        self.current_view = self.views[index]
-        self.current_view.show()
+        self.current_view = view
+
+        elapsed = (time.monotonic_ns() - start) // 1000
+        self.switches += 1
+        self.last_switch_us = elapsed
+        if elapsed > self.max_switch_us:
+            self.max_switch_us = elapsed
 
-    def next_view(self):
+    def _end_transition(self):
+        self._playing.finish()
+        self.stage.remove(self._leaving.group)
+        self._playing = None
+        self._leaving = None
+        if self.compositor:
+            self.compositor.invalidate_all()
+
+    def next_view(self, transition=None):
         """Convenient method to rotate to the next view."""
         if not self.views:
             return
         new_index = (self.current_view_index + 1) % len(self.views)
-        self.set_view(new_index)
+        self.set_view(new_index, transition)
 
     def update(self):
-        """Call the current view's update() method each loop."""
+        """
+        Call the current view's update() method each loop. Returns what
+        it returns: seconds until it next needs an update, or None.
+        During a transition, shows its next frame instead.
+        """
+        if self._playing:
+            shown = self._playing.shown
+            delay = self._playing.step()
+            if delay is not None:
+                if self._playing.shown != shown and self.compositor:
+                    self.compositor.invalidate_all()
+                return delay
+            self._end_transition()
         if self.current_view:
-            self.current_view.update()
+            return self.current_view.update()
+        return None
+
+    def refresh_hidden(self):
+        """Update one hidden view, round-robin, so it is ready to be shown."""
+        if self._playing:
+            return  # both views are frozen until it ends
+        for _ in range(len(self.views)):
+            view = self.views[self._next_hidden % len(self.views)]
+            self._next_hidden += 1
+            if view is not self.current_view:
+                view.update()
+                return
@@ -1,41 +1,62 @@
-from adafruit_display_text import label
 from base_view import BaseView
+from marquee import Marquee
 
 
 class YoutubeView(BaseView):
-    def __init__(self, palette, font, display, mqtt_manager, topic):
+    def __init__(self, palette, font, display, mqtt_manager, topic, theme=None):
         super().__init__(palette, font, display)
 
         self.mqtt_manager = mqtt_manager
         self.topic = topic
-        self.mqtt_manager.subscribe(topic)
 
         self.current_value = "--"
-        # Label para mostrar el valor recibido de Home Assistant
-        self.value_label = label.Label(
+        # Valor recibido de Home Assistant. Se rasteriza una vez por
+        # valor; si no cabe en el panel se desplaza (marquee).
+        self.value_marquee = Marquee(
             font,
-            text="--",
-            color=0xFFFF00
+            x=2,
+            # En una región de media altura (pantalla dividida), centrado
+            y=min(12, display.height // 2),
+            width=display.width - 2,
+            color=0xFFFF00,
+            invalidate=self.invalidate,
         )
-        self.value_label.x = 2
-        self.value_label.y = 12
-        self.group.append(self.value_label)
+        self.value_marquee.set_text("--")
+        self.group.append(self.value_marquee.group)
+        # Con tema, el color lo pone el ThemeEngine (rol "value") solo
+        # cuando cambia el tema
+        if theme:
+            theme.bind("value", self._set_color)
 
-    def update(self):
+        # El label solo se toca cuando llega un valor nuevo del topic
+        self.mqtt_manager.subscribe(topic, self._on_message)
+        data = self.mqtt_manager.get_data(topic)
+        if data is not None:
+            self._on_message(topic, data)
+
+    def _set_color(self, color):
+        self.value_marquee.color = color
+
+    def _on_message(self, topic, data):
         """
-        Se llama cada vez en el bucle principal. 
-        Pedimos al mqtt_manager la data más reciente y la mostramos.
+        Lo llama el mqtt_manager cuando cambia el valor del topic.
         """
-        data = self.mqtt_manager.get_data(self.topic)
-        if data is None:
-            text_val = "--"
+        # data podría ser un dict si venía en JSON, o un string
+        # Ajustar según tu caso
+        if isinstance(data, dict):
+            # Asumimos que hay un campo 'state'
+            text_val = data.get("state", "--")
         else:
-            # data podría ser un dict si venía en JSON, o un string
-            # Ajustar según tu caso
-            if isinstance(data, dict):
-                # Asumimos que hay un campo 'state'
-                text_val = data.get("state", "--")
-            else:
-                text_val = data
-
-        self.value_label.text = f"{text_val}"
+            text_val = data
+
+        text_val = f"{text_val}"
+        if text_val != self.current_value:
+            self.current_value = text_val
+            self.value_marquee.set_text(text_val)
+
+    def update(self):
+        """
+        Los valores llegan por _on_message; aquí solo se mueve el
+        marquee. Devuelve en cuántos segundos toca el siguiente paso.
+        """
+        return self.value_marquee.update()